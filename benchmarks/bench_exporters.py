@@ -0,0 +1,90 @@
+"""
+Compare write time and file size of the export formats.
+
+Run with ``python benchmarks/bench_exporters.py [--records N]`` with the
+package installed (``pip install -e .[arrow]``). The Parquet and Arrow rows are
+skipped when pyarrow is not installed.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from pyquerytracker.config import Config, ExportType
+from pyquerytracker.exporter.manager import ExporterManager
+
+FORMATS = [
+    (ExportType.CSV, "queries.csv"),
+    (ExportType.JSON, "queries.json"),
+    (ExportType.PARQUET, "queries.parquet"),
+    (ExportType.ARROW, "queries.arrow"),
+    (ExportType.BINARY, "queries.bin"),
+]
+
+
+def make_records(n, seed=0):
+    rng = random.Random(seed)
+    names = [f"query_{i}" for i in range(50)]
+    start = datetime(2025, 1, 1)
+    records = []
+    for i in range(n):
+        error = rng.random() < 0.01
+        records.append(
+            {
+                "timestamp": start + timedelta(milliseconds=i),
+                "event": "error" if error else "normal_execution",
+                "function_name": rng.choice(names),
+                "class_name": rng.choice([None, "UserRepository", "OrderService"]),
+                "duration_ms": rng.lognormvariate(1.0, 0.5),
+                "func_args": f"({rng.randrange(100000)},)",
+                "func_kwargs": "{}",
+                "error": "connection reset" if error else None,
+                "time_to_first_item_ms": None,
+                "item_count": None,
+                "iteration_time_ms": None,
+                "consumer_time_ms": None,
+            }
+        )
+    return records
+
+
+def run(records, directory):
+    results = []
+    for export_type, filename in FORMATS:
+        path = os.path.join(directory, filename)
+        config = Config(export_type=export_type, export_path=path)
+        try:
+            exporter = ExporterManager.create_exporter(config)
+        except ImportError as e:
+            print(f"skipping {export_type.value}: {e}")
+            continue
+        start = time.perf_counter()
+        exporter.extend(records)
+        exporter.close()
+        elapsed = time.perf_counter() - start
+        results.append((export_type.value, elapsed, os.path.getsize(path)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=200_000)
+    args = parser.parse_args()
+
+    records = make_records(args.records)
+    with tempfile.TemporaryDirectory() as directory:
+        results = run(records, directory)
+
+    print(f"{'format':<10}{'write s':>10}{'size MiB':>12}{'bytes/rec':>12}")
+    for name, elapsed, size in results:
+        print(
+            f"{name:<10}{elapsed:>10.3f}{size / 2**20:>12.2f}"
+            f"{size / len(records):>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
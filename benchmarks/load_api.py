@@ -0,0 +1,150 @@
+"""
+API latency under many concurrent clients.
+
+Run from the repository root::
+
+    python benchmarks/load_api.py --clients 1 10 50 --output load.json
+
+Every client issues ``--requests`` requests in turn to the dashboard,
+``/api/query-stats``, ``/debug/queries`` and ``/api/self-metrics`` against a
+database seeded with ``--rows`` records. Requests go through the ASGI app in
+process, so the event loop serving them is the one measured. A probe task
+meanwhile records how late a 10ms sleep wakes up, which is the time the loop
+was blocked. Results are JSON in the format of ``benchmarks/suite.py``.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+# Must be set before pyquerytracker opens its database.
+_DB_DIR = tempfile.mkdtemp(prefix="pyquerytracker-load-")
+os.environ.setdefault(
+    "PYQUERYTRACKER_DB_URL", f"sqlite:///{os.path.join(_DB_DIR, 'load.db')}"
+)
+
+# pylint: disable=wrong-import-position
+import httpx  # noqa: E402
+
+from pyquerytracker.api import app  # noqa: E402
+from pyquerytracker.db.writer import DBWriter  # noqa: E402
+
+ENDPOINTS = (
+    "/dashboard",
+    "/api/query-stats?minutes=5",
+    "/debug/queries",
+    "/api/self-metrics",
+)
+PROBE_INTERVAL_S = 0.01
+
+RESULTS = []
+
+
+def record(name, value, unit, **params):
+    RESULTS.append({"name": name, "params": params, "value": value, "unit": unit})
+    label = ", ".join(f"{k}={v}" for k, v in params.items())
+    print(f"{name:<24}{label:<40}{value:>12.3f} {unit}", file=sys.stderr)
+
+
+def seed(rows):
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    DBWriter.save_many(
+        [
+            {
+                "event": "normal_execution",
+                "function_name": f"query_{i % 50}",
+                "class_name": None,
+                "duration_ms": 1.0 + (i % 97) / 10,
+                "func_args": "()",
+                "func_kwargs": "{}",
+                "error": None,
+                "timestamp": now - timedelta(milliseconds=i * 10),
+            }
+            for i in range(rows)
+        ]
+    )
+
+
+async def probe(lags, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL_S)
+        lags.append(time.perf_counter() - start - PROBE_INTERVAL_S)
+
+
+async def client_loop(client, requests, latencies):
+    for i in range(requests):
+        path = ENDPOINTS[i % len(ENDPOINTS)]
+        start = time.perf_counter()
+        response = await client.get(path)
+        latencies.setdefault(path, []).append(time.perf_counter() - start)
+        response.raise_for_status()
+
+
+async def run(clients, requests):
+    latencies = {}
+    lags = []
+    stop = asyncio.Event()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        await c.get("/api/self-metrics")  # start the app before measuring
+        prober = asyncio.create_task(probe(lags, stop))
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(client_loop(c, requests, latencies) for _ in range(clients))
+        )
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await prober
+
+    record("throughput", clients * requests / elapsed, "req/s", clients=clients)
+    for path, times in latencies.items():
+        times.sort()
+        record(
+            "latency_p50",
+            statistics.median(times) * 1000,
+            "ms",
+            clients=clients,
+            path=path,
+        )
+        record(
+            "latency_p99",
+            times[int(0.99 * (len(times) - 1))] * 1000,
+            "ms",
+            clients=clients,
+            path=path,
+        )
+    record("loop_lag_max", max(lags, default=0.0) * 1000, "ms", clients=clients)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pyquerytracker API load test")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=40, help="Per client.")
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    args = parser.parse_args()
+
+    logging.getLogger("pyquerytracker").setLevel(logging.CRITICAL)
+    seed(args.rows)
+    for clients in args.clients:
+        asyncio.run(run(clients, args.requests))
+
+    report = {"results": RESULTS}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compare size and encode time of the API response representations.
+
+Run with ``python benchmarks/payload_size.py [--records N]`` with the package
+installed (``pip install -e .[orjson,msgpack,brotli]``). The default of 86,400
+records is one call per second for a 24-hour ``/api/query-stats`` window.
+Representations whose optional dependency is missing are skipped.
+"""
+
+import argparse
+import importlib.util
+import random
+import time
+from datetime import datetime, timedelta
+
+from pyquerytracker.encoding import MSGPACK, Representation, encode
+
+REPRESENTATIONS = [
+    ("json", Representation()),
+    ("json+gzip", Representation(encoding="gzip")),
+    ("columnar", Representation(True)),
+    ("columnar+gzip", Representation(True, encoding="gzip")),
+    ("columnar+br", Representation(True, encoding="br")),
+    ("columnar msgpack", Representation(True, MSGPACK)),
+    ("columnar msgpack+gzip", Representation(True, MSGPACK, "gzip")),
+]
+
+
+def make_query_stats(n, seed=0):
+    """A payload shaped like ``query_stats`` with ``n`` rows."""
+    rng = random.Random(seed)
+    names = [f"query_{i}" for i in range(50)]
+    start = datetime(2025, 1, 1)
+    return {
+        "labels": [start + timedelta(seconds=i) for i in range(n)],
+        "durations": [rng.lognormvariate(1.0, 0.5) for _ in range(n)],
+        "events": [
+            "error" if rng.random() < 0.01 else "normal_execution" for _ in range(n)
+        ],
+        "function_names": [rng.choice(names) for _ in range(n)],
+    }
+
+
+def installed(name):
+    return importlib.util.find_spec(name) is not None
+
+
+def available(representation):
+    if representation.media_type == MSGPACK and not installed("msgpack"):
+        return False
+    return representation.encoding != "br" or installed("brotli")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=86_400)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data = make_query_stats(args.records)
+    json_name = "orjson" if installed("orjson") else "json"
+    print(f"{args.records} records, JSON via {json_name}")
+    print(f"{'representation':<24}{'bytes':>12}{'ratio':>8}{'encode ms':>12}")
+    baseline = None
+    for name, representation in REPRESENTATIONS:
+        if not available(representation):
+            print(f"{name:<24}{'skipped':>12}")
+            continue
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            encoded = encode(data, representation)
+            best = min(best, time.perf_counter() - started)
+        size = len(encoded.body)
+        baseline = baseline or size
+        print(f"{name:<24}{size:>12,}{size / baseline:>8.2f}{best * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
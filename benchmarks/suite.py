@@ -0,0 +1,305 @@
+"""
+Overhead benchmarks for the decorator, exporters, DB writer and API.
+
+Run from the repository root with the package installed::
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --quick --compare results.json
+
+Results are written as JSON (see ``--output``) so runs on different commits
+can be compared with ``--compare``. A temporary SQLite database is used and
+tracker logging is silenced unless ``--with-logging`` is given, so that the
+numbers measure the library rather than the terminal.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+# Must be set before pyquerytracker opens its database.
+_DB_DIR = tempfile.mkdtemp(prefix="pyquerytracker-bench-")
+os.environ.setdefault(
+    "PYQUERYTRACKER_DB_URL", f"sqlite:///{os.path.join(_DB_DIR, 'bench.db')}"
+)
+
+# pylint: disable=wrong-import-position
+from pyquerytracker import TrackQuery, configure  # noqa: E402
+from pyquerytracker.config import Config, ExportType  # noqa: E402
+from pyquerytracker.db.writer import DBWriter  # noqa: E402
+from pyquerytracker.exporter.csv_exporter import CsvExporter  # noqa: E402
+from pyquerytracker.exporter.json_exporter import JsonExporter  # noqa: E402
+from pyquerytracker.exporter.manager import ExporterManager  # noqa: E402
+from pyquerytracker.tracker import get_tracked_queries, query_data_store  # noqa: E402
+
+RESULTS = []
+
+
+def record(name, value, unit, **params):
+    RESULTS.append({"name": name, "params": params, "value": value, "unit": unit})
+    label = ", ".join(f"{k}={v}" for k, v in params.items())
+    print(f"{name:<28}{label:<36}{value:>14.3f} {unit}", file=sys.stderr)
+
+
+def best_of(func, repeats):
+    """Median wall time of ``repeats`` runs of ``func``, in seconds."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def make_record(i):
+    return {
+        "event": "normal_execution",
+        "function_name": f"query_{i % 50}",
+        "class_name": None,
+        "duration_ms": 1.0 + (i % 97) / 10,
+        "func_args": f"({i},)",
+        "func_kwargs": "{}",
+        "error": None,
+        "timestamp": datetime(2025, 1, 1) + timedelta(milliseconds=i),
+    }
+
+
+# -- decorator overhead -------------------------------------------------------
+
+
+def bench_decorator(calls, repeats):
+    def plain(x):
+        return x
+
+    async def plain_async(x):
+        return x
+
+    def failing(x):
+        raise ValueError(x)
+
+    async def failing_async(x):
+        raise ValueError(x)
+
+    cases = {
+        "fast": (TrackQuery()(plain), TrackQuery()(plain_async)),
+        "slow": (
+            TrackQuery(slow_log_threshold_ms=0)(plain),
+            TrackQuery(slow_log_threshold_ms=0)(plain_async),
+        ),
+        "error": (TrackQuery()(failing), TrackQuery()(failing_async)),
+    }
+
+    def sync_loop(func):
+        for i in range(calls):
+            func(i)
+
+    async def async_loop(func):
+        for i in range(calls):
+            await func(i)
+
+    baseline = best_of(lambda: sync_loop(plain), repeats) / calls
+    async_baseline = (
+        best_of(lambda: asyncio.run(async_loop(plain_async)), repeats) / calls
+    )
+    for path, (sync_func, async_func) in cases.items():
+        elapsed = best_of(lambda f=sync_func: sync_loop(f), repeats) / calls
+        record(
+            "decorator_overhead",
+            (elapsed - baseline) * 1e6,
+            "us/call",
+            kind="sync",
+            path=path,
+        )
+        query_data_store.clear()
+        elapsed = (
+            best_of(lambda f=async_func: asyncio.run(async_loop(f)), repeats) / calls
+        )
+        record(
+            "decorator_overhead",
+            (elapsed - async_baseline) * 1e6,
+            "us/call",
+            kind="async",
+            path=path,
+        )
+        query_data_store.clear()
+
+    # Disabled tracking should cost a single flag check per call.
+    tracked, tracked_async = TrackQuery()(plain), TrackQuery()(plain_async)
+    configure(enabled=False)
+    try:
+        elapsed = best_of(lambda: sync_loop(tracked), repeats) / calls
+        record(
+            "decorator_overhead",
+            (elapsed - baseline) * 1e6,
+            "us/call",
+            kind="sync",
+            path="disabled",
+        )
+        elapsed = (
+            best_of(lambda: asyncio.run(async_loop(tracked_async)), repeats) / calls
+        )
+        record(
+            "decorator_overhead",
+            (elapsed - async_baseline) * 1e6,
+            "us/call",
+            kind="async",
+            path="disabled",
+        )
+    finally:
+        configure(enabled=True)
+    ExporterManager.pipeline().flush()
+
+
+# -- exporters ----------------------------------------------------------------
+
+
+def bench_exporter_flush(sizes, directory):
+    for exporter_cls, export_type in (
+        (CsvExporter, ExportType.CSV),
+        (JsonExporter, ExportType.JSON),
+    ):
+        for size in sizes:
+            path = os.path.join(directory, f"flush_{size}.{export_type.value}")
+            exporter = exporter_cls(Config(export_type=export_type, export_path=path))
+            for i in range(size):
+                exporter.append(make_record(i))
+            start = time.perf_counter()
+            exporter.flush()
+            elapsed = time.perf_counter() - start
+            record(f"{export_type.value}_flush", elapsed, "s", records=size)
+            os.remove(path)
+
+
+# -- database -----------------------------------------------------------------
+
+
+def bench_db_writer(rows):
+    records = [make_record(i) for i in range(rows)]
+    start = time.perf_counter()
+    for data in records:
+        DBWriter.save(data)
+    record("db_save", rows / (time.perf_counter() - start), "rows/s", rows=rows)
+
+    start = time.perf_counter()
+    DBWriter.save_many(records)
+    record("db_save_many", rows / (time.perf_counter() - start), "rows/s", rows=rows)
+
+
+def bench_query_stats(rows, repeats):
+    # pylint: disable=import-outside-toplevel
+    from fastapi.testclient import TestClient
+
+    from pyquerytracker.api import app
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    DBWriter.save_many(
+        [
+            {**make_record(i), "timestamp": now - timedelta(milliseconds=i)}
+            for i in range(rows)
+        ]
+    )
+    client = TestClient(app)
+    elapsed = best_of(lambda: client.get("/api/query-stats?minutes=60"), repeats)
+    record("api_query_stats", elapsed * 1000, "ms", seeded_rows=rows)
+
+
+# -- in-memory store ----------------------------------------------------------
+
+
+def bench_store(sizes, repeats):
+    for size in sizes:
+        now = datetime.utcnow()
+        query_data_store[:] = [
+            {**make_record(i), "timestamp": now - timedelta(seconds=i % 600)}
+            for i in range(size)
+        ]
+        elapsed = best_of(lambda: get_tracked_queries(5), repeats)
+        record("get_tracked_queries", elapsed * 1000, "ms", store_size=size)
+    query_data_store.clear()
+
+
+# -- driver -------------------------------------------------------------------
+
+
+def metadata():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "date": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def compare(baseline_path, results):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {
+            (r["name"], json.dumps(r["params"], sort_keys=True)): r
+            for r in json.load(f)["results"]
+        }
+    print(f"\n{'benchmark':<64}{'before':>12}{'after':>12}{'change':>10}")
+    for r in results:
+        key = (r["name"], json.dumps(r["params"], sort_keys=True))
+        old = baseline.get(key)
+        if old is None or not old["value"]:
+            continue
+        change = (r["value"] - old["value"]) / abs(old["value"])
+        label = f"{r['name']} {key[1]}"
+        print(
+            f"{label[:63]:<64}{old['value']:>12.3f}{r['value']:>12.3f}{change:>+10.1%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pyquerytracker overhead benchmarks")
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    parser.add_argument("--compare", help="Previous JSON results to compare with.")
+    parser.add_argument(
+        "--quick", action="store_true", help="Smaller sizes (skips 1M records)."
+    )
+    parser.add_argument("--with-logging", action="store_true")
+    args = parser.parse_args()
+
+    if not args.with_logging:
+        logging.getLogger("pyquerytracker").setLevel(logging.CRITICAL)
+    configure(slow_log_threshold_ms=100)
+
+    sizes = [10_000, 100_000] if args.quick else [10_000, 100_000, 1_000_000]
+    repeats = 3 if args.quick else 5
+    with tempfile.TemporaryDirectory() as directory:
+        bench_decorator(calls=2_000 if args.quick else 20_000, repeats=repeats)
+        bench_exporter_flush(sizes, directory)
+        bench_db_writer(rows=1_000 if args.quick else 5_000)
+        bench_store(sizes, repeats)
+        bench_query_stats(rows=10_000 if args.quick else 100_000, repeats=repeats)
+    ExporterManager.reset()
+
+    report = {"meta": metadata(), "results": RESULTS}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        compare(args.compare, RESULTS)
+
+
+if __name__ == "__main__":
+    main()
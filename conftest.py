@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# Keep test runs (including subprocesses) away from the shipped database file.
+_db_dir = tempfile.mkdtemp(prefix="pyquerytracker-tests-")
+os.environ.setdefault(
+    "PYQUERYTRACKER_DB_URL", f"sqlite:///{os.path.join(_db_dir, 'querytracker.db')}"
+)
@@ -1,4 +1,6 @@
 from .config import configure
 from .core import TrackQuery
+from .errors import get_error_groups
+from .selfmetrics import get_self_metrics
 
-__all__ = ["TrackQuery", "configure"]
+__all__ = ["TrackQuery", "configure", "get_error_groups", "get_self_metrics"]
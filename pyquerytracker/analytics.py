@@ -0,0 +1,385 @@
+import csv
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from pyquerytracker.exporter.binary_exporter import (
+    EVENT_CODES,
+    UNKNOWN_EVENT,
+    read_binary_log,
+)
+from pyquerytracker.tracker import get_tracked_queries, query_data_store
+from pyquerytracker.utils.logger import QueryLogger
+
+logger = QueryLogger.get_logger()
+
+DEFAULT_PERCENTILES = (50.0, 95.0, 99.0)
+
+ERROR = EVENT_CODES["error"]
+SLOW = EVENT_CODES["slow_execution"]
+
+
+def _label(function_name, class_name) -> str:
+    return f"{class_name}.{function_name}" if class_name else str(function_name)
+
+
+def _to_datetime64(values: Sequence) -> np.ndarray:
+    """Timestamps (datetimes or ISO strings, naive UTC assumed) as datetime64[us]."""
+    if isinstance(values, np.ndarray) and values.dtype.kind == "M":
+        return values.astype("datetime64[us]")
+    converted = []
+    for value in values:
+        if isinstance(value, datetime) and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        elif value == "":
+            value = None
+        converted.append(value)
+    return np.array(converted, dtype="datetime64[us]")
+
+
+def _to_float(values: Sequence) -> np.ndarray:
+    if isinstance(values, np.ndarray) and values.dtype.kind == "f":
+        return values.astype(float)
+    return np.array([np.nan if v in (None, "") else v for v in values], dtype=float)
+
+
+def _json_floats(values: np.ndarray) -> list:
+    """``values`` as a list with NaN replaced by None, so it is valid JSON."""
+    return [None if np.isnan(v) else float(v) for v in values]
+
+
+def grouped_percentiles(
+    groups: np.ndarray, values: np.ndarray, n_groups: int, percentiles: Sequence
+) -> np.ndarray:
+    """
+    Percentiles of ``values`` within each group, without a Python-level loop.
+
+    Values are sorted once by ``(group, value)``; each group's percentile is
+    then read at its interpolated rank (NumPy's default "linear" method).
+
+    Returns:
+        Array of shape ``(n_groups, len(percentiles))``; NaN for empty groups.
+    """
+    order = np.lexsort((values, groups))
+    ordered = values[order]
+    counts = np.bincount(groups, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    q = np.asarray(percentiles, dtype=float) / 100.0
+    rank = (counts[:, None] - 1) * q[None, :]
+    low = np.floor(rank).astype(np.int64)
+    high = np.ceil(rank).astype(np.int64)
+    empty = counts == 0
+    base = starts[:, None]
+    lo_idx = np.where(empty[:, None], 0, base + low)
+    hi_idx = np.where(empty[:, None], 0, base + high)
+    if len(ordered) == 0:
+        return np.full((n_groups, len(q)), np.nan)
+    result = ordered[lo_idx] + (ordered[hi_idx] - ordered[lo_idx]) * (rank - low)
+    result[empty] = np.nan
+    return result
+
+
+class RecordFrame:
+    """
+    A window of tracked-call records held as columnar NumPy arrays.
+
+    Function labels (``Class.function`` or ``function``) are interned: each
+    record stores an index into :attr:`functions`, so group-by statistics are
+    plain integer bincounts and sorts rather than loops over dicts.
+
+    Attributes:
+        timestamps (np.ndarray): ``datetime64[us]`` call times (UTC).
+        durations (np.ndarray): ``float64`` durations in milliseconds.
+        function_ids (np.ndarray): ``int64`` index into ``functions`` per record.
+        functions (np.ndarray): Distinct function labels.
+        events (np.ndarray): ``uint8`` event codes (see ``EVENT_CODES``).
+        span_s (float): Length of the window in seconds, used for rates.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+        self,
+        timestamps: np.ndarray,
+        durations: np.ndarray,
+        function_ids: np.ndarray,
+        functions: np.ndarray,
+        events: np.ndarray,
+        span_s: Optional[float] = None,
+    ) -> None:
+        self.timestamps = timestamps
+        self.durations = durations
+        self.function_ids = function_ids
+        self.functions = functions
+        self.events = events
+        if span_s is None:
+            valid = timestamps[~np.isnat(timestamps)]
+            span_s = (
+                (valid.max() - valid.min()) / np.timedelta64(1, "s")
+                if len(valid)
+                else 0.0
+            )
+        self.span_s = max(float(span_s), 1.0)
+
+    def __len__(self) -> int:
+        return len(self.durations)
+
+    # -- construction ---------------------------------------------------------
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    @classmethod
+    def from_columns(
+        cls,
+        timestamps: Sequence,
+        durations: Sequence,
+        function_names: Sequence,
+        class_names: Sequence,
+        events: Sequence,
+        span_s: Optional[float] = None,
+    ) -> "RecordFrame":
+        labels = np.array(
+            [_label(f, c) for f, c in zip(function_names, class_names)], dtype=object
+        )
+        functions, function_ids = np.unique(labels, return_inverse=True)
+        return cls(
+            _to_datetime64(timestamps),
+            _to_float(durations),
+            function_ids.astype(np.int64),
+            functions,
+            np.array([EVENT_CODES.get(e, UNKNOWN_EVENT) for e in events], np.uint8),
+            span_s,
+        )
+
+    @classmethod
+    def from_records(
+        cls, records: Iterable[dict], span_s: Optional[float] = None
+    ) -> "RecordFrame":
+        """Build a frame from record dicts, as produced by ``TrackQuery``."""
+        records = list(records)
+        return cls.from_columns(
+            [r.get("timestamp") for r in records],
+            [r.get("duration_ms") for r in records],
+            [r.get("function_name") for r in records],
+            [r.get("class_name") or None for r in records],
+            [r.get("event") for r in records],
+            span_s,
+        )
+
+    @classmethod
+    def from_store(cls, minutes: Optional[int] = None) -> "RecordFrame":
+        """Records of the in-memory store, optionally only the last ``minutes``."""
+        if minutes is None:
+            return cls.from_records(list(query_data_store))
+        return cls.from_records(get_tracked_queries(minutes), span_s=minutes * 60)
+
+    @classmethod
+    def from_db(cls, minutes: int = 5) -> "RecordFrame":
+        """Records persisted in the database during the last ``minutes``."""
+        # Imported here so that analysing files or the in-memory store never
+        # touches the database.
+        # pylint: disable=import-outside-toplevel
+        from sqlalchemy import select
+        from sqlalchemy.exc import SQLAlchemyError
+
+        from pyquerytracker.db.models import TrackedQuery
+        from pyquerytracker.db.session import SessionLocal, ensure_schema
+
+        cutoff = datetime.utcnow() - timedelta(minutes=minutes)
+        stmt = select(
+            TrackedQuery.timestamp,
+            TrackedQuery.duration_ms,
+            TrackedQuery.function_name,
+            TrackedQuery.class_name,
+            TrackedQuery.event,
+        ).where(TrackedQuery.timestamp >= cutoff)
+        session = SessionLocal()
+        try:
+            ensure_schema()
+            rows = session.execute(stmt).all()
+        except SQLAlchemyError as e:
+            logger.error("Failed to load records for analysis: %s", e)
+            rows = []
+        finally:
+            session.close()
+        columns = list(zip(*rows)) if rows else [()] * 5
+        return cls.from_columns(*columns, span_s=minutes * 60)
+
+    @classmethod
+    def from_file(cls, path: str) -> "RecordFrame":
+        """
+        Load an exported file; the format is chosen from its extension.
+
+        Supports ``.csv`` and ``.json`` (CSV/JSON exporters), ``.parquet`` and
+        ``.arrow`` (requires pyarrow) and binary logs (any other extension).
+        """
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".csv":
+            with open(path, newline="", encoding="utf-8") as f:
+                return cls.from_records(csv.DictReader(f))
+        if ext == ".json":
+            with open(path, encoding="utf-8") as f:
+                return cls.from_records(json.load(f))
+        if ext in (".parquet", ".arrow"):
+            return cls._from_arrow(path, ext)
+        return cls._from_binary_log(path)
+
+    @classmethod
+    def _from_arrow(cls, path: str, ext: str) -> "RecordFrame":
+        # pylint: disable=import-outside-toplevel
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+
+        if ext == ".parquet":
+            table = pyarrow.parquet.read_table(path)
+        else:
+            with pyarrow.ipc.open_stream(path) as reader:
+                table = reader.read_all()
+
+        def column(name):
+            values = table.column(name)
+            if pyarrow.types.is_dictionary(values.type):
+                # Decode first: to_numpy() maps null dictionary slots to index 0.
+                values = values.cast(pyarrow.string())
+            return values.to_numpy(zero_copy_only=False)
+
+        return cls.from_columns(
+            column("timestamp"),
+            column("duration_ms"),
+            column("function_name"),
+            column("class_name"),
+            column("event"),
+        )
+
+    @classmethod
+    def _from_binary_log(cls, path: str) -> "RecordFrame":
+        log = read_binary_log(path)
+        records = log.records
+        # Intern (function id, class id) pairs without decoding every record.
+        width = len(log.strings) + 1
+        pairs = records["function_id"].astype(np.int64) * width + (
+            records["class_id"] + 1
+        )
+        unique_pairs, function_ids = np.unique(pairs, return_inverse=True)
+        strings = log.strings
+        functions = np.array(
+            [
+                _label(
+                    strings[p // width], strings[p % width - 1] if p % width else None
+                )
+                for p in unique_pairs
+            ],
+            dtype=object,
+        )
+        return cls(
+            records["timestamp_us"].astype("datetime64[us]"),
+            records["duration_ms"].astype(float),
+            function_ids.astype(np.int64),
+            functions,
+            records["event"].copy(),
+        )
+
+    def select(self, mask: np.ndarray) -> "RecordFrame":
+        """A frame holding only the records where ``mask`` is true."""
+        return RecordFrame(
+            self.timestamps[mask],
+            self.durations[mask],
+            self.function_ids[mask],
+            self.functions,
+            self.events[mask],
+            self.span_s,
+        )
+
+    # -- statistics -----------------------------------------------------------
+
+    def percentiles(self, percentiles: Sequence = DEFAULT_PERCENTILES) -> np.ndarray:
+        """Duration percentiles per function, shape ``(functions, percentiles)``."""
+        return grouped_percentiles(
+            self.function_ids, self.durations, len(self.functions), percentiles
+        )
+
+    def counts(self) -> np.ndarray:
+        return np.bincount(self.function_ids, minlength=len(self.functions))
+
+    def rates(self) -> np.ndarray:
+        """Calls per second per function over the frame's window."""
+        return self.counts() / self.span_s
+
+    def error_ratios(self) -> np.ndarray:
+        errors = np.bincount(
+            self.function_ids,
+            weights=self.events == ERROR,
+            minlength=len(self.functions),
+        )
+        counts = self.counts()
+        return np.divide(errors, counts, out=np.zeros(len(counts)), where=counts > 0)
+
+    def summary(self, percentiles: Sequence = DEFAULT_PERCENTILES) -> List[dict]:
+        """Per-function statistics, busiest function first."""
+        counts = self.counts()
+        totals = np.bincount(
+            self.function_ids, weights=self.durations, minlength=len(self.functions)
+        )
+        values = self.percentiles(percentiles)
+        rates = self.rates()
+        error_ratios = self.error_ratios()
+        slow = np.bincount(
+            self.function_ids,
+            weights=self.events == SLOW,
+            minlength=len(self.functions),
+        )
+        rows = []
+        for i in np.flatnonzero(counts):
+            row = {
+                "function": str(self.functions[i]),
+                "count": int(counts[i]),
+                "calls_per_s": float(rates[i]),
+                "error_ratio": float(error_ratios[i]),
+                "slow_count": int(slow[i]),
+                "mean_ms": float(totals[i] / counts[i]),
+            }
+            for p, value in zip(percentiles, _json_floats(values[i])):
+                row[f"p{p:g}_ms"] = value
+            rows.append(row)
+        rows.sort(key=lambda row: (-row["count"], row["function"]))
+        return rows
+
+    def time_series(
+        self, bucket_s: float = 60.0, percentiles: Sequence = (95.0,)
+    ) -> Dict[str, list]:
+        """
+        Counts, error counts, mean and percentile durations per time bucket.
+
+        Buckets are aligned to multiples of ``bucket_s`` since the epoch and
+        empty buckets between the first and last record are included.
+        """
+        valid = ~np.isnat(self.timestamps)
+        stamps = self.timestamps[valid].astype(np.int64)  # microseconds
+        durations = self.durations[valid]
+        if len(stamps) == 0:
+            return {"buckets": [], "count": [], "errors": [], "mean_ms": []}
+        width = int(bucket_s * 1_000_000)
+        first = stamps.min() // width
+        index = stamps // width - first
+        n = int(index.max()) + 1
+        counts = np.bincount(index, minlength=n)
+        totals = np.bincount(index, weights=durations, minlength=n)
+        errors = np.bincount(index, weights=self.events[valid] == ERROR, minlength=n)
+        values = grouped_percentiles(index, durations, n, percentiles)
+        starts = (first + np.arange(n)) * width
+        series = {
+            "buckets": [
+                datetime.fromtimestamp(s / 1_000_000, timezone.utc).isoformat()
+                for s in starts
+            ],
+            "count": counts.tolist(),
+            "errors": errors.astype(int).tolist(),
+            "mean_ms": _json_floats(
+                np.divide(totals, counts, out=np.full(n, np.nan), where=counts > 0)
+            ),
+        }
+        for j, p in enumerate(percentiles):
+            series[f"p{p:g}_ms"] = _json_floats(values[:, j])
+        return series
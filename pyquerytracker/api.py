@@ -1,70 +1,230 @@
-from datetime import datetime, timedelta
+from datetime import datetime
+from typing import Optional
 
-from fastapi import FastAPI, Query, Request, WebSocket
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket
+from fastapi.responses import HTMLResponse, Response
 from fastapi.templating import Jinja2Templates
 
 from pyquerytracker.config import get_config
-from pyquerytracker.db.models import TrackedQuery
-from pyquerytracker.db.session import SessionLocal
+from pyquerytracker.db.reader import (
+    SORT_COLUMNS,
+    Cursor,
+    RecordQuery,
+    browse_records,
+    query_stats,
+    recent_queries,
+    run_read,
+)
+from pyquerytracker.encoding import negotiate
+from pyquerytracker.errors import get_error_groups
+from pyquerytracker.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from pyquerytracker.metrics import registry as metrics_registry
+from pyquerytracker.regression import detector
+from pyquerytracker.response_cache import etag_matches, response_cache
+from pyquerytracker.selfmetrics import get_self_metrics
 from pyquerytracker.websocket import websocket_endpoint
+from pyquerytracker.window import sliding_window
 
 app = FastAPI(title="Query Tracker API")
 
 templates = Jinja2Templates(directory="templates")
 
 
-if get_config().dashboard_enabled:
+FORMAT_QUERY = Query(
+    "json",
+    pattern="^(json|columnar)$",
+    description="`columnar` sends records as compact columns; see "
+    "`pyquerytracker.encoding.columnar`.",
+)
 
-    @app.get("/dashboard", response_class=HTMLResponse)
-    def dashboard(request: Request):
-        return templates.TemplateResponse("dashboard.html", {"request": request})
+
+async def _cached_response(
+    request: Request, key, func, *args, columnar_layout: bool = False
+) -> Response:
+    """
+    Response for ``func(*args)``, shared through the response cache.
+
+    The body is JSON or MessagePack depending on ``Accept`` and compressed
+    with gzip or Brotli depending on ``Accept-Encoding``. Answers 304 when
+    the client already holds the same body (``ETag``).
+    """
+    representation = negotiate(
+        request.headers.get("accept"),
+        request.headers.get("accept-encoding"),
+        columnar_layout,
+    )
+    entry = await response_cache.get(key, func, *args, representation=representation)
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept, Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    if entry.encoding:
+        headers["Content-Encoding"] = entry.encoding
+    return Response(entry.body, media_type=entry.media_type, headers=headers)
+
+
+@app.get("/dashboard", response_class=HTMLResponse)
+def dashboard(request: Request):
+    # Checked per request so dashboard_enabled can be changed at runtime.
+    if not get_config().dashboard_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return templates.TemplateResponse(request, "dashboard.html")
 
 
 @app.get("/api/query-stats")
-def get_query_stats(minutes: int = Query(5, ge=1, le=1440)):
-    cutoff = datetime.utcnow() - timedelta(minutes=minutes)
-    print(f"[DEBUG] Cutoff: {cutoff}")
-
-    session = SessionLocal()
-    try:
-        logs = (
-            session.query(TrackedQuery)
-            .filter(TrackedQuery.timestamp >= cutoff)  # Now comparing text to text
-            .order_by(TrackedQuery.timestamp)
-            .all()
+async def get_query_stats(
+    request: Request,
+    minutes: int = Query(5, ge=1, le=1440),
+    format: str = FORMAT_QUERY,  # pylint: disable=redefined-builtin
+    points: Optional[int] = Query(
+        None,
+        ge=10,
+        le=100_000,
+        description="Reduce the records to about this many for plotting.",
+    ),
+    method: str = Query("lttb", pattern="^(lttb|minmax)$"),
+):
+    def compute():
+        stats = query_stats(minutes)
+        if points is None:
+            return stats
+        # Imported here so the rest of the API works without NumPy installed.
+        from pyquerytracker.downsample import (  # pylint: disable=import-outside-toplevel
+            downsample_series,
         )
-        print(f"[DEBUG] Matching logs: {len(logs)}")
+
+        return downsample_series(stats, points, method)
+
+    return await _cached_response(
+        request,
+        ("query-stats", minutes, points, method if points else None),
+        compute,
+        columnar_layout=format == "columnar",
+    )
+
+
+@app.get("/api/function-stats")
+async def get_function_stats(
+    request: Request,
+    minutes: int = Query(5, ge=1, le=1440),
+    bucket_s: float = Query(60.0, gt=0),
+):
+    # Imported here so the rest of the API works without NumPy installed.
+    from pyquerytracker.analytics import (  # pylint: disable=import-outside-toplevel
+        RecordFrame,
+    )
+
+    def compute():
+        frame = RecordFrame.from_db(minutes)
+        return {
+            "functions": frame.summary(),
+            "series": frame.time_series(bucket_s),
+        }
+
+    key = ("function-stats", minutes, bucket_s)
+    return await _cached_response(request, key, compute)
+
+
+@app.get("/api/window-stats")
+async def get_window_stats(request: Request, minutes: int = Query(5, ge=1, le=60)):
+    """Per-function stats and calls per second from in-memory aggregates."""
+
+    def compute():
+        seconds = minutes * 60
         return {
-            "labels": [q.timestamp for q in logs],
-            "durations": [q.duration_ms for q in logs],
-            "events": [q.event for q in logs],
-            "function_names": [q.function_name for q in logs],
+            "functions": sliding_window.summary(seconds),
+            "series": sliding_window.series(seconds),
         }
-    finally:
-        session.close()
+
+    return await _cached_response(request, ("window-stats", minutes), compute)
 
 
 @app.get("/debug/queries")
-def debug_queries():
-    session = SessionLocal()
-    try:
-        rows = (
-            session.query(TrackedQuery)
-            .order_by(TrackedQuery.timestamp.desc())
-            .limit(5)
-            .all()
-        )
-        return [
-            {
-                "timestamp": r.timestamp,
-                "duration_ms": r.duration_ms,
-                "event": r.event,
-            }
-            for r in rows
-        ]
-    finally:
-        session.close()
+async def debug_queries(
+    request: Request,
+    format: str = FORMAT_QUERY,  # pylint: disable=redefined-builtin
+):
+    return await _cached_response(
+        request,
+        ("recent", 5),
+        recent_queries,
+        5,
+        columnar_layout=format == "columnar",
+    )
+
+
+@app.get("/api/records")
+async def get_records(  # pylint: disable=too-many-arguments
+    request: Request,
+    *,
+    function: Optional[str] = None,
+    class_name: Optional[str] = Query(None, alias="class"),
+    event: Optional[str] = None,
+    min_duration_ms: Optional[float] = Query(None, ge=0),
+    max_duration_ms: Optional[float] = Query(None, ge=0),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    sort: str = Query("timestamp", pattern=f"^({'|'.join(SORT_COLUMNS)})$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+):
+    """
+    Page through records, newest first unless ``sort``/``order`` say otherwise.
+
+    Pass the ``next_cursor`` of a response as ``cursor`` to get the next
+    page, with the same filters and order.
+    """
+    query = RecordQuery(
+        function_name=function,
+        class_name=class_name,
+        event=event,
+        min_duration_ms=min_duration_ms,
+        max_duration_ms=max_duration_ms,
+        since=since,
+        until=until,
+        sort=sort,
+        descending=order == "desc",
+        limit=limit,
+    )
+    position = None
+    if cursor is not None:
+        try:
+            position = Cursor.decode(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+        if (position.sort, position.descending) != (query.sort, query.descending):
+            raise HTTPException(
+                status_code=400, detail="Cursor belongs to a different sort order"
+            )
+    return await _cached_response(
+        request, ("records", query, position), browse_records, query, position
+    )
+
+
+@app.get("/api/errors")
+def get_errors():
+    """Failures grouped by function, exception type and location."""
+    return {"errors": get_error_groups()}
+
+
+@app.get("/api/regressions")
+async def get_regressions():
+    await run_read(detector.update)
+    return {"regressions": [r.to_dict() for r in detector.regressions]}
+
+
+@app.get("/metrics")
+def metrics():
+    return Response(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/api/self-metrics")
+def self_metrics():
+    return get_self_metrics()
 
 
 @app.websocket("/ws")
@@ -0,0 +1,146 @@
+import argparse
+import sys
+from datetime import datetime, timezone
+from typing import Optional, Sequence, TextIO
+
+from pyquerytracker.logfiles import CHUNK_BYTES, Summary, expand_paths, summarize
+
+PERCENTILES = (50.0, 95.0, 99.0)
+BAR_WIDTH = 40
+
+
+def _fmt(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.2f}"
+
+
+def print_slowest(summary: Summary, top: int, sort: str, out: TextIO) -> None:
+    def key(item):
+        stats = item[1]
+        if sort == "mean":
+            return stats.mean_ms
+        if sort == "max":
+            return stats.max_ms
+        return stats.percentile(float(sort[1:])) or 0.0
+
+    rows = sorted(summary.functions.items(), key=key, reverse=True)[:top]
+    header = "".join(f"{f'p{p:g} ms':>10}" for p in PERCENTILES)
+    out.write(f"\nTop {len(rows)} slowest functions (by {sort})\n")
+    out.write(f"{'function':<40}{'calls':>10}{'mean ms':>10}{header}{'max ms':>10}\n")
+    for label, stats in rows:
+        values = "".join(f"{_fmt(stats.percentile(p)):>10}" for p in PERCENTILES)
+        out.write(
+            f"{label[:39]:<40}{stats.count:>10}{_fmt(stats.mean_ms):>10}"
+            f"{values}{_fmt(stats.max_ms):>10}\n"
+        )
+
+
+def print_errors(summary: Summary, top: int, out: TextIO) -> None:
+    failing = [
+        (label, stats) for label, stats in summary.functions.items() if stats.errors
+    ]
+    failing.sort(key=lambda item: item[1].errors, reverse=True)
+    out.write(f"\nErrors ({sum(s.errors for _, s in failing)} total)\n")
+    if not failing:
+        out.write("  none\n")
+    for label, stats in failing[:top]:
+        out.write(
+            f"  {label}: {stats.errors} errors "
+            f"({stats.errors / stats.count:.1%} of {stats.count} calls)\n"
+        )
+        for message, n in stats.messages.most_common(3):
+            out.write(f"      {n:>8}  {message[:100]}\n")
+
+
+def print_histogram(summary: Summary, out: TextIO) -> None:
+    out.write(f"\nCalls per {summary.bucket_s:g}s\n")
+    if not summary.buckets:
+        out.write("  no timestamps\n")
+        return
+    first, last = min(summary.buckets), max(summary.buckets)
+    peak = max(calls for calls, _ in summary.buckets.values())
+    for key in range(first, last + 1):
+        calls, errors = summary.buckets.get(key, (0, 0))
+        start = datetime.fromtimestamp(key * summary.bucket_s, timezone.utc)
+        bars = "#" * round(BAR_WIDTH * calls / peak)
+        out.write(f"  {start:%Y-%m-%d %H:%M:%S}  {calls:>8}  {errors:>6} err  {bars}\n")
+
+
+def analyze(args: argparse.Namespace, out: TextIO) -> int:
+    paths = expand_paths(args.files)
+    summary = summarize(
+        paths,
+        bucket_s=args.bucket,
+        workers=args.workers,
+        chunk_bytes=args.chunk_mb * 1024 * 1024,
+    )
+    out.write(
+        f"{summary.rows} records, {len(summary.functions)} functions, "
+        f"{len(paths)} files\n"
+    )
+    print_slowest(summary, args.top, args.sort, out)
+    print_errors(summary, args.top, out)
+    if not args.no_histogram:
+        print_histogram(summary, out)
+    return 0
+
+
+def serve(args: argparse.Namespace, _out: TextIO) -> int:
+    import uvicorn  # pylint: disable=import-outside-toplevel
+
+    uvicorn.run("pyquerytracker.api:app", host=args.host, port=args.port)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="pyquerytracker", description="Query performance tracking tools."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    report = commands.add_parser(
+        "analyze",
+        help="Summarize exported log files.",
+        description=(
+            "Stream CSV, JSON, Parquet/Arrow or binary export files and print "
+            "the slowest functions, error summary and calls over time. Files "
+            "are parsed in parallel and memory stays bounded regardless of "
+            "input size."
+        ),
+    )
+    report.add_argument("files", nargs="+", help="Files, directories or globs.")
+    report.add_argument("--top", type=int, default=10, help="Rows per table.")
+    report.add_argument(
+        "--sort",
+        default="p99",
+        choices=["p50", "p95", "p99", "mean", "max"],
+        help="Ranking of the slowest-functions table.",
+    )
+    report.add_argument(
+        "--bucket", type=float, default=3600.0, help="Histogram bucket in seconds."
+    )
+    report.add_argument("--no-histogram", action="store_true")
+    report.add_argument(
+        "--workers", type=int, default=None, help="Processes (default: all CPUs)."
+    )
+    report.add_argument(
+        "--chunk-mb",
+        type=int,
+        default=CHUNK_BYTES // (1024 * 1024),
+        help="Split large files into chunks of this size for parallel parsing.",
+    )
+    report.set_defaults(handler=analyze)
+
+    server = commands.add_parser("serve", help="Run the API and dashboard.")
+    server.add_argument("--host", default="127.0.0.1")
+    server.add_argument("--port", type=int, default=8000)
+    server.set_defaults(handler=serve)
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None, out: Optional[TextIO] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args, out or sys.stdout)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,19 @@
 import logging
-from dataclasses import dataclass
+import os
+import threading
+from dataclasses import dataclass, field, fields, replace
 from enum import Enum
-from typing import Optional
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from pyquerytracker.utils.logger import QueryLogger
+
+logger = QueryLogger.get_logger()
+
+# Environment variables are named PYQUERYTRACKER_<SETTING>, e.g.
+# PYQUERYTRACKER_SAMPLE_RATE=0.1.
+ENV_PREFIX = "PYQUERYTRACKER_"
+# Seconds between two checks of a watched config file for changes.
+CONFIG_POLL_INTERVAL_S = 2.0
 
 
 class ExportType(str, Enum):
@@ -11,14 +23,22 @@ class ExportType(str, Enum):
     Attributes:
         JSON: Export logs in JSON format.
         CSV: Export logs in CSV format.
+        OTLP: Export spans to an OpenTelemetry collector over OTLP/HTTP.
+        PARQUET: Export logs to a columnar Parquet file (requires pyarrow).
+        ARROW: Export logs to an Arrow IPC stream file (requires pyarrow).
+        BINARY: Append logs to a compact fixed-width binary log.
     """
 
     JSON = "json"
     CSV = "csv"
+    OTLP = "otlp"
+    PARQUET = "parquet"
+    ARROW = "arrow"
+    BINARY = "binary"
 
 
 @dataclass
-class Config:
+class Config:  # pylint: disable=too-many-instance-attributes
     """
     Configuration settings for the query tracking system.
 
@@ -30,6 +50,116 @@ class Config:
         slow_log_level (int):
             Logging level for slow query logs (e.g., logging.WARNING, logging.INFO).
             Defaults to logging.WARNING.
+
+        metrics_dir (Optional[str]):
+            Directory shared by worker processes for ``/metrics`` values.
+            When unset, metrics are kept in memory for the current process.
+
+        export_queue_size (int):
+            Maximum number of records waiting in a background exporter's queue;
+            further records are dropped. Defaults to 2048.
+
+        export_batch_size (int):
+            Maximum number of records sent per export request. Defaults to 512.
+
+        export_interval_s (float):
+            Longest time a record waits before a batch is sent. Defaults to 5s.
+
+        export_timeout_s (float):
+            Timeout of a single export request. Defaults to 10s.
+
+        exporters (List[Tuple[ExportType, str]]):
+            Additional ``(export_type, export_path)`` sinks fed alongside
+            ``export_type``/``export_path``. Defaults to none.
+
+        export_row_group_size (int):
+            Records per row group (Parquet) or record batch (Arrow) written by
+            the columnar exporters. Defaults to 65536.
+
+        export_compression (str):
+            Compression codec of the columnar exporters: ``"zstd"``, ``"lz4"``
+            or ``"none"`` (Parquet also accepts ``"snappy"`` and ``"gzip"``).
+            Defaults to ``"zstd"``.
+
+        enabled (bool):
+            Whether decorated functions are tracked at all. When False every
+            wrapper calls straight through to the original function.
+
+        disabled_functions (List[str]):
+            Names (``func`` or ``Class.method``) of functions that are not
+            tracked.
+
+        sample_rate (float):
+            Fraction of normal (fast, successful) calls that are logged and
+            recorded, between 0 and 1. Slow and failed calls are always kept,
+            and ``/metrics`` and window statistics count every call.
+            Defaults to 1.0.
+
+        db_read_workers (int):
+            Threads running database reads for the API and websocket. Read
+            when the first request is served. Defaults to 4.
+
+        api_cache_ttl_s (float):
+            Seconds an API response is reused for identical requests; 0
+            disables reuse. Defaults to 1s.
+
+        api_cache_max_bytes (int):
+            Total size of cached API responses. Defaults to 32 MiB.
+
+        window_retention_s (int):
+            Seconds of per-second aggregates kept for window statistics
+            (``/api/window-stats``). Defaults to one hour.
+
+        error_traceback_interval_s (float):
+            Minimum seconds between two logged tracebacks of the same error
+            (function, exception type and location). Failures in between are
+            only counted; see ``/api/errors``. Defaults to 60s.
+
+        slow_log_interval_s (float):
+            Slow-call log lines per function are limited to
+            ``slow_log_burst``, refilled at one per this many seconds. Beyond
+            that, one summary line per function per interval is logged.
+            Defaults to 10s.
+
+        slow_log_burst (int):
+            Slow calls of a function logged one by one before summarizing
+            starts. Defaults to 5.
+
+        track_cpu_time (bool):
+            Record each call's thread CPU time (``cpu_time_ms``) and, for
+            coroutines, its time running versus suspended (``running_ms``,
+            ``suspended_ms``). Defaults to False.
+
+        allocation_sample_rate (float):
+            Fraction of calls whose allocations (``alloc_bytes``,
+            ``alloc_peak_bytes``) are measured, between 0 and 1. The first
+            sampled call starts :mod:`tracemalloc`, which slows down every
+            allocation in the process until it is stopped. Defaults to 0.
+
+        spool_dir (Optional[str]):
+            Directory of an on-disk write-ahead spool. When set, records for
+            the queued sinks (files and the database) are written there first
+            and each sink reads them back from its own checkpoint, so they
+            survive crashes and sink outages and are replayed once the sink
+            recovers. Defaults to None (in-memory queues).
+
+        spool_segment_bytes (int):
+            Size at which a new spool segment file is started. Defaults to
+            16 MiB.
+
+        spool_max_bytes (int):
+            Disk space the spool may use; beyond it the oldest unread
+            segments are dropped. Defaults to 1 GiB.
+
+        spool_fsync_interval_s (float):
+            Seconds between two fsyncs of the spool; records written since
+            the last one can be lost if the machine (not just the process)
+            goes down. 0 syncs every record. Defaults to 1s.
+
+    Every setting can also be given as a ``PYQUERYTRACKER_<NAME>`` environment
+    variable or in a TOML file (see :func:`watch_config_file`). A config
+    object is never modified once in use; :func:`configure` swaps in a new
+    one.
     """
 
     # TODO: Adding export functionality
@@ -39,20 +169,247 @@ class Config:
     export_path: Optional[str] = None
     dashboard_enabled: bool = True  # ← set to False in real deployments
     persist_to_db: bool = True
+    metrics_dir: Optional[str] = None
+    export_queue_size: int = 2048
+    export_batch_size: int = 512
+    export_interval_s: float = 5.0
+    export_timeout_s: float = 10.0
+    exporters: List[Tuple[ExportType, str]] = field(default_factory=list)
+    export_row_group_size: int = 65536
+    export_compression: str = "zstd"
+    enabled: bool = True
+    disabled_functions: List[str] = field(default_factory=list)
+    sample_rate: float = 1.0
+    db_read_workers: int = 4
+    api_cache_ttl_s: float = 1.0
+    api_cache_max_bytes: int = 32 * 1024 * 1024
+    window_retention_s: int = 3600
+    error_traceback_interval_s: float = 60.0
+    slow_log_interval_s: float = 10.0
+    slow_log_burst: int = 5
+    track_cpu_time: bool = False
+    allocation_sample_rate: float = 0.0
+    spool_dir: Optional[str] = None
+    spool_segment_bytes: int = 16 * 1024 * 1024
+    spool_max_bytes: int = 1024 * 1024 * 1024
+    spool_fsync_interval_s: float = 1.0
+
+
+def _parse_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("1", "true", "yes", "on"):
+        return True
+    if text in ("0", "false", "no", "off"):
+        return False
+    raise ValueError("expected a boolean")
+
+
+def _parse_level(value: Any) -> int:
+    if isinstance(value, int):
+        return value
+    text = str(value).strip()
+    if text.isdigit():
+        return int(text)
+    level = logging.getLevelName(text.upper())
+    if not isinstance(level, int):
+        raise ValueError("unknown logging level")
+    return level
+
+
+def _parse_rate(value: Any) -> float:
+    rate = float(value)
+    if not 0.0 <= rate <= 1.0:
+        raise ValueError("must be between 0 and 1")
+    return rate
+
+
+def _parse_names(value: Any) -> List[str]:
+    if isinstance(value, str):
+        return [name.strip() for name in value.split(",") if name.strip()]
+    return [str(name) for name in value]
+
+
+def _parse_exporters(value: Any) -> List[Tuple[ExportType, str]]:
+    # "csv:logs/q.csv,json:logs/q.json" in the environment,
+    # [["csv", "logs/q.csv"], ...] in TOML.
+    if isinstance(value, str):
+        value = [item.split(":", 1) for item in _parse_names(value)]
+    return [(ExportType(kind), str(path)) for kind, path in value]
+
+
+# How each setting is read from a string (environment) or TOML value.
+_PARSERS: Dict[str, Callable[[Any], Any]] = {
+    "slow_log_threshold_ms": float,
+    "slow_log_level": _parse_level,
+    "export_type": ExportType,
+    "export_path": str,
+    "dashboard_enabled": _parse_bool,
+    "persist_to_db": _parse_bool,
+    "metrics_dir": str,
+    "export_queue_size": int,
+    "export_batch_size": int,
+    "export_interval_s": float,
+    "export_timeout_s": float,
+    "exporters": _parse_exporters,
+    "export_row_group_size": int,
+    "export_compression": str,
+    "enabled": _parse_bool,
+    "disabled_functions": _parse_names,
+    "sample_rate": _parse_rate,
+    "db_read_workers": int,
+    "api_cache_ttl_s": float,
+    "api_cache_max_bytes": int,
+    "window_retention_s": int,
+    "error_traceback_interval_s": float,
+    "slow_log_interval_s": float,
+    "slow_log_burst": int,
+    "track_cpu_time": _parse_bool,
+    "allocation_sample_rate": _parse_rate,
+    "spool_dir": str,
+    "spool_segment_bytes": int,
+    "spool_max_bytes": int,
+    "spool_fsync_interval_s": float,
+}
+
+
+def parse_settings(values: Mapping[str, Any], source: str = "config") -> dict:
+    """
+    Validate and convert raw setting values to their :class:`Config` types.
+
+    Raises:
+        ValueError: For an unknown setting or a value that cannot be
+            converted; the message names ``source`` and the setting.
+    """
+    settings = {}
+    for name, value in values.items():
+        parser = _PARSERS.get(name)
+        if parser is None:
+            raise ValueError(f"{source}: unknown setting {name!r}")
+        try:
+            settings[name] = parser(value)
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f"{source}: invalid {name} {value!r}: {exc}") from exc
+    return settings
+
+
+def _env_values(environ: Optional[Mapping[str, str]] = None) -> Dict[str, str]:
+    environ = os.environ if environ is None else environ
+    values = {}
+    for name in _PARSERS:
+        value = environ.get(ENV_PREFIX + name.upper())
+        if value:
+            values[name] = value
+    return values
+
+
+def config_from_env(environ: Optional[Mapping[str, str]] = None) -> dict:
+    """Settings given as ``PYQUERYTRACKER_<NAME>`` environment variables."""
+    return parse_settings(_env_values(environ), "environment")
+
+
+def _valid_env_settings() -> dict:
+    """
+    Like :func:`config_from_env`, but a variable that does not parse is
+    logged and left out, so that setting keeps its default.
+    """
+    settings = {}
+    for name, value in _env_values().items():
+        try:
+            settings.update(parse_settings({name: value}, "environment"))
+        except ValueError as exc:
+            logger.error("Ignoring %s%s: %s", ENV_PREFIX, name.upper(), exc)
+    return settings
+
 
+def load_config_file(path: str) -> dict:
+    """
+    Settings from a TOML file.
+
+    They are read from a ``[tool.pyquerytracker]`` or ``[pyquerytracker]``
+    table when there is one, otherwise from the top level of the file.
+    """
+    import tomllib  # pylint: disable=import-outside-toplevel
+
+    with open(path, "rb") as f:
+        data = tomllib.load(f)
+    table = data.get("tool", {}).get("pyquerytracker", data.get("pyquerytracker"))
+    return parse_settings(data if table is None else table, path)
+
+
+# Importing the package must not fail, so a bad variable falls back to the
+# default rather than raising.
+_config: Config = Config(**_valid_env_settings())
+_update_lock = threading.RLock()
+
+_listeners: List[Callable[[Config], None]] = []
 
-_config: Config = Config()
 
+def on_config_change(callback: Callable[[Config], None]) -> None:
+    """Register ``callback`` to be called with the config after each update."""
+    _listeners.append(callback)
 
+
+def update_config(**settings: Any) -> Config:
+    """
+    Apply ``settings`` by swapping in a new :class:`Config`.
+
+    The config in use is never modified, so hot-path code reads it through
+    :func:`get_config` without a lock and sees either all of an update or
+    none of it. Updates are serialized and listeners run in update order.
+    """
+    global _config  # pylint: disable=global-statement
+    with _update_lock:
+        config = replace(_config, **settings)
+        config.exporters = list(config.exporters)
+        config.disabled_functions = list(config.disabled_functions)
+        _config = config
+        for callback in _listeners:
+            callback(config)
+    return config
+
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments,unused-argument
+# pylint: disable=too-many-locals
 def configure(
     slow_log_threshold_ms: Optional[float] = None,
     slow_log_level: Optional[int] = None,
     export_type: Optional[ExportType] = None,
     export_path: Optional[str] = None,
+    metrics_dir: Optional[str] = None,
+    export_queue_size: Optional[int] = None,
+    export_batch_size: Optional[int] = None,
+    export_interval_s: Optional[float] = None,
+    export_timeout_s: Optional[float] = None,
+    exporters: Optional[List[Tuple[ExportType, str]]] = None,
+    export_row_group_size: Optional[int] = None,
+    export_compression: Optional[str] = None,
+    persist_to_db: Optional[bool] = None,
+    enabled: Optional[bool] = None,
+    disabled_functions: Optional[List[str]] = None,
+    dashboard_enabled: Optional[bool] = None,
+    sample_rate: Optional[float] = None,
+    db_read_workers: Optional[int] = None,
+    api_cache_ttl_s: Optional[float] = None,
+    api_cache_max_bytes: Optional[int] = None,
+    window_retention_s: Optional[int] = None,
+    error_traceback_interval_s: Optional[float] = None,
+    slow_log_interval_s: Optional[float] = None,
+    slow_log_burst: Optional[int] = None,
+    track_cpu_time: Optional[bool] = None,
+    allocation_sample_rate: Optional[float] = None,
+    spool_dir: Optional[str] = None,
+    spool_segment_bytes: Optional[int] = None,
+    spool_max_bytes: Optional[int] = None,
+    spool_fsync_interval_s: Optional[float] = None,
 ):
     """
     Configure global settings for query tracking.
 
+    Settings left as None keep their current value. The update is applied
+    atomically (see :func:`update_config`) and may be made at any time.
+
     Args:
         slow_log_threshold_ms (Optional[float]):
             Threshold in milliseconds to log a query as "slow".
@@ -61,22 +418,171 @@ def configure(
         slow_log_level (Optional[int]):
             Logging level for slow queries (e.g., logging.INFO, logging.WARNING).
             If not provided, defaults to logging.WARNING.
+
+        metrics_dir (Optional[str]):
+            Directory used to share ``/metrics`` values between worker
+            processes. Must be set before the first tracked call.
+
+        export_queue_size, export_batch_size, export_interval_s, export_timeout_s:
+            Queueing and batching of background exporters; see :class:`Config`.
+
+        exporters (Optional[List[Tuple[ExportType, str]]]):
+            Additional ``(export_type, export_path)`` sinks, e.g.
+            ``[(ExportType.CSV, "logs/q.csv"), (ExportType.JSON, "logs/q.json")]``.
+
+        export_row_group_size, export_compression:
+            Layout of the Parquet/Arrow exporters; see :class:`Config`.
+
+        persist_to_db (Optional[bool]):
+            Whether records are saved to the tracker database. When False the
+            database layer (and SQLAlchemy) is never imported.
+
+        enabled (Optional[bool]):
+            Turn tracking on or off for every decorated function, at any time.
+
+        disabled_functions (Optional[List[str]]):
+            Function names (``func`` or ``Class.method``) to stop tracking;
+            replaces the previous list.
+
+        dashboard_enabled (Optional[bool]):
+            Whether ``/dashboard`` is served.
+
+        sample_rate (Optional[float]):
+            Fraction of normal calls that are recorded; see :class:`Config`.
+
+        db_read_workers (Optional[int]):
+            Size of the API's database read pool; applies when the pool is
+            next created.
+
+        api_cache_ttl_s, api_cache_max_bytes:
+            Reuse and size of cached API responses; see :class:`Config`.
+
+        window_retention_s (Optional[int]):
+            How far back window statistics reach; see :class:`Config`.
+
+        error_traceback_interval_s (Optional[float]):
+            Rate limit of tracebacks per distinct error; see :class:`Config`.
+
+        slow_log_interval_s, slow_log_burst:
+            Rate limit and summarizing of slow-call log lines; see
+            :class:`Config`.
+
+        track_cpu_time (Optional[bool]):
+            Record CPU time, and running versus suspended time of
+            coroutines, for every call; see :class:`Config`.
+
+        allocation_sample_rate (Optional[float]):
+            Fraction of calls whose allocations are measured; see
+            :class:`Config`.
+
+        spool_dir (Optional[str]):
+            Directory of the crash-safe spool in front of the sinks; see
+            :class:`Config`.
+
+        spool_segment_bytes, spool_max_bytes, spool_fsync_interval_s:
+            Segment size, size limit and fsync batching of the spool; see
+            :class:`Config`.
+
+    Raises:
+        ValueError: If a value cannot be converted to the setting's type.
     """
-    if slow_log_threshold_ms is not None:
-        _config.slow_log_threshold_ms = slow_log_threshold_ms
-    if slow_log_level is not None:
-        _config.slow_log_level = slow_log_level
-    if export_type is not None:
-        _config.export_type = export_type
-    if export_path is not None:
-        _config.export_path = export_path
+    settings = {name: value for name, value in locals().items() if value is not None}
+    update_config(**parse_settings(settings, "configure()"))
 
 
 def get_config() -> Config:
     """
     Retrieve the current query tracking configuration.
 
+    The returned object must be treated as read-only; use :func:`configure`
+    to change settings.
+
     Returns:
         TrackerConfig: The current configuration settings.
     """
     return _config
+
+
+class ConfigWatcher:
+    """
+    Applies a TOML config file, and again every time it changes.
+
+    A daemon thread compares the file's modification time and size every
+    ``interval_s`` seconds. Each reload rebuilds the config from the
+    defaults, the file and the environment variables, which keep precedence
+    over the file; settings made with :func:`configure` meanwhile are lost.
+    A file that cannot be read or holds invalid settings is logged and
+    ignored, leaving the current config in effect.
+
+    Args:
+        path (str): TOML file to watch; see :func:`load_config_file`.
+        interval_s (float): Seconds between two checks.
+    """
+
+    def __init__(self, path: str, interval_s: float = CONFIG_POLL_INTERVAL_S):
+        self.path = path
+        self.interval_s = interval_s
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="pyquerytracker-config", daemon=True
+        )
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def check(self) -> bool:
+        """Reload the file if it changed since the last check; True if applied."""
+        stamp = self._file_stamp()
+        if stamp is None or stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        try:
+            settings = load_config_file(self.path)
+        except (OSError, ValueError) as exc:
+            logger.error("Ignoring config file %s: %s", self.path, exc)
+            return False
+        # Rebuilt from scratch so that a setting removed from the file goes
+        # back to its default.
+        defaults = Config()
+        rebuilt = {f.name: getattr(defaults, f.name) for f in fields(defaults)}
+        rebuilt.update(settings)
+        rebuilt.update(_valid_env_settings())
+        update_config(**rebuilt)
+        logger.info("Applied config file %s", self.path)
+        return True
+
+    def start(self) -> "ConfigWatcher":
+        self.check()
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            self.check()
+
+
+def watch_config_file(
+    path: str, interval_s: float = CONFIG_POLL_INTERVAL_S
+) -> ConfigWatcher:
+    """
+    Apply the TOML config file at ``path`` now and whenever it changes.
+
+    This is started automatically for the file named by the
+    ``PYQUERYTRACKER_CONFIG`` environment variable, so thresholds, sampling
+    and sinks of a running process can be changed by editing that file.
+    """
+    return ConfigWatcher(path, interval_s).start()
+
+
+if os.environ.get(ENV_PREFIX + "CONFIG"):
+    watch_config_file(os.environ[ENV_PREFIX + "CONFIG"])
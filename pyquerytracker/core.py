@@ -1,29 +1,251 @@
-import asyncio
+import inspect
+import random
 import time
+import weakref
 from functools import update_wrapper
-from typing import Any, Callable, Generic, Optional, TypeVar
+from threading import Lock
+from typing import Any, Callable, Dict, FrozenSet, Generic, Optional, TypeVar
 
-from pyquerytracker.config import get_config
-from pyquerytracker.db.writer import DBWriter
-from pyquerytracker.exporter.base import NullExporter
-from pyquerytracker.exporter.manager import ExporterManager
+from pyquerytracker.config import Config, get_config, on_config_change
+from pyquerytracker.errors import error_groups
+from pyquerytracker.metrics import registry as metrics_registry
+from pyquerytracker.resources import RESOURCE_FIELDS, ResourceUsage
+from pyquerytracker.selfmetrics import self_metrics
+from pyquerytracker.slowlog import slow_log
 from pyquerytracker.tracker import store_tracked_query
 from pyquerytracker.utils.logger import QueryLogger
+from pyquerytracker.utils.quantile import RollingQuantile
+from pyquerytracker.window import sliding_window
 
 logger = QueryLogger.get_logger()
 
 T = TypeVar("T")
 
+# Keys only generators fill in. Every record carries them (as None for plain
+# calls) so all records share one schema.
+ITERATION_FIELDS = (
+    "time_to_first_item_ms",
+    "item_count",
+    "iteration_time_ms",
+    "consumer_time_ms",
+)
+_EMPTY_FIELDS = dict.fromkeys(ITERATION_FIELDS + RESOURCE_FIELDS)
+
+_exporter_manager = None  # pylint: disable=invalid-name
+
+# Minimum seconds between two logged tracebacks of the tracker's own failures.
+REPORT_WARNING_INTERVAL_S = 60.0
+_report_warned_at: Optional[float] = None  # pylint: disable=invalid-name
+
+
+def _report_failed(func) -> None:
+    """Count (and now and then log) a failure to record a call of ``func``."""
+    global _report_warned_at  # pylint: disable=global-statement
+    self_metrics.add("report_errors")
+    now = time.monotonic()
+    if (
+        _report_warned_at is None
+        or now - _report_warned_at >= REPORT_WARNING_INTERVAL_S
+    ):
+        _report_warned_at = now
+        logger.exception("Failed to record a call of %s", func.__qualname__)
+
+
+def _export_pipeline():
+    """
+    The shared export pipeline, importing the exporter layer on first use.
+
+    Importing and decorating stay cheap this way: the exporters and, when
+    persistence is enabled, SQLAlchemy load on the first tracked call.
+    """
+    global _exporter_manager  # pylint: disable=global-statement
+    if _exporter_manager is None:
+        # pylint: disable-next=import-outside-toplevel
+        from pyquerytracker.exporter.manager import ExporterManager
+
+        _exporter_manager = ExporterManager
+    return _exporter_manager.pipeline()
+
+
+class _Switch:
+    """
+    Whether one decorated function is tracked right now.
+
+    The global ``enabled`` setting, ``disabled_functions`` and the decorator's
+    own flag are folded into ``active`` whenever the config changes, so a
+    wrapper only checks one attribute per call.
+    """
+
+    __slots__ = ("names", "active", "__weakref__")
+
+    def __init__(self, names: FrozenSet[str]) -> None:
+        self.names = names
+        self.active = True
+
+    def update(self, config: Config, disabled: FrozenSet[str]) -> None:
+        self.active = config.enabled and not self.names & disabled
+
+
+_switches: "weakref.WeakSet[_Switch]" = weakref.WeakSet()
+_switches_lock = Lock()
+
+
+def _new_switch(func) -> _Switch:
+    # "Class.method" also matches methods of classes defined in a function.
+    short = ".".join(func.__qualname__.split(".")[-2:])
+    switch = _Switch(frozenset((func.__name__, func.__qualname__, short)))
+    config = get_config()
+    with _switches_lock:
+        switch.update(config, frozenset(config.disabled_functions))
+        _switches.add(switch)
+    return switch
+
+
+def _refresh_switches(config: Config) -> None:
+    disabled = frozenset(config.disabled_functions)
+    with _switches_lock:
+        for switch in _switches:
+            switch.update(config, disabled)
+
+
+on_config_change(_refresh_switches)
+
+
+def _count_unrecorded(func, class_name, duration, extra) -> None:
+    """
+    Count a call that ``sample_rate`` leaves unlogged and unrecorded.
+
+    Sampling only thins out log lines and per-record exports; ``/metrics``
+    and the window statistics still see every call.
+    """
+    summary = {
+        "event": "normal_execution",
+        "function_name": func.__name__,
+        "class_name": class_name,
+        "duration_ms": duration,
+    }
+    if extra:
+        summary.update(extra)
+    sliding_window.add(summary)
+    metrics_registry.observe(summary)
+
+
+def _skip_report(*_args: Any, **_kwargs: Any) -> None:
+    """Stands in for ``TrackQuery._report`` while a generator is untracked."""
+
+
+class _IterationStats:
+    """
+    Timing collected while a tracked generator is being consumed.
+
+    Time spent inside the generator (producing items) is accumulated
+    separately from the wall-clock time of the whole iteration, so the
+    difference is the time the consumer held on to each item.
+    """
+
+    __slots__ = ("start", "inside", "first_item", "count")
 
-class TrackQuery(Generic[T]):
     def __init__(self) -> None:
-        self.config = get_config()
-        if self.config.export_type and self.config.export_path:
-            exporter = ExporterManager.create_exporter(self.config)
-            ExporterManager.set(exporter)
-            self.exporter = exporter
-        else:
-            self.exporter = NullExporter()
+        self.start = time.perf_counter()
+        self.inside = 0.0
+        self.first_item: Optional[float] = None
+        self.count = 0
+
+    def step(self, step_start: float) -> None:
+        self.inside += time.perf_counter() - step_start
+
+    def item(self, step_start: float) -> None:
+        now = time.perf_counter()
+        self.inside += now - step_start
+        self.count += 1
+        if self.first_item is None:
+            self.first_item = now - self.start
+
+    def as_extra(self) -> dict:
+        total = (time.perf_counter() - self.start) * 1000
+        inside = self.inside * 1000
+        return {
+            "time_to_first_item_ms": (
+                self.first_item * 1000 if self.first_item is not None else None
+            ),
+            "item_count": self.count,
+            "iteration_time_ms": total,
+            "consumer_time_ms": max(total - inside, 0.0),
+        }
+
+
+class TrackQuery(Generic[T]):  # pylint: disable=too-many-instance-attributes
+    """
+    Decorator that tracks execution time of functions, coroutines and generators.
+
+    Args:
+        slow_log_threshold_ms (Optional[float]):
+            Threshold for this decorator only. Defaults to the global
+            ``slow_log_threshold_ms`` from :func:`configure`.
+
+        adaptive (bool):
+            Flag a call as slow when it exceeds ``percentile`` × ``factor`` of
+            the function's own recent durations instead of a fixed number.
+            Until ``min_samples`` calls have been seen the fixed threshold is
+            used.
+
+        percentile (float):
+            Percentile of recent history used as the adaptive baseline.
+
+        factor (float):
+            Multiplier applied to the adaptive baseline.
+
+        window (int):
+            Number of calls per rolling baseline window.
+
+        min_samples (int):
+            Calls observed before the adaptive baseline takes effect.
+
+        enabled (bool):
+            When False the function is returned undecorated. To switch
+            tracking on and off at runtime use ``configure(enabled=...)`` or
+            ``configure(disabled_functions=[...])`` instead.
+
+        cpu_time (Optional[bool]):
+            Record the thread CPU time of each call and, for coroutines, the
+            time spent running versus suspended. Defaults to the global
+            ``track_cpu_time``. Not available for generators.
+
+        allocation_sample_rate (Optional[float]):
+            Fraction of calls whose memory allocations are measured with
+            :mod:`tracemalloc`. Defaults to the global
+            ``allocation_sample_rate``. Not available for generators.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        slow_log_threshold_ms: Optional[float] = None,
+        *,
+        adaptive: bool = False,
+        percentile: float = 99.0,
+        factor: float = 1.5,
+        window: int = 1000,
+        min_samples: int = 100,
+        enabled: bool = True,
+        cpu_time: Optional[bool] = None,
+        allocation_sample_rate: Optional[float] = None,
+    ) -> None:
+        self.slow_log_threshold_ms = slow_log_threshold_ms
+        self.adaptive = adaptive
+        self.percentile = percentile
+        self.factor = factor
+        self.window = window
+        self.min_samples = min_samples
+        self.enabled = enabled
+        self.cpu_time = cpu_time
+        self.allocation_sample_rate = allocation_sample_rate
+        self._baselines: Dict[Callable, RollingQuantile] = {}
+
+    @property
+    def config(self) -> Config:
+        """The current global config; read on every use, so updates apply."""
+        return get_config()
 
     def _extract_class_name(self, args: Any) -> Optional[str]:
         if args:
@@ -32,135 +254,357 @@ class TrackQuery(Generic[T]):
                 return obj.__name__ if isinstance(obj, type) else obj.__class__.__name__
         return None
 
+    def _usage(self) -> Optional[ResourceUsage]:
+        """Start measuring the resources of a call, if any are asked for."""
+        config = self.config
+        cpu = config.track_cpu_time if self.cpu_time is None else self.cpu_time
+        rate = self.allocation_sample_rate
+        if rate is None:
+            rate = config.allocation_sample_rate
+        allocations = rate > 0 and random.random() < rate
+        if not (cpu or allocations):
+            return None
+        return ResourceUsage(cpu, allocations)
+
+    def _baseline(self, func) -> RollingQuantile:
+        baseline = self._baselines.get(func)
+        if baseline is None:
+            baseline = self._baselines.setdefault(
+                func,
+                RollingQuantile(
+                    self.percentile / 100,
+                    window=self.window,
+                    min_samples=self.min_samples,
+                ),
+            )
+        return baseline
+
+    def _is_slow(self, func, duration: float) -> bool:
+        threshold = self.slow_log_threshold_ms
+        if threshold is None:
+            threshold = self.config.slow_log_threshold_ms
+        if not self.adaptive:
+            return duration > threshold
+
+        baseline = self._baseline(func)
+        reference = baseline.value
+        baseline.add(duration)
+        if reference is None:
+            return duration > threshold
+        return duration > reference * self.factor
+
     # pylint: disable=too-many-positional-arguments
-    def _build_log_data(self, func, class_name, duration, args, kwargs, error=None):
+    def _build_log_data(
+        self, func, class_name, duration, args, kwargs, error=None, slow=False
+    ):
         data = {
             "event": (
-                "error"
-                if error
-                else (
-                    "slow_execution"
-                    if duration > self.config.slow_log_threshold_ms
-                    else "normal_execution"
-                )
+                "error" if error else ("slow_execution" if slow else "normal_execution")
             ),
             "function_name": func.__name__,
             "class_name": class_name,
             "duration_ms": duration,
             "func_args": repr(args),
             "func_kwargs": repr(kwargs),
+            "error": str(error) if error else None,
         }
-        if error:
-            data["error"] = str(error)
+        data.update(_EMPTY_FIELDS)
         return data
 
     def _handle_export(self, log_data):
-        self.exporter.append(log_data)
-        if self.config.persist_to_db:
-            DBWriter.save(log_data)
+        """Hand the record to every consumer; returns ``(stage, seconds)`` timings."""
+        start = time.perf_counter()
         store_tracked_query(log_data)
+        stored = time.perf_counter()
+        _export_pipeline().append(log_data)
+        appended = time.perf_counter()
+        metrics_registry.observe(log_data)
+        return (
+            ("store", stored - start),
+            ("export_append", appended - stored),
+            ("metrics", time.perf_counter() - appended),
+        )
 
-    def __call__(self, func: Callable[..., T]) -> Callable[..., T]:
-        if asyncio.iscoroutinefunction(func):
+    # pylint: disable=too-many-positional-arguments
+    def _report(self, func, class_name, duration, args, kwargs, error=None, extra=None):
+        """
+        Log a finished call and hand its record to the configured sinks.
 
-            async def async_wrapped(*args: Any, **kwargs: Any) -> T:
-                start = time.perf_counter()
-                class_name = self._extract_class_name(args)
+        A failure of the tracker itself is logged (with its traceback at most
+        once per ``REPORT_WARNING_INTERVAL_S``) and counted, never raised: it
+        must not reach the caller or be mistaken for the function's error.
+        """
+        try:
+            self._record(func, class_name, duration, args, kwargs, error, extra)
+        except Exception:  # pylint: disable=broad-exception-caught
+            _report_failed(func)
 
-                try:
-                    result = await func(*args, **kwargs)
-                    duration = (time.perf_counter() - start) * 1000
-                    log_data = self._build_log_data(
-                        func, class_name, duration, args, kwargs
-                    )
+    # pylint: disable=too-many-positional-arguments
+    def _record(self, func, class_name, duration, args, kwargs, error, extra):
+        start = time.perf_counter()
+        slow = error is None and self._is_slow(func, duration)
+        if error is None and not slow:
+            rate = get_config().sample_rate
+            if rate < 1.0 and random.random() >= rate:
+                _count_unrecorded(func, class_name, duration, extra)
+                return
+        log_data = self._build_log_data(
+            func, class_name, duration, args, kwargs, error=error, slow=slow
+        )
+        if extra:
+            log_data.update(extra)
+        built = time.perf_counter()
+        prefix = f"{class_name}." if class_name else ""
+
+        if error is not None:
+            report = error_groups.record(
+                prefix + func.__name__, error, log_data["error"]
+            )
+            if report.log_traceback:
+                message = "Function %s%s failed after %.2fms: %s"
+                message_args = [prefix, func.__name__, duration, log_data["error"]]
+                if report.suppressed:
+                    message += " (%d more since the last traceback)"
+                    message_args.append(report.suppressed)
+                logger.error(message, *message_args, exc_info=error, extra=log_data)
+            else:
+                self_metrics.add("errors_suppressed")
+        elif slow:
+            if slow_log.allow(
+                prefix + func.__name__,
+                duration,
+                (log_data["func_args"], log_data["func_kwargs"]),
+            ):
+                logger.log(
+                    get_config().slow_log_level,
+                    "%s%s -> Slow execution: took %.2fms",
+                    prefix,
+                    func.__name__,
+                    duration,
+                    extra=log_data,
+                )
+            else:
+                self_metrics.add("slow_logs_suppressed")
+        else:
+            logger.info(
+                "Function %s%s executed successfully in %.2fms",
+                prefix,
+                func.__name__,
+                duration,
+                extra=log_data,
+            )
+        logged = time.perf_counter()
+
+        timings = self._handle_export(log_data)
+        self_metrics.observe_many(
+            (
+                ("build_record", built - start),
+                ("log", logged - built),
+                *timings,
+                ("report", time.perf_counter() - start),
+            )
+        )
+
+    def _wrap_generator(self, func):
+        """
+        Track a generator function over its whole iteration.
+
+        ``duration_ms`` is the time spent inside the generator; the record also
+        carries the time to the first item, the item count, the wall-clock
+        iteration time and the time spent in the consumer between items.
+        Timing starts when the first item is requested. Errors raised by the
+        generator are recorded and then re-raised to the consumer, so a
+        failed stream is never mistaken for a short one.
+        """
 
-                    if duration > self.config.slow_log_threshold_ms:
-                        logger.log(
-                            self.config.slow_log_level,
-                            "%s%s -> Slow execution: took %.2fms",
-                            f"{class_name}." if class_name else "",
-                            func.__name__,
-                            duration,
-                            extra=log_data,
+        switch = _new_switch(func)
+
+        def gen_wrapped(*args: Any, **kwargs: Any):
+            if not switch.active:
+                return (yield from func(*args, **kwargs))
+            class_name = self._extract_class_name(args)
+            stats = _IterationStats()
+            sent = None
+            thrown: Optional[BaseException] = None
+            step_start = time.perf_counter()
+            try:
+                gen = func(*args, **kwargs)
+                while True:
+                    step_start = time.perf_counter()
+                    if thrown is not None:
+                        item = gen.throw(thrown)
+                    else:
+                        item = gen.send(sent)
+                    stats.item(step_start)
+                    thrown = None
+                    try:
+                        sent = yield item
+                    except GeneratorExit:
+                        gen.close()
+                        self._report(
+                            func,
+                            class_name,
+                            stats.inside * 1000,
+                            args,
+                            kwargs,
+                            extra=stats.as_extra(),
                         )
+                        raise
+                    # pylint: disable-next=broad-exception-caught
+                    except BaseException as exc:
+                        thrown = exc
+            except StopIteration as stop:
+                stats.step(step_start)
+                self._report(
+                    func,
+                    class_name,
+                    stats.inside * 1000,
+                    args,
+                    kwargs,
+                    extra=stats.as_extra(),
+                )
+                return stop.value
+            except Exception as e:
+                stats.step(step_start)
+                self._report(
+                    func,
+                    class_name,
+                    stats.inside * 1000,
+                    args,
+                    kwargs,
+                    error=e,
+                    extra=stats.as_extra(),
+                )
+                raise
+
+        return update_wrapper(gen_wrapped, func)
+
+    def _wrap_async_generator(self, func):
+        """Async counterpart of :meth:`_wrap_generator`."""
+
+        switch = _new_switch(func)
+
+        async def agen_wrapped(*args: Any, **kwargs: Any):
+            # No ``yield from`` for async generators: an untracked one still
+            # runs through the forwarding loop, it just isn't reported.
+            report = self._report if switch.active else _skip_report
+            class_name = self._extract_class_name(args)
+            stats = _IterationStats()
+            sent = None
+            thrown: Optional[BaseException] = None
+            step_start = time.perf_counter()
+            try:
+                agen = func(*args, **kwargs)
+                while True:
+                    step_start = time.perf_counter()
+                    if thrown is not None:
+                        item = await agen.athrow(thrown)
                     else:
-                        logger.info(
-                            "Function %s%s executed successfully in %.2fms",
-                            f"{class_name}." if class_name else "",
-                            func.__name__,
-                            duration,
-                            extra=log_data,
+                        item = await agen.asend(sent)
+                    stats.item(step_start)
+                    thrown = None
+                    try:
+                        sent = yield item
+                    except GeneratorExit:
+                        await agen.aclose()
+                        report(
+                            func,
+                            class_name,
+                            stats.inside * 1000,
+                            args,
+                            kwargs,
+                            extra=stats.as_extra(),
                         )
+                        raise
+                    # pylint: disable-next=broad-exception-caught
+                    except BaseException as exc:
+                        thrown = exc
+            except StopAsyncIteration:
+                stats.step(step_start)
+                report(
+                    func,
+                    class_name,
+                    stats.inside * 1000,
+                    args,
+                    kwargs,
+                    extra=stats.as_extra(),
+                )
+            except Exception as e:
+                stats.step(step_start)
+                report(
+                    func,
+                    class_name,
+                    stats.inside * 1000,
+                    args,
+                    kwargs,
+                    error=e,
+                    extra=stats.as_extra(),
+                )
+                raise
+
+        return update_wrapper(agen_wrapped, func)
+
+    def __call__(self, func: Callable[..., T]) -> Callable[..., T]:
+        if not self.enabled:
+            return func
+
+        if inspect.isasyncgenfunction(func):
+            return self._wrap_async_generator(func)
+
+        if inspect.isgeneratorfunction(func):
+            return self._wrap_generator(func)
+
+        switch = _new_switch(func)
 
-                    self._handle_export(log_data)
-                    return result
+        if inspect.iscoroutinefunction(func):
 
+            async def async_wrapped(*args: Any, **kwargs: Any) -> T:
+                if not switch.active:
+                    return await func(*args, **kwargs)
+                usage = self._usage()
+                timed = None
+                start = time.perf_counter()
+                class_name = self._extract_class_name(args)
+
+                try:
+                    if usage is None:
+                        result = await func(*args, **kwargs)
+                    else:
+                        timed = usage.run(func(*args, **kwargs))
+                        result = await timed
                 except Exception as e:
                     duration = (time.perf_counter() - start) * 1000
-                    log_data = self._build_log_data(
-                        func, class_name, duration, args, kwargs, error=e
-                    )
-                    logger.error(
-                        "Function %s%s failed after %.2fms: %s",
-                        f"{class_name}." if class_name else "",
-                        func.__name__,
-                        duration,
-                        str(e),
-                        exc_info=True,
-                        extra=log_data,
+                    extra = None if timed is None else timed.finish(duration)
+                    self._report(
+                        func, class_name, duration, args, kwargs, error=e, extra=extra
                     )
-                    self._handle_export(log_data)
                     return None
+                duration = (time.perf_counter() - start) * 1000
+                extra = None if timed is None else timed.finish(duration)
+                self._report(func, class_name, duration, args, kwargs, extra=extra)
+                return result
 
             return update_wrapper(async_wrapped, func)
 
         def wrapped(*args: Any, **kwargs: Any) -> T:
+            if not switch.active:
+                return func(*args, **kwargs)
+            usage = self._usage()
             start = time.perf_counter()
             class_name = self._extract_class_name(args)
 
             try:
                 result = func(*args, **kwargs)
-                duration = (time.perf_counter() - start) * 1000
-                log_data = self._build_log_data(
-                    func, class_name, duration, args, kwargs
-                )
-
-                if duration > self.config.slow_log_threshold_ms:
-                    logger.log(
-                        self.config.slow_log_level,
-                        "%s%s -> Slow execution: took %.2fms",
-                        f"{class_name}." if class_name else "",
-                        func.__name__,
-                        duration,
-                        extra=log_data,
-                    )
-                else:
-                    logger.info(
-                        "Function %s%s executed successfully in %.2fms",
-                        f"{class_name}." if class_name else "",
-                        func.__name__,
-                        duration,
-                        extra=log_data,
-                    )
-
-                self._handle_export(log_data)
-                return result
-
             except Exception as e:
                 duration = (time.perf_counter() - start) * 1000
-                log_data = self._build_log_data(
-                    func, class_name, duration, args, kwargs, error=e
-                )
-                logger.error(
-                    "Function %s%s failed after %.2fms: %s",
-                    f"{class_name}." if class_name else "",
-                    func.__name__,
-                    duration,
-                    str(e),
-                    exc_info=True,
-                    extra=log_data,
+                extra = None if usage is None else usage.finish()
+                self._report(
+                    func, class_name, duration, args, kwargs, error=e, extra=extra
                 )
-                self._handle_export(log_data)
                 return None
+            duration = (time.perf_counter() - start) * 1000
+            extra = None if usage is None else usage.finish()
+            self._report(func, class_name, duration, args, kwargs, extra=extra)
+            return result
 
         return update_wrapper(wrapped, func)
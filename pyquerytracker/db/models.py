@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Float, Integer, String
+from sqlalchemy import Column, DateTime, Float, Index, Integer, String
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
@@ -18,3 +18,20 @@ class TrackedQuery(Base):
     func_args = Column(String)
     func_kwargs = Column(String)
     error = Column(String, nullable=True)
+    # Resource attribution; only set when it was measured for the call.
+    cpu_time_ms = Column(Float, nullable=True)
+    running_ms = Column(Float, nullable=True)
+    suspended_ms = Column(Float, nullable=True)
+    alloc_bytes = Column(Integer, nullable=True)
+    alloc_peak_bytes = Column(Integer, nullable=True)
+
+    # Keyset pagination in /api/records orders by (sort column, id), with an
+    # optional equality filter in front.
+    __table_args__ = (
+        Index("ix_tracked_queries_timestamp_id", "timestamp", "id"),
+        Index(
+            "ix_tracked_queries_function_timestamp", "function_name", "timestamp", "id"
+        ),
+        Index("ix_tracked_queries_event_timestamp", "event", "timestamp", "id"),
+        Index("ix_tracked_queries_duration_id", "duration_ms", "id"),
+    )
@@ -0,0 +1,290 @@
+import asyncio
+import base64
+import binascii
+import json
+import operator
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from threading import Lock
+from typing import Any, Callable, NamedTuple, Optional, TypeVar
+
+from sqlalchemy import select, tuple_
+
+from pyquerytracker.config import get_config
+from pyquerytracker.db.models import TrackedQuery
+from pyquerytracker.db.session import SessionLocal, ensure_schema
+from pyquerytracker.selfmetrics import self_metrics
+from pyquerytracker.utils.logger import QueryLogger
+
+logger = QueryLogger.get_logger()
+
+T = TypeVar("T")
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = Lock()
+
+
+def read_pool() -> ThreadPoolExecutor:
+    """
+    The thread pool that runs database reads for the API and websocket.
+
+    It is separate from the server's own thread pool and capped at
+    ``db_read_workers`` threads. Many concurrent clients then queue for a
+    few connections instead of opening one each, and the event loop never
+    waits on the database.
+    """
+    global _pool  # pylint: disable=global-statement
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=get_config().db_read_workers,
+                    thread_name_prefix="pyquerytracker-read",
+                )
+    return _pool
+
+
+def shutdown_read_pool() -> None:
+    """Wait for running reads and drop the pool; the next read creates one."""
+    global _pool  # pylint: disable=global-statement
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+def _timed(func: Callable[[], T], submitted: float) -> T:
+    started = time.perf_counter()
+    try:
+        return func()
+    finally:
+        self_metrics.observe_many(
+            (
+                ("db_read_wait", started - submitted),
+                ("db_read", time.perf_counter() - started),
+            )
+        )
+
+
+async def run_read(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run the blocking read ``func(*args, **kwargs)`` on the read pool."""
+    loop = asyncio.get_running_loop()
+    call = partial(_timed, partial(func, *args, **kwargs), time.perf_counter())
+    return await loop.run_in_executor(read_pool(), call)
+
+
+def query_stats(minutes: int) -> dict:
+    """Timestamps, durations, events and names of the last ``minutes``."""
+    cutoff = datetime.utcnow() - timedelta(minutes=minutes)
+    logger.debug("Query stats cutoff: %s", cutoff)
+    stmt = (
+        select(
+            TrackedQuery.timestamp,
+            TrackedQuery.duration_ms,
+            TrackedQuery.event,
+            TrackedQuery.function_name,
+        )
+        .where(TrackedQuery.timestamp >= cutoff)
+        .order_by(TrackedQuery.timestamp)
+    )
+    ensure_schema()
+    session = SessionLocal()
+    try:
+        rows = session.execute(stmt).all()
+    finally:
+        session.close()
+    logger.debug("Query stats matching rows: %d", len(rows))
+    return {
+        "labels": [row.timestamp for row in rows],
+        "durations": [row.duration_ms for row in rows],
+        "events": [row.event for row in rows],
+        "function_names": [row.function_name for row in rows],
+    }
+
+
+def recent_queries(limit: int = 5) -> list:
+    """The ``limit`` most recent records, newest first."""
+    stmt = (
+        select(TrackedQuery.timestamp, TrackedQuery.duration_ms, TrackedQuery.event)
+        .order_by(TrackedQuery.timestamp.desc())
+        .limit(limit)
+    )
+    ensure_schema()
+    session = SessionLocal()
+    try:
+        rows = session.execute(stmt).all()
+    finally:
+        session.close()
+    return [
+        {"timestamp": row.timestamp, "duration_ms": row.duration_ms, "event": row.event}
+        for row in rows
+    ]
+
+
+SORT_COLUMNS = {
+    "timestamp": TrackedQuery.timestamp,
+    "duration_ms": TrackedQuery.duration_ms,
+}
+
+RECORD_COLUMNS = (
+    TrackedQuery.id,
+    TrackedQuery.timestamp,
+    TrackedQuery.function_name,
+    TrackedQuery.class_name,
+    TrackedQuery.duration_ms,
+    TrackedQuery.event,
+    TrackedQuery.error,
+    TrackedQuery.func_args,
+    TrackedQuery.func_kwargs,
+    TrackedQuery.cpu_time_ms,
+    TrackedQuery.running_ms,
+    TrackedQuery.suspended_ms,
+    TrackedQuery.alloc_bytes,
+    TrackedQuery.alloc_peak_bytes,
+)
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Timestamps are stored as naive UTC.
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+@dataclass(frozen=True)
+class RecordQuery:  # pylint: disable=too-many-instance-attributes
+    """
+    Filters and order of a page of records; see :func:`browse_records`.
+
+    Attributes:
+        function_name (Optional[str]): Only calls of this function.
+        class_name (Optional[str]): Only calls of methods of this class.
+        event (Optional[str]): Only this event, e.g. ``"error"``.
+        min_duration_ms (Optional[float]): Only calls at least this long.
+        max_duration_ms (Optional[float]): Only calls at most this long.
+        since (Optional[datetime]): Only calls at or after this time.
+        until (Optional[datetime]): Only calls before this time.
+        sort (str): ``"timestamp"`` or ``"duration_ms"``.
+        descending (bool): Largest first. Defaults to newest first.
+        limit (int): Records per page.
+    """
+
+    function_name: Optional[str] = None
+    class_name: Optional[str] = None
+    event: Optional[str] = None
+    min_duration_ms: Optional[float] = None
+    max_duration_ms: Optional[float] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    sort: str = "timestamp"
+    descending: bool = True
+    limit: int = 100
+
+    def __post_init__(self):
+        if self.sort not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort records by {self.sort!r}")
+        object.__setattr__(self, "since", _naive_utc(self.since))
+        object.__setattr__(self, "until", _naive_utc(self.until))
+
+
+class Cursor(NamedTuple):
+    """Position after the last record of a page: its sort value and id."""
+
+    sort: str
+    descending: bool
+    value: Any
+    id: int
+
+    def encode(self) -> str:
+        value = self.value
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        raw = json.dumps([self.sort, self.descending, value, self.id])
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+    @classmethod
+    def decode(cls, token: str) -> "Cursor":
+        """
+        Parse a cursor returned by :func:`browse_records`.
+
+        Raises:
+            ValueError: If ``token`` is not such a cursor.
+        """
+        try:
+            sort, descending, value, last_id = json.loads(
+                base64.urlsafe_b64decode(token.encode("ascii"))
+            )
+            if sort == "timestamp":
+                value = datetime.fromisoformat(value)
+            elif not isinstance(value, (int, float)):
+                raise ValueError(value)
+            if sort not in SORT_COLUMNS or not isinstance(last_id, int):
+                raise ValueError(sort)
+        except (ValueError, TypeError, UnicodeError, binascii.Error) as e:
+            raise ValueError("Invalid cursor") from e
+        return cls(sort, bool(descending), value, last_id)
+
+
+def browse_records(query: RecordQuery, cursor: Optional[Cursor] = None) -> dict:
+    """
+    One page of records matching ``query``, after ``cursor`` if given.
+
+    Pages are read by keyset: the next page starts strictly after the
+    ``(sort value, id)`` of the previous page's last record, which an index
+    finds directly. Deep pages therefore cost the same as the first, and
+    records inserted meanwhile neither shift nor repeat rows.
+
+    Returns ``{"records": [...], "next_cursor": ...}``; ``next_cursor`` is
+    None on the last page.
+
+    Raises:
+        ValueError: If ``cursor`` belongs to a different sort order.
+    """
+    column = SORT_COLUMNS[query.sort]
+    stmt = select(*RECORD_COLUMNS)
+    conditions = [
+        (operator.eq, TrackedQuery.function_name, query.function_name),
+        (operator.eq, TrackedQuery.class_name, query.class_name),
+        (operator.eq, TrackedQuery.event, query.event),
+        (operator.ge, TrackedQuery.duration_ms, query.min_duration_ms),
+        (operator.le, TrackedQuery.duration_ms, query.max_duration_ms),
+        (operator.ge, TrackedQuery.timestamp, query.since),
+        (operator.lt, TrackedQuery.timestamp, query.until),
+    ]
+    for compare, attribute, value in conditions:
+        if value is not None:
+            stmt = stmt.where(compare(attribute, value))
+    # NULLs have no place in the keyset order.
+    stmt = stmt.where(column.is_not(None))
+
+    if cursor is not None:
+        if (cursor.sort, cursor.descending) != (query.sort, query.descending):
+            raise ValueError("Cursor belongs to a different sort order")
+        position = tuple_(column, TrackedQuery.id)
+        after = (cursor.value, cursor.id)
+        stmt = stmt.where(position < after if query.descending else position > after)
+
+    if query.descending:
+        stmt = stmt.order_by(column.desc(), TrackedQuery.id.desc())
+    else:
+        stmt = stmt.order_by(column, TrackedQuery.id)
+    stmt = stmt.limit(query.limit + 1)
+
+    ensure_schema()
+    session = SessionLocal()
+    try:
+        rows = session.execute(stmt).all()
+    finally:
+        session.close()
+
+    next_cursor = None
+    if len(rows) > query.limit:
+        rows.pop()  # only fetched to tell whether there is a next page
+        last = rows[-1]
+        next_cursor = Cursor(
+            query.sort, query.descending, getattr(last, query.sort), last.id
+        ).encode()
+    return {"records": [row._asdict() for row in rows], "next_cursor": next_cursor}
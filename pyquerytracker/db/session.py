@@ -1,8 +1,69 @@
-from sqlalchemy import create_engine
+import os
+from threading import Lock
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 
+from pyquerytracker.db.models import Base
+
+DATABASE_URL = os.environ.get(
+    "PYQUERYTRACKER_DB_URL", "sqlite:///pyquerytracker/db/querytracker.db"
+)
+
 engine = create_engine(
-    "sqlite:///pyquerytracker/db/querytracker.db",
+    DATABASE_URL,
     connect_args={"check_same_thread": False},
 )
+
+
+def upgrade_schema(bind: Engine) -> None:
+    """
+    Bring a database created by an earlier version up to the current models.
+
+    ``create_all`` only creates missing tables, so columns and indexes added
+    since the table was created are added here. New columns must be
+    nullable, since existing rows have no value for them.
+    """
+    Base.metadata.create_all(bind)
+    inspector = inspect(bind)
+    quote = bind.dialect.identifier_preparer.quote
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        missing = [column for column in table.columns if column.name not in existing]
+        if missing:
+            with bind.begin() as connection:
+                for column in missing:
+                    column_type = column.type.compile(dialect=bind.dialect)
+                    connection.execute(
+                        text(
+                            f"ALTER TABLE {quote(table.name)} "
+                            f"ADD COLUMN {quote(column.name)} {column_type}"
+                        )
+                    )
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
+
+
+_schema_ready = False  # pylint: disable=invalid-name
+_schema_lock = Lock()
+
+
+def ensure_schema() -> None:
+    """
+    Create or upgrade the tracker tables on first use of the database.
+
+    Nothing touches the database at import, so importing the package never
+    fails on a database that cannot be opened. Raises ``SQLAlchemyError``
+    when it cannot; the next call tries again.
+    """
+    global _schema_ready  # pylint: disable=global-statement
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if not _schema_ready:
+            upgrade_schema(engine)
+            _schema_ready = True
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
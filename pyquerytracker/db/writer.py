@@ -1,10 +1,31 @@
 from datetime import datetime, timedelta, timezone
+from typing import List
 
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 
 from pyquerytracker.db.models import TrackedQuery
-from pyquerytracker.db.session import SessionLocal
+from pyquerytracker.db.session import SessionLocal, ensure_schema
+from pyquerytracker.selfmetrics import self_metrics
+
+
+def _to_row(log_data: dict) -> TrackedQuery:
+    return TrackedQuery(
+        function_name=log_data.get("function_name"),
+        class_name=log_data.get("class_name"),
+        duration_ms=log_data.get("duration_ms"),
+        event=log_data.get("event"),
+        func_args=log_data.get("func_args"),
+        func_kwargs=log_data.get("func_kwargs"),
+        error=log_data.get("error"),
+        cpu_time_ms=log_data.get("cpu_time_ms"),
+        running_ms=log_data.get("running_ms"),
+        suspended_ms=log_data.get("suspended_ms"),
+        alloc_bytes=log_data.get("alloc_bytes"),
+        alloc_peak_bytes=log_data.get("alloc_peak_bytes"),
+        timestamp=log_data.get("timestamp")
+        or datetime.now(timezone.utc),  # Ensure timestamp is set
+    )
 
 
 class DBWriter:
@@ -12,27 +33,38 @@ class DBWriter:
     def save(log_data: dict):
         session = SessionLocal()
         try:
-            entry = TrackedQuery(
-                function_name=log_data.get("function_name"),
-                class_name=log_data.get("class_name"),
-                duration_ms=log_data.get("duration_ms"),
-                event=log_data.get("event"),
-                func_args=log_data.get("func_args"),
-                func_kwargs=log_data.get("func_kwargs"),
-                error=log_data.get("error"),
-                timestamp=log_data.get("timestamp")
-                or datetime.now(timezone.utc),  # Ensure timestamp is set
-            )
-            session.add(entry)
-            session.commit()
-        except SQLAlchemyError as e:
+            with self_metrics.timer("db_save"):
+                session.add(_to_row(log_data))
+                session.commit()
+            self_metrics.add("db_rows_saved")
+        except SQLAlchemyError:
+            # The caller decides: the export pipeline logs the failure, or
+            # keeps the records spooled and retries.
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    @staticmethod
+    def save_many(records: List[dict]):
+        """Insert several records in a single transaction."""
+        session = SessionLocal()
+        try:
+            with self_metrics.timer("db_save_many"):
+                session.add_all([_to_row(log_data) for log_data in records])
+                session.commit()
+            self_metrics.add("db_rows_saved", len(records))
+        except SQLAlchemyError:
+            # The caller decides: the export pipeline logs the failure, or
+            # keeps the records spooled and retries.
             session.rollback()
-            print(f"DBWriter error: {e}")
+            raise
         finally:
             session.close()
 
     @staticmethod
     def fetch_all(minutes: int = 5):
+        ensure_schema()
         session = SessionLocal()
         try:
             cutoff = datetime.utcnow() - timedelta(minutes=minutes)
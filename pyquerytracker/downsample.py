@@ -0,0 +1,107 @@
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+
+METHODS = ("lttb", "minmax")
+
+# Timestamps are stored as naive UTC.
+_EPOCH = datetime(1970, 1, 1)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """
+    Indices of ``points`` samples chosen by largest-triangle-three-buckets.
+
+    The first and last samples are always kept. The rest are split into
+    ``points - 2`` equal buckets, and from each the sample forming the
+    largest triangle with the previously chosen sample and the next bucket's
+    average is kept, which keeps the peaks and troughs that shape the line.
+    Each bucket's triangle areas are computed with NumPy at once.
+    """
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    # Average of each bucket; the last bucket's "next" is the final sample.
+    sizes = np.diff(edges)
+    next_x = np.append(np.add.reduceat(x[1:-1], edges[:-1] - 1) / sizes, x[-1])
+    next_y = np.append(np.add.reduceat(y[1:-1], edges[:-1] - 1) / sizes, y[-1])
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    chosen = 0
+    for i in range(points - 2):
+        start, end = edges[i], edges[i + 1]
+        area = np.abs(
+            (x[chosen] - next_x[i + 1]) * (y[start:end] - y[chosen])
+            - (x[chosen] - x[start:end]) * (next_y[i + 1] - y[chosen])
+        )
+        chosen = start + int(np.argmax(area))
+        selected[i + 1] = chosen
+    return selected
+
+
+def minmax(y: np.ndarray, points: int) -> np.ndarray:
+    """
+    Indices of the smallest and largest sample of ``points // 2`` buckets.
+
+    Buckets are consecutive runs of samples of (nearly) equal length, one per
+    pair of output points, so every spike survives. Fully vectorized.
+    """
+    n = len(y)
+    buckets = points // 2
+    if points >= n or buckets < 1:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    width = -(-n // buckets)
+    padded = np.full(buckets * width, np.nan)
+    padded[:n] = y
+    grid = padded.reshape(buckets, width)
+    # Missing values and padding never win.
+    lows = np.where(np.isnan(grid), np.inf, grid).argmin(axis=1)
+    highs = np.where(np.isnan(grid), -np.inf, grid).argmax(axis=1)
+    offsets = np.arange(buckets) * width
+    indices = np.unique(np.concatenate((offsets + lows, offsets + highs)))
+    return indices[indices < n]
+
+
+def downsample_series(
+    series: Dict[str, list], points: int, method: str = "lttb"
+) -> Dict[str, object]:
+    """
+    Reduce a ``query_stats`` style series to about ``points`` records.
+
+    Every column is reduced to the same records, chosen by ``method`` from
+    ``labels`` (timestamps) and ``durations``. A ``summary`` of the full
+    series (``count``, ``mean_ms``, ``errors``) is added, since totals can no
+    longer be computed from the reduced records.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method {method!r}")
+    durations = np.array(
+        [np.nan if d is None else d for d in series["durations"]], dtype=float
+    )
+    if method == "lttb":
+        labels = series["labels"]
+        seconds = np.fromiter(
+            ((label - _EPOCH).total_seconds() for label in labels), float, len(labels)
+        )
+        indices = lttb(seconds, durations, points)
+    else:
+        indices = minmax(durations, points)
+
+    mean_ms: Optional[float] = None
+    if np.any(~np.isnan(durations)):
+        mean_ms = float(np.nanmean(durations))
+    reduced: Dict[str, object] = {
+        name: [values[i] for i in indices] for name, values in series.items()
+    }
+    reduced["summary"] = {
+        "count": len(durations),
+        "mean_ms": mean_ms,
+        "errors": sum(1 for event in series.get("events", ()) if event == "error"),
+    }
+    return reduced
@@ -0,0 +1,215 @@
+import gzip
+import importlib
+import json
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_ALIASES = (MSGPACK, "application/x-msgpack")
+
+#: Bodies smaller than this are sent uncompressed.
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 5
+
+
+@lru_cache(maxsize=None)
+def _optional(name: str):
+    """The module ``name``, or None when it is not installed."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+class Representation(NamedTuple):
+    """
+    How a response is laid out and encoded.
+
+    Attributes:
+        columnar (bool): Send records as :func:`columnar` columns.
+        media_type (str): ``application/json`` or ``application/msgpack``.
+        encoding (Optional[str]): ``br`` or ``gzip`` to compress large bodies.
+    """
+
+    columnar: bool = False
+    media_type: str = JSON
+    encoding: Optional[str] = None
+
+
+class Encoded(NamedTuple):
+    body: bytes
+    media_type: str
+    #: Content coding actually applied; None for small bodies.
+    encoding: Optional[str]
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps_json(data: Any) -> bytes:
+    """
+    Compact UTF-8 JSON as FastAPI would send it, with datetimes in ISO 8601.
+
+    Uses orjson when it is installed, which is several times faster than the
+    standard library for large responses.
+    """
+    orjson = _optional("orjson")
+    if orjson is not None:
+        return orjson.dumps(data, default=_json_default)
+    return json.dumps(
+        data,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+        default=_json_default,
+    ).encode("utf-8")
+
+
+def dumps_msgpack(data: Any) -> bytes:
+    """MessagePack encoding of ``data``; requires msgpack."""
+    msgpack = _optional("msgpack")
+    if msgpack is None:
+        raise ImportError(
+            "MessagePack responses require msgpack: "
+            "pip install 'pyquerytracker[msgpack]'"
+        )
+    return msgpack.packb(data, default=_json_default, use_bin_type=True)
+
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = _EPOCH.replace(tzinfo=timezone.utc)
+_MILLISECOND = timedelta(milliseconds=1)
+
+
+def _epoch_ms(value: datetime) -> int:
+    # Timestamps are stored as naive UTC.
+    epoch = _EPOCH if value.tzinfo is None else _EPOCH_UTC
+    return (value - epoch) // _MILLISECOND
+
+
+def _column(values: list) -> Union[list, dict]:
+    present = [value for value in values if value is not None]
+    if present and all(isinstance(value, datetime) for value in present):
+        return {
+            "epoch_ms": [
+                None if value is None else _epoch_ms(value) for value in values
+            ]
+        }
+    if present and all(isinstance(value, float) for value in present):
+        return [None if value is None else round(value, 3) for value in values]
+    if present and all(isinstance(value, str) for value in present):
+        codes: Dict[Optional[str], int] = {}
+        indexes = [codes.setdefault(value, len(codes)) for value in values]
+        return {"dictionary": list(codes), "codes": indexes}
+    return values
+
+
+def columnar(data: Union[List[dict], Dict[str, list]]) -> dict:
+    """
+    Compact column-oriented form of a list of records or a dict of columns.
+
+    Each column is one of:
+
+    - a plain list of values, with floats rounded to three decimals
+      (microseconds for the ``*_ms`` durations);
+    - ``{"epoch_ms": [...]}`` for timestamps, as integer milliseconds since
+      the Unix epoch (UTC);
+    - ``{"dictionary": [...], "codes": [...]}`` for strings, where value
+      ``i`` is ``dictionary[codes[i]]``. Function names and events repeat on
+      every row, so each distinct string is sent once.
+
+    The result is ``{"count": <rows>, "columns": {<name>: <column>}}``. Other
+    entries of a dict, such as a ``summary``, are passed through unchanged.
+    """
+    extra = {}
+    if isinstance(data, list):
+        names: Dict[str, None] = {}
+        for row in data:
+            names.update(dict.fromkeys(row))
+        columns = {name: [row.get(name) for row in data] for name in names}
+    else:
+        columns = {}
+        for name, values in data.items():
+            if isinstance(values, list):
+                columns[name] = values
+            else:
+                extra[name] = values
+    count = len(next(iter(columns.values()), []))
+    return {
+        "count": count,
+        "columns": {name: _column(values) for name, values in columns.items()},
+        **extra,
+    }
+
+
+def _accepted(header: Optional[str]) -> Dict[str, float]:
+    """Tokens of an ``Accept`` style header mapped to their quality."""
+    accepted = {}
+    for item in (header or "").split(","):
+        token, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if token:
+            accepted[token.lower()] = quality
+    return accepted
+
+
+def negotiate(
+    accept: Optional[str] = None,
+    accept_encoding: Optional[str] = None,
+    columnar_layout: bool = False,
+) -> Representation:
+    """
+    The representation to send for the given request headers.
+
+    MessagePack is chosen when the client accepts it and msgpack is
+    installed, Brotli over gzip when the client accepts it and brotli is
+    installed. Anything else gets plain JSON.
+    """
+    media_type = JSON
+    types = _accepted(accept)
+    if any(types.get(alias, 0) > 0 for alias in MSGPACK_ALIASES):
+        if _optional("msgpack") is not None:
+            media_type = MSGPACK
+
+    encoding = None
+    codings = _accepted(accept_encoding)
+    wildcard = codings.get("*", 0)
+    if codings.get("br", wildcard) > 0 and _optional("brotli") is not None:
+        encoding = "br"
+    elif codings.get("gzip", wildcard) > 0:
+        encoding = "gzip"
+    return Representation(columnar_layout, media_type, encoding)
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return _optional("brotli").compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output, and so the ETag, stable for the same body.
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def encode(data: Any, representation: Representation = Representation()) -> Encoded:
+    """Serialize (and compress) ``data`` as ``representation`` asks."""
+    if representation.columnar:
+        data = columnar(data)
+    if representation.media_type == MSGPACK:
+        body = dumps_msgpack(data)
+    else:
+        body = dumps_json(data)
+    encoding = representation.encoding
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return Encoded(body, representation.media_type, None)
+    return Encoded(_compress(body, encoding), representation.media_type, encoding)
@@ -0,0 +1,159 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import List, NamedTuple, Optional, Tuple
+
+from pyquerytracker.config import get_config
+
+#: Distinct fingerprints kept; the least recently seen is dropped beyond this.
+MAX_ERROR_GROUPS = 1000
+
+# (function label, exception type, "file:line" where it was raised)
+Fingerprint = Tuple[str, str, str]
+
+
+def _type_name(error: BaseException) -> str:
+    cls = type(error)
+    if cls.__module__ == "builtins":
+        return cls.__qualname__
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def _location(error: BaseException) -> str:
+    # The innermost frame is where the exception was raised. Walking the
+    # chain is cheap; nothing is formatted.
+    tb = error.__traceback__
+    if tb is None:
+        return "<unknown>"
+    while tb.tb_next is not None:
+        tb = tb.tb_next
+    return f"{tb.tb_frame.f_code.co_filename}:{tb.tb_lineno}"
+
+
+def fingerprint(label: str, error: BaseException) -> Fingerprint:
+    """What makes two failures "the same error", regardless of the message."""
+    return (label, _type_name(error), _location(error))
+
+
+class ErrorGroup:
+    """
+    Failures sharing one fingerprint.
+
+    Attributes:
+        fingerprint (Fingerprint): ``(function, exception type, location)``.
+        count (int): Failures seen.
+        first_seen (float): Wall-clock time of the first failure.
+        last_seen (float): Wall-clock time of the latest failure.
+        last_message (str): ``str()`` of the latest exception.
+        suppressed (int): Failures since the last logged traceback.
+    """
+
+    __slots__ = (
+        "fingerprint",
+        "count",
+        "first_seen",
+        "last_seen",
+        "last_message",
+        "suppressed",
+        "_last_logged",
+    )
+
+    def __init__(self, key: Fingerprint, now: float) -> None:
+        self.fingerprint = key
+        self.count = 0
+        self.first_seen = now
+        self.last_seen = now
+        self.last_message = ""
+        self.suppressed = 0
+        self._last_logged: Optional[float] = None
+
+    def add(self, message: str, interval: float) -> Tuple[bool, int]:
+        """
+        Count one failure; returns whether to log its traceback and how many
+        failures went unlogged before it.
+        """
+        self.count += 1
+        self.last_seen = time.time()
+        self.last_message = message
+        now = time.monotonic()
+        if self._last_logged is not None and now - self._last_logged < interval:
+            self.suppressed += 1
+            return False, 0
+        suppressed, self.suppressed = self.suppressed, 0
+        self._last_logged = now
+        return True, suppressed
+
+    def to_dict(self) -> dict:
+        function, error_type, location = self.fingerprint
+        return {
+            "function": function,
+            "error_type": error_type,
+            "location": location,
+            "count": self.count,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "last_message": self.last_message,
+        }
+
+
+class ErrorReport(NamedTuple):
+    group: ErrorGroup
+    #: Whether this failure should be logged with its full traceback.
+    log_traceback: bool
+    #: Failures of the group left unlogged since its previous traceback.
+    suppressed: int
+
+
+class ErrorAggregator:
+    """
+    Counts failures by fingerprint and rate-limits their tracebacks.
+
+    A traceback is formatted and logged for the first failure of a
+    fingerprint and then at most once per ``error_traceback_interval_s``;
+    failures in between are only counted. During an outage that fails
+    thousands of calls per second, each distinct error therefore costs one
+    log entry per interval instead of one formatted traceback per call.
+    """
+
+    def __init__(self) -> None:
+        self._groups: "OrderedDict[Fingerprint, ErrorGroup]" = OrderedDict()
+        self._lock = Lock()
+
+    def record(
+        self, label: str, error: BaseException, message: Optional[str] = None
+    ) -> ErrorReport:
+        """Count a failure of ``label``; ``message`` defaults to ``str(error)``."""
+        key = fingerprint(label, error)
+        interval = get_config().error_traceback_interval_s
+        with self._lock:
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = ErrorGroup(key, time.time())
+                if len(self._groups) > MAX_ERROR_GROUPS:
+                    self._groups.popitem(last=False)
+            else:
+                self._groups.move_to_end(key)
+            log_traceback, suppressed = group.add(
+                str(error) if message is None else message, interval
+            )
+        return ErrorReport(group, log_traceback, suppressed)
+
+    def snapshot(self) -> List[dict]:
+        """Every group, most frequent first."""
+        with self._lock:
+            groups = [group.to_dict() for group in self._groups.values()]
+        groups.sort(key=lambda group: -group["count"])
+        return groups
+
+    def clear(self) -> None:
+        with self._lock:
+            self._groups.clear()
+
+
+#: Process-wide aggregator fed by every failed tracked call.
+error_groups = ErrorAggregator()
+
+
+def get_error_groups() -> List[dict]:
+    """Failures of tracked calls grouped by function, type and location."""
+    return error_groups.snapshot()
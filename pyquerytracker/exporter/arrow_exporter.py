@@ -0,0 +1,167 @@
+import os
+from threading import Lock
+from typing import Iterable, List
+
+from pyquerytracker.config import ExportType
+from pyquerytracker.exporter.base import Exporter
+from pyquerytracker.selfmetrics import self_metrics
+from pyquerytracker.utils.logger import QueryLogger
+
+logger = QueryLogger.get_logger()
+
+# Low-cardinality columns stored as dictionary-encoded strings.
+DICTIONARY_COLUMNS = ("function_name", "class_name", "event")
+STRING_COLUMNS = ("func_args", "func_kwargs", "error")
+FLOAT_COLUMNS = (
+    "duration_ms",
+    "time_to_first_item_ms",
+    "iteration_time_ms",
+    "consumer_time_ms",
+    "cpu_time_ms",
+    "running_ms",
+    "suspended_ms",
+)
+INT_COLUMNS = ("item_count", "alloc_bytes", "alloc_peak_bytes")
+
+
+def _import_pyarrow():
+    try:
+        # pylint: disable=import-outside-toplevel
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError(
+            "The Parquet/Arrow exporters require pyarrow: "
+            "pip install 'pyquerytracker[arrow]'"
+        ) from e
+    return pyarrow
+
+
+def record_schema(pa):
+    """Arrow schema of a tracked-call record."""
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema(
+        [pa.field("timestamp", pa.timestamp("us", tz="UTC"))]
+        + [pa.field(name, dictionary) for name in DICTIONARY_COLUMNS]
+        + [pa.field(name, pa.float64()) for name in FLOAT_COLUMNS]
+        + [pa.field(name, pa.int64()) for name in INT_COLUMNS]
+        + [pa.field(name, pa.string()) for name in STRING_COLUMNS]
+    )
+
+
+def _free_path(path: str) -> str:
+    """``path`` if unused, else the first free ``<stem>.<n><ext>`` next to it."""
+    if not os.path.exists(path):
+        return path
+    stem, ext = os.path.splitext(path)
+    n = 1
+    while os.path.exists(f"{stem}.{n}{ext}"):
+        n += 1
+    return f"{stem}.{n}{ext}"
+
+
+class ArrowExporter(Exporter):  # pylint: disable=too-many-instance-attributes
+    """
+    Writes records in columnar batches as Parquet or as an Arrow IPC stream.
+
+    Records are buffered and written ``export_row_group_size`` at a time, one
+    Parquet row group (or Arrow record batch) per write; ``flush`` writes a
+    shorter final group. ``function_name``, ``class_name`` and ``event`` are
+    dictionary encoded and the file is compressed with ``export_compression``.
+
+    Neither format can be appended to once closed, so the file is complete
+    after :meth:`close`. When ``export_path`` already exists, a numbered file
+    next to it is written instead (``queries.1.parquet``, ...).
+    """
+
+    def __init__(self, config):
+        super().__init__(config)
+        self._pa = _import_pyarrow()
+        self.schema = record_schema(self._pa)
+        self.path = None
+        self.row_group_size = config.export_row_group_size
+        self._lock = Lock()
+        self._buffer: List[dict] = []
+        self._writer = None
+        self._size = 0
+
+    @property
+    def _compression(self):
+        codec = self.config.export_compression
+        return None if codec in (None, "none") else codec
+
+    def append(self, data: dict) -> None:
+        self.extend([data])
+
+    def extend(self, records: Iterable[dict]) -> None:
+        with self._lock:
+            self._buffer.extend(records)
+            size = self.row_group_size
+            while len(self._buffer) >= size:
+                group = self._buffer[:size]
+                del self._buffer[:size]
+                self._write(group)
+
+    def to_batch(self, records: List[dict]):
+        """Convert records to an Arrow record batch with :func:`record_schema`."""
+        pa = self._pa
+        columns = []
+        for field in self.schema:
+            values = [r.get(field.name) for r in records]
+            if pa.types.is_dictionary(field.type):
+                column = pa.array(values, type=pa.string()).dictionary_encode()
+            else:
+                column = pa.array(values, type=field.type)
+            columns.append(column)
+        return pa.RecordBatch.from_arrays(columns, schema=self.schema)
+
+    def _open(self):
+        pa = self._pa
+        os.makedirs(os.path.dirname(self.config.export_path) or ".", exist_ok=True)
+        self.path = _free_path(self.config.export_path)
+        if self.config.export_type == ExportType.ARROW:
+            options = pa.ipc.IpcWriteOptions(compression=self._compression)
+            return pa.ipc.new_stream(self.path, self.schema, options=options)
+        return pa.parquet.ParquetWriter(
+            self.path,
+            self.schema,
+            compression=self._compression or "none",
+            use_dictionary=list(DICTIONARY_COLUMNS),
+        )
+
+    def _count_bytes(self) -> None:
+        size = os.path.getsize(self.path)
+        self_metrics.add("bytes_written.ArrowExporter", size - self._size)
+        self._size = size
+
+    def _write(self, records: List[dict]) -> None:
+        if self._writer is None:
+            self._writer = self._open()
+            self._size = 0
+        batch = self.to_batch(records)
+        if self.config.export_type == ExportType.ARROW:
+            self._writer.write_batch(batch)
+        else:
+            self._writer.write_table(
+                self._pa.Table.from_batches([batch]),
+                row_group_size=self.row_group_size,
+            )
+        self._count_bytes()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._buffer:
+                return
+            count = len(self._buffer)
+            self._write(self._buffer)
+            self._buffer = []
+        logger.info("Flushed %d logs to %s", count, self.path)
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+                self._count_bytes()
@@ -1,12 +1,30 @@
+import hashlib
 from abc import ABC, abstractmethod
+from typing import Iterable
 
 from pyquerytracker.config import Config
 
 
 class Exporter(ABC):
+    #: Set by exporters that queue and batch records themselves; the export
+    #: pipeline then calls them directly instead of through a sink queue.
+    batching = False
+    #: Set by exporters whose ``extend`` has stored the records durably once
+    #: it returns, so a spool consumer can commit without a ``flush``.
+    durable = False
+
     def __init__(self, config: Config):
         self.config = config
 
+    @property
+    def spool_name(self) -> str:
+        """Name of this sink's checkpoint in the spool; stable across restarts."""
+        name = type(self).__name__
+        path = self.config.export_path
+        if path:
+            name += "-" + hashlib.sha1(path.encode("utf-8")).hexdigest()[:12]
+        return name
+
     @abstractmethod
     def append(self, data: dict) -> None:
         pass
@@ -15,11 +33,30 @@ class Exporter(ABC):
     def flush(self) -> None:
         pass
 
+    def extend(self, records: Iterable[dict]) -> None:
+        """Append several records; override when a batch can be written at once."""
+        for data in records:
+            self.append(data)
+
+    def close(self) -> None:
+        """Flush and release resources; called once when the pipeline shuts down."""
+        self.flush()
+
+    def stats(self) -> dict:
+        """Queue and delivery counters for self-monitoring; see ``selfmetrics``."""
+        return {"name": type(self).__name__}
+
 
 class NullExporter:
 
     def append(self, log_data):
         pass
 
+    def extend(self, records):
+        pass
+
+    def close(self):
+        pass
+
     def flush(self):
         pass
@@ -0,0 +1,207 @@
+import os
+import struct
+import time
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from pyquerytracker.exporter.base import Exporter
+from pyquerytracker.selfmetrics import self_metrics
+from pyquerytracker.utils.logger import QueryLogger
+
+logger = QueryLogger.get_logger()
+
+MAGIC = b"PQTLOG1\0"
+
+#: Fixed-width record: timestamp (µs since the epoch, UTC), duration_ms,
+#: function id, class id (``NO_STRING`` when absent), event code, padding.
+RECORD = struct.Struct("<qdiiB7x")
+NO_STRING = -1
+
+EVENT_CODES = {"normal_execution": 0, "slow_execution": 1, "error": 2}
+EVENT_NAMES = {code: name for name, code in EVENT_CODES.items()}
+UNKNOWN_EVENT = 255
+
+_LENGTH = struct.Struct("<I")
+
+
+def _timestamp_us(value) -> int:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1_000_000)
+    return int(time.time() * 1_000_000)
+
+
+def _read_strings(path: str) -> List[str]:
+    strings: List[str] = []
+    if not os.path.exists(path):
+        return strings
+    with open(path, "rb") as f:
+        data = f.read()
+    pos = 0
+    while pos + _LENGTH.size <= len(data):
+        (length,) = _LENGTH.unpack_from(data, pos)
+        start = pos + _LENGTH.size
+        end = start + length
+        if end > len(data):
+            break  # torn write at the end of the table
+        strings.append(data[start:end].decode("utf-8"))
+        pos = end
+    return strings
+
+
+class BinaryLogExporter(Exporter):
+    """
+    Appends records to a compact binary log with no text serialization.
+
+    ``export_path`` holds an 8-byte magic header followed by fixed-width
+    :data:`RECORD` entries; function and class names are interned into a
+    length-prefixed string table in ``<export_path>.strings`` and stored as
+    ids. Arguments and error messages are not kept. New strings are written
+    to the table before the records that use them, so a reader never sees an
+    id it cannot resolve. Use :func:`read_binary_log` to scan the file.
+    """
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.path = config.export_path
+        self.strings_path = self.path + ".strings"
+        self._lock = Lock()
+        self._ids: Dict[str, int] = {
+            s: i for i, s in enumerate(_read_strings(self.strings_path))
+        }
+        self._new_strings: List[str] = []
+        self._pending = bytearray()
+        self._file = None
+
+    def _intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = self._ids[value] = len(self._ids)
+            self._new_strings.append(value)
+        return string_id
+
+    def append(self, data: dict) -> None:
+        self.extend([data])
+
+    def extend(self, records: Iterable[dict]) -> None:
+        with self._lock:
+            for data in records:
+                self._pending += RECORD.pack(
+                    _timestamp_us(data.get("timestamp")),
+                    data.get("duration_ms") or 0.0,
+                    self._intern(data.get("function_name")),
+                    self._intern(data.get("class_name")),
+                    EVENT_CODES.get(data.get("event"), UNKNOWN_EVENT),
+                )
+            if len(self._pending) >= 1 << 16:
+                self._write()
+
+    def _open(self):
+        f = open(self.path, "ab")  # pylint: disable=consider-using-with
+        if f.tell() == 0:
+            f.write(MAGIC)
+        return f
+
+    def _write(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if self._new_strings:
+            with open(self.strings_path, "ab") as f:
+                start = f.tell()
+                for value in self._new_strings:
+                    encoded = value.encode("utf-8")
+                    f.write(_LENGTH.pack(len(encoded)) + encoded)
+                self_metrics.add("bytes_written.BinaryLogExporter", f.tell() - start)
+            self._new_strings = []
+        if self._pending:
+            if self._file is None:
+                self._file = self._open()
+            self._file.write(self._pending)
+            self_metrics.add("bytes_written.BinaryLogExporter", len(self._pending))
+            self._pending = bytearray()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._write()
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class BinaryLog(NamedTuple):
+    """
+    A memory-mapped binary log.
+
+    Attributes:
+        records: NumPy structured array (a read-only view of the file) with
+            fields ``timestamp_us``, ``duration_ms``, ``function_id``,
+            ``class_id`` and ``event``.
+        strings: Interned names; ``strings[record["function_id"]]``.
+    """
+
+    records: Any
+    strings: List[str]
+
+    def function_names(self):
+        """Decoded ``function_name`` of every record (an object array)."""
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        return np.asarray(self.strings, dtype=object)[self.records["function_id"]]
+
+
+def record_dtype():
+    """NumPy dtype matching :data:`RECORD`."""
+    import numpy as np  # pylint: disable=import-outside-toplevel
+
+    return np.dtype(
+        {
+            "names": [
+                "timestamp_us",
+                "duration_ms",
+                "function_id",
+                "class_id",
+                "event",
+            ],
+            "formats": ["<i8", "<f8", "<i4", "<i4", "u1"],
+            "offsets": [0, 8, 16, 20, 24],
+            "itemsize": RECORD.size,
+        }
+    )
+
+
+def read_binary_log(path: str) -> BinaryLog:
+    """
+    Memory-map a log written by :class:`BinaryLogExporter`.
+
+    Nothing is copied: the returned records are a view of the file, so even
+    very large logs can be filtered and aggregated with NumPy at memory
+    bandwidth. A partially written trailing record is ignored. Requires NumPy.
+    """
+    try:
+        import numpy as np  # pylint: disable=import-outside-toplevel
+    except ImportError as e:
+        raise ImportError(
+            "Reading binary logs requires numpy: pip install 'pyquerytracker[numpy]'"
+        ) from e
+
+    dtype = record_dtype()
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a pyquerytracker binary log")
+    count = (os.path.getsize(path) - len(MAGIC)) // dtype.itemsize
+    if count == 0:
+        records = np.empty(0, dtype=dtype)
+    else:
+        records = np.memmap(
+            path, dtype=dtype, mode="r", offset=len(MAGIC), shape=(count,)
+        )
+    return BinaryLog(records, _read_strings(path + ".strings"))
@@ -1,22 +1,45 @@
-import atexit
 import csv
 import os
 from threading import Lock
 
 from pyquerytracker.exporter.base import Exporter
+from pyquerytracker.resources import RESOURCE_FIELDS
+from pyquerytracker.selfmetrics import self_metrics
 from pyquerytracker.utils.logger import QueryLogger
 
 logger = QueryLogger.get_logger()
 
+# Columns of every record, so that a field first set by a later call (a
+# generator's item count, a sampled CPU time) still has one.
+RECORD_FIELDS = (
+    "timestamp",
+    "event",
+    "function_name",
+    "class_name",
+    "duration_ms",
+    "func_args",
+    "func_kwargs",
+    "error",
+    "time_to_first_item_ms",
+    "item_count",
+    "iteration_time_ms",
+    "consumer_time_ms",
+) + RESOURCE_FIELDS
+
 
 class CsvExporter(Exporter):
     def __init__(self, config):
         super().__init__(config)
         self._lock = Lock()
         self._buffer = []
-        self._header_written = os.path.exists(self.config.export_path)
-        # Ensure logs are flushed when program exits.
-        atexit.register(self.flush)
+        self._fieldnames = self._existing_header()
+
+    def _existing_header(self):
+        """Header of a CSV file we are appending to, or None for a new file."""
+        if not os.path.exists(self.config.export_path):
+            return None
+        with open(self.config.export_path, newline="", encoding="utf-8") as f:
+            return next(csv.reader(f), None)
 
     def append(self, data: dict):
         with self._lock:
@@ -30,23 +53,30 @@ class CsvExporter(Exporter):
 
             os.makedirs(os.path.dirname(self.config.export_path), exist_ok=True)
 
-            # Gather all possible fieldnames (union of keys)
-            all_keys = set()
-            for entry in self._buffer:
-                all_keys.update(entry.keys())
-            fieldnames = sorted(all_keys)  # consistent ordering
+            # The header is fixed by the first flush (or the existing file) so
+            # that every row lines up with it: the record fields, then any
+            # other keys of the first batch. Keys first seen later are dropped.
+            write_header = self._fieldnames is None
+            if write_header:
+                other_keys = set()
+                for entry in self._buffer:
+                    other_keys.update(entry.keys())
+                other_keys.difference_update(RECORD_FIELDS)
+                self._fieldnames = list(RECORD_FIELDS) + sorted(other_keys)
+            fieldnames = self._fieldnames
 
             with open(self.config.export_path, "a", newline="", encoding="utf-8") as f:
+                start = f.tell()
                 writer = csv.DictWriter(f, fieldnames=fieldnames)
 
-                if not self._header_written:
+                if write_header:
                     writer.writeheader()
-                    self._header_written = True
 
                 for row in self._buffer:
                     # Fill missing keys with None
                     full_row = {key: row.get(key) for key in fieldnames}
                     writer.writerow(full_row)
 
+                self_metrics.add("bytes_written.CsvExporter", f.tell() - start)
                 logger.info("Flushed %d logs to CSV", len(self._buffer))
                 self._buffer.clear()
@@ -0,0 +1,50 @@
+from sqlalchemy.exc import SQLAlchemyError
+
+from pyquerytracker.db.session import DATABASE_URL, ensure_schema
+from pyquerytracker.db.writer import DBWriter
+from pyquerytracker.exporter.base import Exporter
+from pyquerytracker.utils.logger import QueryLogger
+
+logger = QueryLogger.get_logger()
+
+
+class DBExporter(Exporter):
+    """
+    Persist records to the tracker database, one transaction per batch.
+
+    The schema is created or upgraded on the first batch, on the sink's
+    worker thread, so a database that cannot be opened fails that sink
+    rather than the tracked call. Such a failure is logged once until the
+    database becomes available, and the batch fails like any other write.
+    """
+
+    durable = True
+
+    def __init__(self, config):
+        super().__init__(config)
+        self._unavailable = False
+
+    @property
+    def spool_name(self) -> str:
+        return "DBExporter"
+
+    def _ensure_schema(self) -> None:
+        try:
+            ensure_schema()
+        except SQLAlchemyError as e:
+            if not self._unavailable:
+                self._unavailable = True
+                logger.error("Cannot open the tracker database %s: %s", DATABASE_URL, e)
+            raise
+        self._unavailable = False
+
+    def append(self, data: dict) -> None:
+        self._ensure_schema()
+        DBWriter.save(data)
+
+    def extend(self, records) -> None:
+        self._ensure_schema()
+        DBWriter.save_many(list(records))
+
+    def flush(self) -> None:
+        pass
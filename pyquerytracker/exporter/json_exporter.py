@@ -1,9 +1,9 @@
-import atexit
 import json
 import os
 from threading import Lock
 
 from pyquerytracker.exporter.base import Exporter
+from pyquerytracker.selfmetrics import self_metrics
 from pyquerytracker.utils.logger import QueryLogger
 
 logger = QueryLogger.get_logger()
@@ -15,7 +15,6 @@ class JsonExporter(Exporter):
         self.config = config
         self._lock = Lock()
         self._buffer = []
-        atexit.register(self.flush)
 
     def append(self, data: dict):
         with self._lock:
@@ -42,6 +41,7 @@ class JsonExporter(Exporter):
 
             with open(self.config.export_path, "w", encoding="utf-8") as f:
                 json.dump(existing_data, f, indent=2, default=str)
+                self_metrics.add("bytes_written.JsonExporter", f.tell())
 
             logger.info(f"Flushed {len(self._buffer)} logs to JSON")
             self._buffer.clear()
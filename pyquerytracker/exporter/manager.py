@@ -1,32 +1,177 @@
-from pyquerytracker.config import Config, ExportType
+import importlib
+from dataclasses import replace
+from threading import Lock
+from typing import List, Optional, Tuple, Type
+
+from pyquerytracker.config import Config, ExportType, get_config, on_config_change
 from pyquerytracker.exporter.base import Exporter
-from pyquerytracker.exporter.csv_exporter import CsvExporter
-from pyquerytracker.exporter.json_exporter import JsonExporter
+from pyquerytracker.exporter.pipeline import ExportPipeline
+from pyquerytracker.exporter.spool import Spool
+from pyquerytracker.selfmetrics import self_metrics
 
 
 class ExporterManager:
-    _exporter: Exporter = None
+    """
+    Owns the process-wide :class:`ExportPipeline` shared by every ``TrackQuery``.
+
+    The pipeline is built lazily from the current config on first use and
+    rebuilt (after flushing the old one) whenever ``configure`` changes the
+    export settings.
+    """
 
+    _pipeline: Optional[ExportPipeline] = None
+    _signature: Optional[tuple] = None
+    _lock = Lock()
+
+    # ``(module, class)`` per export type; a module is only imported once a
+    # sink of its type is created.
     _exporter_classes = {
-        ExportType.CSV: CsvExporter,
-        ExportType.JSON: JsonExporter,
+        ExportType.CSV: ("pyquerytracker.exporter.csv_exporter", "CsvExporter"),
+        ExportType.JSON: ("pyquerytracker.exporter.json_exporter", "JsonExporter"),
+        ExportType.OTLP: ("pyquerytracker.exporter.otlp_exporter", "OtlpExporter"),
+        ExportType.PARQUET: ("pyquerytracker.exporter.arrow_exporter", "ArrowExporter"),
+        ExportType.ARROW: ("pyquerytracker.exporter.arrow_exporter", "ArrowExporter"),
+        ExportType.BINARY: (
+            "pyquerytracker.exporter.binary_exporter",
+            "BinaryLogExporter",
+        ),
     }
 
     @classmethod
-    def create_exporter(cls, config: Config) -> Exporter:
-        exporter_cls = cls._exporter_classes.get(config.export_type)
-        if not exporter_cls:
-            raise ValueError(f"Unsupported export type: {config.export_type}")
-        exporter = exporter_cls(config)
-        cls.set(exporter)
-        return exporter
+    def exporter_class(cls, export_type: ExportType) -> Type[Exporter]:
+        target = cls._exporter_classes.get(export_type)
+        if not target:
+            raise ValueError(f"Unsupported export type: {export_type}")
+        module, name = target
+        return getattr(importlib.import_module(module), name)
+
+    @staticmethod
+    def _db_exporter(config: Config) -> Exporter:
+        # Imports SQLAlchemy and opens the database, so only done when
+        # persistence is actually enabled.
+        # pylint: disable-next=import-outside-toplevel
+        from pyquerytracker.exporter.db_exporter import DBExporter
+
+        return DBExporter(config)
+
+    @classmethod
+    def create_exporter(
+        cls,
+        config: Config,
+        export_type: Optional[ExportType] = None,
+        export_path: Optional[str] = None,
+    ) -> Exporter:
+        export_type = export_type or config.export_type
+        exporter_cls = cls.exporter_class(export_type)
+        if export_path is not None:
+            config = replace(config, export_type=export_type, export_path=export_path)
+        return exporter_cls(config)
+
+    @staticmethod
+    def _targets(config: Config) -> List[Tuple[ExportType, str]]:
+        targets = []
+        if config.export_type and config.export_path:
+            targets.append((config.export_type, config.export_path))
+        targets.extend(config.exporters)
+        return targets
+
+    @classmethod
+    def _signature_of(cls, config: Config) -> tuple:
+        """Settings the pipeline is built from; a change rebuilds it."""
+        return (
+            tuple(cls._targets(config)),
+            config.persist_to_db,
+            config.export_queue_size,
+            config.export_batch_size,
+            config.export_interval_s,
+            config.export_timeout_s,
+            config.export_row_group_size,
+            config.export_compression,
+            config.spool_dir,
+            config.spool_segment_bytes,
+            config.spool_max_bytes,
+            config.spool_fsync_interval_s,
+        )
+
+    @staticmethod
+    def _new_pipeline(config: Config) -> ExportPipeline:
+        spool = None
+        if config.spool_dir:
+            spool = Spool(
+                config.spool_dir,
+                config.spool_segment_bytes,
+                config.spool_max_bytes,
+                config.spool_fsync_interval_s,
+            )
+        return ExportPipeline(
+            config.export_queue_size,
+            config.export_batch_size,
+            config.export_timeout_s,
+            spool=spool,
+            flush_interval_s=config.export_interval_s,
+        )
+
+    @classmethod
+    def build_pipeline(cls, config: Config) -> ExportPipeline:
+        pipeline = cls._new_pipeline(config)
+        for export_type, export_path in cls._targets(config):
+            pipeline.add(cls.create_exporter(config, export_type, export_path))
+        if config.persist_to_db:
+            pipeline.add(cls._db_exporter(config))
+        return pipeline
+
+    @classmethod
+    def pipeline(cls) -> ExportPipeline:
+        pipeline = cls._pipeline
+        if pipeline is None:
+            with cls._lock:
+                if cls._pipeline is None:
+                    config = get_config()
+                    cls._pipeline = cls.build_pipeline(config)
+                    cls._signature = cls._signature_of(config)
+                pipeline = cls._pipeline
+        return pipeline
+
+    @classmethod
+    def sink_stats(cls) -> List[dict]:
+        """Queue stats of the active pipeline's sinks (none before first use)."""
+        pipeline = cls._pipeline
+        return pipeline.stats() if pipeline is not None else []
+
+    @classmethod
+    def reset(cls) -> None:
+        """Flush and close the current pipeline; the next use builds a new one."""
+        with cls._lock:
+            pipeline, cls._pipeline, cls._signature = cls._pipeline, None, None
+        if pipeline is not None:
+            pipeline.close()
+
+    @classmethod
+    def handle_config_change(cls, config: Config) -> None:
+        """Rebuild the pipeline if ``config`` changed the export settings."""
+        if cls._pipeline is not None and cls._signature != cls._signature_of(config):
+            cls.reset()
 
     @staticmethod
     def set(exporter: Exporter):
-        ExporterManager._exporter = exporter
+        """Replace the file/collector sinks with ``exporter`` alone."""
+        config = get_config()
+        pipeline = ExporterManager._new_pipeline(config)
+        pipeline.add(exporter)
+        if config.persist_to_db:
+            pipeline.add(ExporterManager._db_exporter(config))
+        ExporterManager.reset()
+        with ExporterManager._lock:
+            ExporterManager._pipeline = pipeline
+            ExporterManager._signature = ExporterManager._signature_of(config)
 
     @staticmethod
-    def get() -> Exporter:
-        if ExporterManager._exporter is None:
+    def get() -> ExportPipeline:
+        pipeline = ExporterManager.pipeline()
+        if not pipeline.exporters:
             raise RuntimeError("Exporter not set")
-        return ExporterManager._exporter
+        return pipeline
+
+
+on_config_change(ExporterManager.handle_config_change)
+self_metrics.register_sinks(ExporterManager.sink_stats)
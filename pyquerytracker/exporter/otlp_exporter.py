@@ -0,0 +1,216 @@
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+import urllib.request
+from typing import Callable, List, Optional, Tuple
+
+from pyquerytracker.exporter.base import Exporter
+from pyquerytracker.selfmetrics import self_metrics
+from pyquerytracker.utils.logger import QueryLogger
+
+logger = QueryLogger.get_logger()
+
+# OTLP span kind / status codes.
+SPAN_KIND_INTERNAL = 1
+STATUS_CODE_OK = 1
+STATUS_CODE_ERROR = 2
+
+# Record fields sent as ``pyquerytracker.<field>`` span attributes when set.
+SPAN_ATTRIBUTES = (
+    "event",
+    "duration_ms",
+    "func_args",
+    "func_kwargs",
+    "cpu_time_ms",
+    "running_ms",
+    "suspended_ms",
+    "alloc_bytes",
+    "alloc_peak_bytes",
+)
+
+Transport = Callable[[bytes, float], None]
+
+
+def _attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def record_to_span(data: dict, end_time_ns: int) -> dict:
+    """Convert a tracked-call record to an OTLP/JSON span."""
+    duration_ns = int((data.get("duration_ms") or 0.0) * 1_000_000)
+    class_name = data.get("class_name")
+    function_name = data.get("function_name")
+    attributes = [_attribute("code.function", function_name)]
+    if class_name:
+        attributes.append(_attribute("code.namespace", class_name))
+    for key in SPAN_ATTRIBUTES:
+        if data.get(key) is not None:
+            attributes.append(_attribute(f"pyquerytracker.{key}", data[key]))
+
+    span = {
+        "traceId": secrets.token_hex(16),
+        "spanId": secrets.token_hex(8),
+        "name": f"{class_name}.{function_name}" if class_name else function_name,
+        "kind": SPAN_KIND_INTERNAL,
+        "startTimeUnixNano": str(end_time_ns - duration_ns),
+        "endTimeUnixNano": str(end_time_ns),
+        "attributes": attributes,
+    }
+    if data.get("event") == "error":
+        span["status"] = {
+            "code": STATUS_CODE_ERROR,
+            "message": str(data.get("error", "")),
+        }
+    else:
+        span["status"] = {"code": STATUS_CODE_OK}
+    return span
+
+
+def http_transport(endpoint: str) -> Transport:
+    """Return a transport posting OTLP/JSON payloads to ``endpoint``."""
+
+    def send(payload: bytes, timeout: float) -> None:
+        request = urllib.request.Request(
+            endpoint,
+            data=payload,
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+
+    return send
+
+
+class OtlpExporter(Exporter):  # pylint: disable=too-many-instance-attributes
+    """
+    Export tracked calls as OpenTelemetry spans over OTLP/HTTP (JSON encoding).
+
+    ``append`` only puts the record on a bounded queue; a background thread
+    converts and posts records in batches of up to ``export_batch_size``,
+    woken when a full batch is queued or every ``export_interval_s`` seconds,
+    with each request bounded by ``export_timeout_s``. Records arriving while
+    the queue is full are dropped and counted in ``dropped``.
+
+    Because it batches on its own, the export pipeline calls it directly rather
+    than through a sink queue, and closes it on shutdown.
+
+    ``config.export_path`` is the collector URL, e.g.
+    ``http://localhost:4318/v1/traces``.
+    """
+
+    batching = True
+
+    def __init__(self, config, transport: Optional[Transport] = None):
+        super().__init__(config)
+        self._queue: "queue.Queue[Tuple[int, dict]]" = queue.Queue(
+            maxsize=config.export_queue_size
+        )
+        self._transport = transport or http_transport(config.export_path)
+        self._export_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._resource = {
+            "attributes": [
+                _attribute(
+                    "service.name",
+                    os.environ.get("OTEL_SERVICE_NAME", "pyquerytracker"),
+                )
+            ]
+        }
+        self.dropped = 0
+        self.failed = 0
+        self.exported = 0
+        self._worker = threading.Thread(
+            target=self._run, name="pyquerytracker-otlp", daemon=True
+        )
+        self._worker.start()
+
+    def append(self, data: dict) -> None:
+        try:
+            self._queue.put_nowait((time.time_ns(), data))
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self._queue.qsize() >= self.config.export_batch_size:
+            self._wakeup.set()
+
+    def _next_batch(self) -> List[Tuple[int, dict]]:
+        batch: List[Tuple[int, dict]] = []
+        while len(batch) < self.config.export_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _export(self, batch: List[Tuple[int, dict]]) -> None:
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": self._resource,
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "pyquerytracker"},
+                            "spans": [
+                                record_to_span(data, end_ns) for end_ns, data in batch
+                            ],
+                        }
+                    ],
+                }
+            ]
+        }
+        body = json.dumps(payload, default=str).encode("utf-8")
+        with self._export_lock:
+            try:
+                self._transport(body, self.config.export_timeout_s)
+                self.exported += len(batch)
+                self_metrics.add("bytes_written.OtlpExporter", len(body))
+            except Exception as e:
+                self.failed += len(batch)
+                logger.error("OTLP export of %d spans failed: %s", len(batch), e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _drain(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                break
+            self._export(batch)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wakeup.wait(self.config.export_interval_s)
+            self._wakeup.clear()
+            self._drain()
+
+    def stats(self) -> dict:
+        return {
+            "name": type(self).__name__,
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "dropped": self.dropped,
+            "exported": self.exported,
+            "failed": self.failed,
+        }
+
+    def flush(self) -> None:
+        """Export everything queued so far and wait for in-flight batches."""
+        self._drain()
+        self._queue.join()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        self.flush()
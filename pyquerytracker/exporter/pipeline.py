@@ -0,0 +1,441 @@
+import atexit
+import queue
+import threading
+import time
+from typing import List, Optional, Union
+
+from pyquerytracker.exporter.base import Exporter
+from pyquerytracker.exporter.spool import Spool, SpoolReader
+from pyquerytracker.selfmetrics import self_metrics
+from pyquerytracker.utils.logger import QueryLogger
+
+logger = QueryLogger.get_logger()
+
+_STOP = object()
+
+# Minimum seconds between two "records dropped" warnings for the same sink.
+DROP_WARNING_INTERVAL_S = 60.0
+
+# Seconds a spooled sink waits between looking for new records, and the
+# bounds of its backoff while the exporter keeps failing.
+SPOOL_POLL_INTERVAL_S = 0.1
+SPOOL_RETRY_MIN_S = 0.5
+SPOOL_RETRY_MAX_S = 30.0
+
+
+class SinkWorker:  # pylint: disable=too-many-instance-attributes
+    """
+    Feeds a single exporter from its own bounded queue on a dedicated thread.
+
+    Records offered while the queue is full are dropped and counted, so a slow
+    or stuck sink only ever loses its own records and never blocks the caller
+    or the other sinks. A warning is logged when drops start, and at most once
+    per ``DROP_WARNING_INTERVAL_S`` after that.
+    """
+
+    def __init__(
+        self,
+        exporter: Exporter,
+        queue_size: int,
+        batch_size: int,
+        timeout_s: float = 10.0,
+    ) -> None:
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.timeout_s = timeout_s
+        self.dropped = 0
+        self.exported = 0
+        self.failed = 0
+        self._warned_at: Optional[float] = None
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"pyquerytracker-{type(exporter).__name__}",
+            daemon=True,
+        )
+        self._thread.start()
+
+    @property
+    def name(self) -> str:
+        return type(self.exporter).__name__
+
+    def offer(self, data: dict) -> None:
+        try:
+            self._queue.put_nowait(data)
+        except queue.Full:
+            self._drop()
+
+    def _drop(self) -> None:
+        self.dropped += 1
+        now = time.monotonic()
+        if self._warned_at is None or now - self._warned_at >= DROP_WARNING_INTERVAL_S:
+            self._warned_at = now
+            logger.warning(
+                "%s is falling behind: queue full, %d records dropped so far",
+                self.name,
+                self.dropped,
+            )
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "queue_depth": self.depth,
+            "queue_capacity": self._queue.maxsize,
+            "dropped": self.dropped,
+            "exported": self.exported,
+            "failed": self.failed,
+        }
+
+    def _run(self) -> None:
+        while True:
+            try:
+                batch = [self._queue.get(timeout=0.1)]
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is _STOP for item in batch)
+            records = [item for item in batch if item is not _STOP]
+            start = time.perf_counter()
+            try:
+                if records:
+                    self.exporter.extend(records)
+                    self.exported += len(records)
+            except Exception as e:
+                self.failed += len(records)
+                logger.error(
+                    "%s failed to accept %d records: %s", self.name, len(records), e
+                )
+            finally:
+                self_metrics.observe(
+                    f"sink_write.{self.name}", time.perf_counter() - start
+                )
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _wait_drained(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if not self._thread.is_alive() or time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def flush(self) -> None:
+        """Wait (up to ``timeout_s``) for queued records, then flush the exporter."""
+        if not self._wait_drained(self.timeout_s):
+            logger.warning(
+                "%s did not drain within %.1fs; flushing what it has",
+                self.name,
+                self.timeout_s,
+            )
+        with self_metrics.timer(f"flush.{self.name}"):
+            self.exporter.flush()
+
+    def stop(self) -> None:
+        """Ask the worker to exit after the records already queued."""
+        self._stopping.set()
+        try:
+            self._queue.put_nowait(_STOP)
+        except queue.Full:
+            # The worker is stuck or behind; it exits once the queue runs dry.
+            pass
+
+    def join(self, timeout: float) -> None:
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(
+                "%s still busy after %.1fs at shutdown; %d records left unexported",
+                self.name,
+                timeout,
+                self._queue.unfinished_tasks,
+            )
+            return
+        self.exporter.close()
+
+
+class SpoolSinkWorker:  # pylint: disable=too-many-instance-attributes
+    """
+    Feeds a single exporter from the records of a :class:`Spool`.
+
+    Batches of up to ``batch_size`` records are read from the sink's
+    position in the spool and handed to the exporter. The sink's checkpoint
+    is committed once the exporter holds them durably: after every batch for
+    a ``durable`` exporter (the database), otherwise after the exporter's
+    ``flush``, every ``flush_interval_s``. When the exporter fails, the same
+    batch is retried with exponential backoff, and nothing is lost or
+    dropped meanwhile: the records wait in the spool, across restarts too,
+    and are replayed in full batches once the sink is back.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        exporter: Exporter,
+        reader: SpoolReader,
+        batch_size: int,
+        timeout_s: float = 10.0,
+        flush_interval_s: float = 5.0,
+    ) -> None:
+        self.exporter = exporter
+        self.reader = reader
+        self.batch_size = batch_size
+        self.timeout_s = timeout_s
+        self.flush_interval_s = flush_interval_s
+        self.exported = 0
+        self.failed = 0
+        self._batch: List[dict] = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._warned_at: Optional[float] = None
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"pyquerytracker-spool-{type(exporter).__name__}",
+            daemon=True,
+        )
+        self._thread.start()
+
+    @property
+    def name(self) -> str:
+        return type(self.exporter).__name__
+
+    def _deliver(self) -> Optional[bool]:
+        """
+        Hand one batch to the exporter; returns whether there was one, or
+        None if the exporter failed. Called with the lock held.
+        """
+        if not self._batch:
+            self._batch = self.reader.read(self.batch_size)
+            if not self._batch:
+                return False
+        start = time.perf_counter()
+        try:
+            self.exporter.extend(self._batch)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self.failed += 1
+            now = time.monotonic()
+            if (
+                self._warned_at is None
+                or now - self._warned_at >= DROP_WARNING_INTERVAL_S
+            ):
+                self._warned_at = now
+                logger.warning(
+                    "%s failed to accept %d spooled records, will retry: %s",
+                    self.name,
+                    len(self._batch),
+                    e,
+                )
+            return None
+        finally:
+            self_metrics.observe(f"sink_write.{self.name}", time.perf_counter() - start)
+        self.exported += len(self._batch)
+        self._batch = []
+        if self.exporter.durable:
+            self.reader.commit()
+        return True
+
+    def _checkpoint(self) -> bool:
+        """Flush the exporter and commit what it has; called with the lock held."""
+        try:
+            with self_metrics.timer(f"flush.{self.name}"):
+                self.exporter.flush()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.error("%s failed to flush: %s", self.name, e)
+            return False
+        if not self._batch:
+            self.reader.commit()
+        return True
+
+    def _run(self) -> None:
+        delay = 0.0
+        flushed_at = time.monotonic()
+        while True:
+            with self._lock:
+                delivered = self._deliver()
+                now = time.monotonic()
+                if (
+                    not self.exporter.durable
+                    and now - flushed_at >= self.flush_interval_s
+                ):
+                    self._checkpoint()
+                    flushed_at = now
+            if delivered:
+                delay = 0.0
+                continue
+            if self._stopping.is_set():
+                return
+            if delivered is None:
+                delay = min(max(delay * 2, SPOOL_RETRY_MIN_S), SPOOL_RETRY_MAX_S)
+            self._stopping.wait(delay if delivered is None else SPOOL_POLL_INTERVAL_S)
+
+    def offer(self, data: dict) -> None:
+        """Records reach this sink through the spool."""
+
+    @property
+    def depth(self) -> int:
+        return len(self._batch)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "spool_backlog_bytes": self.reader.backlog(),
+            "exported": self.exported,
+            "failed": self.failed,
+        }
+
+    def _wait_caught_up(self, timeout: float) -> bool:
+        end = self.reader.spool.end()
+        deadline = time.monotonic() + timeout
+        while self._batch or self.reader.position < end:
+            if not self._thread.is_alive() or time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def flush(self) -> None:
+        """Wait (up to ``timeout_s``) until the spool is read, then flush and commit."""
+        if not self._wait_caught_up(self.timeout_s):
+            logger.warning(
+                "%s did not catch up with the spool within %.1fs; "
+                "the rest stays spooled",
+                self.name,
+                self.timeout_s,
+            )
+        with self._lock:
+            self._checkpoint()
+
+    def stop(self) -> None:
+        """Ask the worker to exit once it has read the records spooled so far."""
+        self._stopping.set()
+
+    def join(self, timeout: float) -> None:
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(
+                "%s still busy after %.1fs at shutdown; unexported records stay "
+                "spooled",
+                self.name,
+                timeout,
+            )
+            return
+        with self._lock:
+            try:
+                self.exporter.close()
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.error("%s failed to close: %s", self.name, e)
+                return
+            if not self._batch:
+                self.reader.commit()
+        self.reader.close()
+
+
+class ExportPipeline:  # pylint: disable=too-many-instance-attributes
+    """
+    Process-wide fan-out of tracked-call records to several exporters.
+
+    ``append`` hands each record to every sink's queue and returns; delivery
+    to the exporters happens on the sinks' own worker threads. Exporters that
+    already queue and batch on their own (``Exporter.batching``) are called
+    directly instead, so they are not queued twice. The pipeline behaves like a
+    single :class:`Exporter`, so ``flush`` drains every sink.
+
+    With a ``spool``, records are written to it once instead of to in-memory
+    queues, and each sink reads them back through a :class:`SpoolSinkWorker`,
+    so they survive crashes and sink outages.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 2048,
+        batch_size: int = 512,
+        timeout_s: float = 10.0,
+        *,
+        spool: Optional[Spool] = None,
+        flush_interval_s: float = 5.0,
+    ) -> None:
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.timeout_s = timeout_s
+        self.spool = spool
+        self.flush_interval_s = flush_interval_s
+        self.sinks: List[Union[SinkWorker, SpoolSinkWorker]] = []
+        self.direct: List[Exporter] = []
+        self._closed = False
+        atexit.register(self.close)
+
+    def add(self, exporter: Exporter) -> Optional[Union[SinkWorker, SpoolSinkWorker]]:
+        if getattr(exporter, "batching", False):
+            self.direct = self.direct + [exporter]
+            return None
+        sink: Union[SinkWorker, SpoolSinkWorker]
+        if self.spool is not None:
+            sink = SpoolSinkWorker(
+                exporter,
+                self.spool.reader(exporter.spool_name),
+                self.batch_size,
+                self.timeout_s,
+                self.flush_interval_s,
+            )
+        else:
+            sink = SinkWorker(
+                exporter, self.queue_size, self.batch_size, self.timeout_s
+            )
+        self.sinks = self.sinks + [sink]
+        return sink
+
+    @property
+    def exporters(self) -> List[Exporter]:
+        return [sink.exporter for sink in self.sinks] + list(self.direct)
+
+    def append(self, data: dict) -> None:
+        if self.spool is None:
+            for sink in self.sinks:
+                sink.offer(data)
+        elif self.sinks:
+            self.spool.append(data)
+        for exporter in self.direct:
+            exporter.append(data)
+
+    def flush(self) -> None:
+        for sink in self.sinks:
+            sink.flush()
+        for exporter in self.direct:
+            with self_metrics.timer(f"flush.{type(exporter).__name__}"):
+                exporter.flush()
+
+    def stats(self) -> list:
+        return [sink.stats() for sink in self.sinks] + [
+            exporter.stats() for exporter in self.direct
+        ]
+
+    def close(self) -> None:
+        """
+        Stop every sink, then wait for each one with a shared deadline.
+
+        A stuck sink is abandoned after ``timeout_s`` rather than blocking
+        shutdown or the sinks after it.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        for sink in self.sinks:
+            sink.stop()
+        deadline = time.monotonic() + self.timeout_s
+        for sink in self.sinks:
+            sink.join(max(deadline - time.monotonic(), 0.0))
+        for exporter in self.direct:
+            exporter.close()
+        if self.spool is not None:
+            self.spool.close()
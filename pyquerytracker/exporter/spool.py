@@ -0,0 +1,383 @@
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from threading import Lock
+from typing import BinaryIO, List, NamedTuple, Optional, Tuple
+
+from pyquerytracker.encoding import dumps_json
+from pyquerytracker.selfmetrics import self_metrics
+from pyquerytracker.utils.logger import QueryLogger
+
+logger = QueryLogger.get_logger()
+
+#: Frame header: payload length and CRC-32 of the payload, which is the
+#: record as UTF-8 JSON.
+FRAME = struct.Struct("<II")
+SEGMENT_SUFFIX = ".seg"
+CHECKPOINT_SUFFIX = ".checkpoint"
+
+# Minimum seconds between two "spool write failed" warnings.
+WRITE_WARNING_INTERVAL_S = 60.0
+
+
+class Position(NamedTuple):
+    """A point in the spool: segment number and byte offset within it."""
+
+    segment: int
+    offset: int
+
+
+def encode_record(data: dict) -> bytes:
+    """One framed record; raises TypeError for values JSON cannot hold."""
+    payload = dumps_json(data)
+    return FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_record(payload: bytes) -> dict:
+    data = json.loads(payload)
+    timestamp = data.get("timestamp")
+    if isinstance(timestamp, str):
+        data["timestamp"] = datetime.fromisoformat(timestamp)
+    return data
+
+
+class Spool:  # pylint: disable=too-many-instance-attributes
+    """
+    Write-ahead log of records on local disk, read by one or more consumers.
+
+    Records are appended to numbered segment files in ``directory``, each
+    frame checksummed. Every append is written to the operating system at
+    once, so records survive the process crashing. They are fsynced in
+    batches every ``fsync_interval_s`` (or on every append when it is 0),
+    so an operating system crash or power loss loses at most that much.
+
+    A new segment is started when the current one reaches ``segment_bytes``,
+    and by every new :class:`Spool`: the last segment of an earlier run may
+    end in a torn frame, and is never appended to. Segments every consumer
+    has committed past are deleted. When the spool outgrows ``max_bytes``,
+    for example because a sink has been down for long, the oldest segments
+    are deleted even if unread, and the loss is logged.
+
+    Args:
+        directory (str): Directory of the segments and checkpoints.
+        segment_bytes (int): Size at which a new segment is started.
+        max_bytes (int): Total size of the segments kept.
+        fsync_interval_s (float): Seconds between two batched fsyncs.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 16 * 1024 * 1024,
+        max_bytes: int = 1024 * 1024 * 1024,
+        fsync_interval_s: float = 1.0,
+    ) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync_interval_s = fsync_interval_s
+        self.failed = 0
+        self.dropped_segments = 0
+        self._warned_at: Optional[float] = None
+        self._lock = Lock()
+        self._readers: List["SpoolReader"] = []
+        existing = self.segments()
+        self._segment = existing[-1] + 1 if existing else 0
+        self._fd = self._open(self._segment)
+        self._size = 0
+        self._dirty = False
+        self._closed = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if fsync_interval_s > 0:
+            self._thread = threading.Thread(
+                target=self._run, name="pyquerytracker-spool", daemon=True
+            )
+            self._thread.start()
+
+    def path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:016d}{SEGMENT_SUFFIX}")
+
+    def segments(self) -> List[int]:
+        """Numbers of the segments on disk, oldest first."""
+        return sorted(
+            int(name[: -len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.endswith(SEGMENT_SUFFIX) and name[: -len(SEGMENT_SUFFIX)].isdigit()
+        )
+
+    def _open(self, segment: int) -> int:
+        return os.open(self.path(segment), os.O_WRONLY | os.O_CREAT | os.O_APPEND)
+
+    def append(self, data: dict) -> bool:
+        """
+        Add a record; returns False if it could not be written.
+
+        Failures (a full disk, a value JSON cannot hold) are counted and
+        logged, never raised: they must not fail the tracked call.
+        """
+        try:
+            frame = encode_record(data)
+            with self._lock:
+                if self._closed:
+                    return False
+                if self._size and self._size + len(frame) > self.segment_bytes:
+                    self._roll()
+                try:
+                    written = os.write(self._fd, frame)
+                    if written != len(frame):
+                        raise OSError(f"short write ({written} of {len(frame)} bytes)")
+                except OSError:
+                    # Readers wait at a torn frame in the newest segment, so
+                    # move past it.
+                    self._roll()
+                    raise
+                self._size += len(frame)
+                if self.fsync_interval_s > 0:
+                    self._dirty = True
+                else:
+                    os.fsync(self._fd)
+            return True
+        except (OSError, TypeError, ValueError) as e:
+            self._failed(e)
+            return False
+
+    def _failed(self, error: Exception) -> None:
+        self.failed += 1
+        self_metrics.add("spool_write_errors")
+        now = time.monotonic()
+        if self._warned_at is None or now - self._warned_at >= WRITE_WARNING_INTERVAL_S:
+            self._warned_at = now
+            logger.warning(
+                "Could not write to the spool in %s: %s (%d records lost so far)",
+                self.directory,
+                error,
+                self.failed,
+            )
+
+    def _roll(self) -> None:
+        # Called with the lock held.
+        os.fsync(self._fd)
+        os.close(self._fd)
+        self._segment += 1
+        self._fd = self._open(self._segment)
+        self._size = 0
+        self._dirty = False
+        self._enforce_limit()
+
+    def _enforce_limit(self) -> None:
+        sizes = []
+        for segment in self.segments():
+            try:
+                sizes.append((segment, os.path.getsize(self.path(segment))))
+            except FileNotFoundError:
+                pass
+        total = sum(size for _, size in sizes)
+        for segment, size in sizes:
+            if total <= self.max_bytes or segment >= self._segment:
+                break
+            os.remove(self.path(segment))
+            total -= size
+            self.dropped_segments += 1
+            self_metrics.add("spool_segments_dropped")
+            logger.warning(
+                "Spool in %s exceeds %d bytes; dropped unread segment %d (%d bytes)",
+                self.directory,
+                self.max_bytes,
+                segment,
+                size,
+            )
+
+    def sync(self) -> None:
+        """fsync the records appended since the last sync."""
+        with self._lock:
+            if not self._dirty or self._closed:
+                return
+            fd, self._dirty = self._fd, False
+        try:
+            # Outside the lock so appends never wait for the disk. If the
+            # segment was rolled meanwhile, the roll already synced it.
+            os.fsync(fd)
+        except OSError:
+            pass
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.fsync_interval_s):
+            self.sync()
+
+    def end(self) -> Position:
+        """Position just after the last record appended."""
+        with self._lock:
+            return Position(self._segment, self._size)
+
+    def backlog(self, position: Position) -> int:
+        """Bytes of the spool after ``position``."""
+        total = 0
+        for segment in self.segments():
+            if segment >= position.segment:
+                try:
+                    total += os.path.getsize(self.path(segment))
+                except FileNotFoundError:
+                    continue
+                if segment == position.segment:
+                    total -= position.offset
+        return max(total, 0)
+
+    def reader(self, name: str) -> "SpoolReader":
+        """The consumer ``name``, resuming from its last checkpoint."""
+        reader = SpoolReader(self, name)
+        with self._lock:
+            self._readers.append(reader)
+        return reader
+
+    def release(self) -> None:
+        """Delete the segments every consumer has committed past."""
+        with self._lock:
+            if not self._readers:
+                return
+            oldest = min(reader.committed.segment for reader in self._readers)
+            oldest = min(oldest, self._segment)
+        for segment in self.segments():
+            if segment >= oldest:
+                break
+            try:
+                os.remove(self.path(segment))
+            except FileNotFoundError:
+                pass
+
+    def close(self) -> None:
+        self._stop.set()
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            try:
+                os.fsync(self._fd)
+            finally:
+                os.close(self._fd)
+
+
+class SpoolReader:
+    """
+    One consumer's cursor into a :class:`Spool`.
+
+    :meth:`read` moves :attr:`position` forward; :meth:`commit` saves it as
+    the checkpoint ``<name>.checkpoint`` the consumer resumes from after a
+    restart. Records read but not committed are read again then, so delivery
+    is at least once. A consumer without a checkpoint starts at the oldest
+    segment.
+    """
+
+    def __init__(self, spool: Spool, name: str) -> None:
+        self.spool = spool
+        self.name = name
+        self.checkpoint_path = os.path.join(spool.directory, name + CHECKPOINT_SUFFIX)
+        self.committed = self._load()
+        self.position = self.committed
+        self._file: Optional[BinaryIO] = None
+        self._file_segment: Optional[int] = None
+
+    def _load(self) -> Position:
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                segment, offset = json.load(f)
+            return Position(int(segment), int(offset))
+        except (OSError, ValueError, TypeError):
+            segments = self.spool.segments()
+            return Position(segments[0] if segments else 0, 0)
+
+    def _frames(
+        self, segment: int, offset: int, limit: int, records: List[dict]
+    ) -> Tuple[int, bool]:
+        """
+        Read up to ``limit`` records of ``segment`` from ``offset``; returns
+        the new offset and whether valid data ran out before the limit.
+        """
+        if self._file_segment != segment:
+            self.close()
+            try:
+                self._file = open(  # pylint: disable=consider-using-with
+                    self.spool.path(segment), "rb"
+                )
+            except FileNotFoundError:
+                return offset, True
+            self._file_segment = segment
+        f = self._file
+        f.seek(offset)
+        while limit > 0:
+            header = f.read(FRAME.size)
+            if len(header) < FRAME.size:
+                return offset, True
+            length, crc = FRAME.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return offset, True
+            records.append(decode_record(payload))
+            offset += FRAME.size + length
+            limit -= 1
+        return offset, False
+
+    def read(self, max_records: int) -> List[dict]:
+        """Up to ``max_records`` records after :attr:`position`."""
+        records: List[dict] = []
+        segment, offset = self.position
+        while len(records) < max_records:
+            offset, exhausted = self._frames(
+                segment, offset, max_records - len(records), records
+            )
+            if not exhausted:
+                break
+            later = [s for s in self.spool.segments() if s > segment]
+            if not later:
+                break
+            # A segment is final once a later one exists; read it once more
+            # in case it grew between the first read and the listing.
+            offset, exhausted = self._frames(
+                segment, offset, max_records - len(records), records
+            )
+            if not exhausted:
+                break
+            self._skip_tail(segment, offset)
+            segment, offset = later[0], 0
+        self.position = Position(segment, offset)
+        return records
+
+    def _skip_tail(self, segment: int, offset: int) -> None:
+        try:
+            size = os.path.getsize(self.spool.path(segment))
+        except FileNotFoundError:
+            return
+        if size > offset:
+            logger.warning(
+                "Skipping %d bytes of torn or corrupt records at the end of "
+                "spool segment %d",
+                size - offset,
+                segment,
+            )
+
+    def commit(self) -> None:
+        """Save :attr:`position` as the checkpoint."""
+        position = self.position
+        temporary = self.checkpoint_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(list(position), f)
+        # A lost checkpoint only means records are delivered twice, so it is
+        # not fsynced; the rename keeps it whole.
+        os.replace(temporary, self.checkpoint_path)
+        self.committed = position
+        self.spool.release()
+
+    def backlog(self) -> int:
+        """Bytes not yet committed."""
+        return self.spool.backlog(self.committed)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+        self._file_segment = None
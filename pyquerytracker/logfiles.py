@@ -0,0 +1,341 @@
+import csv
+import glob
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from pyquerytracker.exporter.binary_exporter import (
+    EVENT_NAMES,
+    MAGIC,
+    RECORD,
+    read_binary_log,
+)
+from pyquerytracker.utils.stats import FunctionStats
+
+# Size of the byte ranges a single CSV or binary file is split into.
+CHUNK_BYTES = 64 * 1024 * 1024
+
+_READ_SIZE = 1 << 20
+
+# (timestamp, function label, duration_ms, event, error message)
+Row = Tuple[Optional[datetime], str, Optional[float], Optional[str], Optional[str]]
+
+
+class Task(NamedTuple):
+    """A unit of parallel work: ``path`` from ``start`` to ``end``.
+
+    Offsets are bytes for CSV, records for binary logs and row groups for
+    Parquet; ``end`` is None for formats that are read whole.
+    """
+
+    path: str
+    start: int = 0
+    end: Optional[int] = None
+
+
+def _label(function_name, class_name) -> str:
+    return f"{class_name}.{function_name}" if class_name else str(function_name)
+
+
+def _timestamp(value) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _duration(value) -> Optional[float]:
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _row(record: dict) -> Row:
+    return (
+        _timestamp(record.get("timestamp")),
+        _label(record.get("function_name"), record.get("class_name") or None),
+        _duration(record.get("duration_ms")),
+        record.get("event"),
+        record.get("error") or None,
+    )
+
+
+def _csv_lines(path: str, start: int, end: Optional[int]) -> Iterator[str]:
+    """
+    Lines of ``path`` that begin inside ``[start, end)``, header excluded.
+
+    ``start`` must be the start of a record (see :func:`_csv_record_starts`).
+    """
+    with open(path, "rb") as f:
+        if start == 0:
+            f.readline()
+        else:
+            f.seek(start)
+        while end is None or f.tell() < end:
+            line = f.readline()
+            if not line:
+                return
+            yield line.decode("utf-8")
+
+
+def _iter_csv(task: Task) -> Iterator[Row]:
+    with open(task.path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f), None)
+    if not header:
+        return
+    for values in csv.reader(_csv_lines(task.path, task.start, task.end)):
+        yield _row(dict(zip(header, values)))
+
+
+def _iter_json(task: Task) -> Iterator[Row]:
+    """Stream the objects of a JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+    with open(task.path, encoding="utf-8") as f:
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n[,]":
+                pos += 1
+            if pos < len(buf):
+                try:
+                    record, pos = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    if isinstance(record, dict):
+                        yield _row(record)
+                    continue
+            elif eof:
+                return
+            # The next object is incomplete: keep its start and read more.
+            chunk = f.read(_READ_SIZE)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+
+
+def _iter_binary(task: Task) -> Iterator[Row]:
+    log = read_binary_log(task.path)
+    strings = log.strings
+    end = len(log.records) if task.end is None else min(task.end, len(log.records))
+    for start in range(task.start, end, 65536):
+        stop = min(start + 65536, end)
+        chunk = log.records[start:stop].tolist()
+        for ts, duration, function_id, class_id, event in chunk:
+            class_name = strings[class_id] if class_id >= 0 else None
+            timestamp = datetime.fromtimestamp(ts / 1_000_000, timezone.utc)
+            yield (
+                timestamp.replace(tzinfo=None),
+                _label(strings[function_id], class_name),
+                duration,
+                EVENT_NAMES.get(event),
+                None,
+            )
+
+
+def _iter_arrow(task: Task) -> Iterator[Row]:
+    # pylint: disable=import-outside-toplevel
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    if task.path.endswith(".parquet"):
+        parquet = pyarrow.parquet.ParquetFile(task.path)
+        end = parquet.num_row_groups if task.end is None else task.end
+        for batch in parquet.iter_batches(row_groups=range(task.start, end)):
+            yield from (_row(record) for record in batch.to_pylist())
+        return
+    with pyarrow.ipc.open_stream(task.path) as reader:
+        for batch in reader:
+            yield from (_row(record) for record in batch.to_pylist())
+
+
+def iter_rows(task: Task) -> Iterator[Row]:
+    """Stream the rows of one task; the format is chosen by extension."""
+    ext = os.path.splitext(task.path)[1].lower()
+    if ext == ".csv":
+        return _iter_csv(task)
+    if ext == ".json":
+        return _iter_json(task)
+    if ext in (".parquet", ".arrow"):
+        return _iter_arrow(task)
+    return _iter_binary(task)
+
+
+def expand_paths(patterns: Sequence[str]) -> List[str]:
+    """Files named by ``patterns``: plain paths, glob patterns or directories."""
+    paths: List[str] = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        for match in matches:
+            if os.path.isdir(match):
+                paths.extend(
+                    sorted(
+                        os.path.join(match, name)
+                        for name in os.listdir(match)
+                        if not name.endswith(".strings")
+                    )
+                )
+            else:
+                paths.append(match)
+    return paths
+
+
+def _csv_record_starts(path: str, chunk_bytes: int) -> List[int]:
+    """
+    Offsets roughly ``chunk_bytes`` apart at which a record of ``path`` starts.
+
+    A quoted field may contain newlines, so a newline only ends a record when
+    it follows an even number of ``"`` (an escaped quote is doubled, which
+    keeps the parity). Quotes are counted block by block, and newlines are
+    only looked at near each split point.
+    """
+    starts = [0]
+    target = chunk_bytes
+    base = 0
+    quoted = False
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(_READ_SIZE)
+            if not block:
+                return starts
+            pos = 0  # ``quoted`` is the state at ``block[pos]``
+            while target - base < len(block):
+                if target - base > pos:
+                    quoted ^= bool(block.count(b'"', pos, target - base) & 1)
+                    pos = target - base
+                newline = block.find(b"\n", pos)
+                if newline < 0:
+                    break
+                quoted ^= bool(block.count(b'"', pos, newline) & 1)
+                pos = newline + 1
+                if not quoted:
+                    starts.append(base + pos)
+                    target = base + pos + chunk_bytes
+            quoted ^= bool(block.count(b'"', pos) & 1)
+            base += len(block)
+
+
+def plan(paths: Sequence[str], chunk_bytes: int = CHUNK_BYTES) -> List[Task]:
+    """Split the input files into independent tasks of roughly ``chunk_bytes``."""
+    tasks = []
+    for path in paths:
+        ext = os.path.splitext(path)[1].lower()
+        size = os.path.getsize(path)
+        if ext == ".csv":
+            starts = [s for s in _csv_record_starts(path, chunk_bytes) if s < size]
+            starts = starts or [0]
+            tasks.extend(
+                Task(path, start, end)
+                for start, end in zip(starts, starts[1:] + [size])
+            )
+        elif ext == ".parquet":
+            # pylint: disable-next=import-outside-toplevel
+            import pyarrow.parquet
+
+            groups = pyarrow.parquet.ParquetFile(path).num_row_groups
+            per_task = max(1, groups * chunk_bytes // max(size, 1))
+            tasks.extend(
+                Task(path, start, min(start + per_task, groups))
+                for start in range(0, groups, per_task)
+            )
+        elif ext in (".json", ".arrow"):
+            tasks.append(Task(path))
+        else:
+            count = max(size - len(MAGIC), 0) // RECORD.size
+            per_task = max(1, chunk_bytes // RECORD.size)
+            tasks.extend(
+                Task(path, start, min(start + per_task, count))
+                for start in range(0, max(count, 1), per_task)
+            )
+    return tasks
+
+
+class Summary:
+    """
+    Aggregates of a set of rows in memory bounded by the number of distinct
+    functions and time buckets, not by the number of rows.
+
+    Summaries of separate chunks combine with :meth:`merge`, which is what
+    lets :func:`summarize` spread the parsing over several processes.
+    """
+
+    def __init__(self, bucket_s: float = 60.0) -> None:
+        self.bucket_s = bucket_s
+        self.rows = 0
+        self.functions: Dict[str, FunctionStats] = {}
+        # bucket index -> [calls, errors]
+        self.buckets: Dict[int, List[int]] = {}
+
+    def add(self, row: Row) -> None:
+        timestamp, label, duration, event, error = row
+        self.rows += 1
+        stats = self.functions.get(label)
+        if stats is None:
+            stats = self.functions[label] = FunctionStats()
+        stats.add(duration, event, error)
+        if timestamp is not None:
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.replace(tzinfo=timezone.utc)
+            key = int(timestamp.timestamp() // self.bucket_s)
+            bucket = self.buckets.setdefault(key, [0, 0])
+            bucket[0] += 1
+            bucket[1] += event == "error"
+
+    def merge(self, other: "Summary") -> None:
+        self.rows += other.rows
+        for label, stats in other.functions.items():
+            if label in self.functions:
+                self.functions[label].merge(stats)
+            else:
+                self.functions[label] = stats
+        for key, (calls, errors) in other.buckets.items():
+            bucket = self.buckets.setdefault(key, [0, 0])
+            bucket[0] += calls
+            bucket[1] += errors
+
+
+def summarize_task(task: Task, bucket_s: float = 60.0) -> Summary:
+    summary = Summary(bucket_s)
+    for row in iter_rows(task):
+        summary.add(row)
+    return summary
+
+
+def summarize(
+    paths: Sequence[str],
+    bucket_s: float = 60.0,
+    workers: Optional[int] = None,
+    chunk_bytes: int = CHUNK_BYTES,
+) -> Summary:
+    """
+    Stream and aggregate export files, in parallel across processes.
+
+    Large CSV files and binary logs are split into ``chunk_bytes`` ranges and
+    Parquet files into groups of row groups, so a single multi-GB file is
+    parsed by several workers as well.
+    """
+    tasks = plan(paths, chunk_bytes)
+    workers = workers or os.cpu_count() or 1
+    total = Summary(bucket_s)
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            total.merge(summarize_task(task, bucket_s))
+        return total
+    # Loads multiprocessing; only the parallel path needs it.
+    # pylint: disable-next=import-outside-toplevel
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        for summary in pool.map(summarize_task, tasks, [bucket_s] * len(tasks)):
+            total.merge(summary)
+    return total
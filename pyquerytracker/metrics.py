@@ -0,0 +1,331 @@
+import glob
+import mmap
+import os
+import struct
+import weakref
+from functools import partial
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pyquerytracker.config import get_config
+
+# Histogram bucket upper bounds, in seconds.
+DURATION_BUCKETS: Tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    float("inf"),
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_SEP = "\x1f"
+_HEADER = struct.Struct("<I4x")
+_LENGTH = struct.Struct("<I")
+_VALUE = struct.Struct("<d")
+
+
+class InMemoryStore:
+    """Metric values of the current process, held in a dict."""
+
+    def __init__(self) -> None:
+        self._values: Dict[str, float] = {}
+        self._lock = Lock()
+
+    def inc(self, key: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def items(self) -> Iterable[Tuple[str, float]]:
+        with self._lock:
+            return list(self._values.items())
+
+
+class MmapStore:  # pylint: disable=too-many-instance-attributes
+    """
+    Metric values of the current process in a memory-mapped file.
+
+    A store belongs to the process that created it; :class:`MetricsRegistry`
+    opens a fresh one in forked children.
+
+    Each process writes its own ``metrics_<pid>.db`` file in ``directory``;
+    :meth:`collect` sums the values of every file so any worker can serve a
+    scrape covering all of them. Entries are appended as
+    ``<key length><key, padded to 8 bytes><float64 value>`` after an 8 byte
+    header holding the number of used bytes, which is written last so readers
+    never see a half-written entry.
+    """
+
+    _INITIAL_SIZE = 1 << 16
+
+    def __init__(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.path = os.path.join(directory, f"metrics_{os.getpid()}.db")
+        self._lock = Lock()
+        self._positions: Dict[str, int] = {}
+        # pylint: disable=consider-using-with
+        self._file = open(self.path, "a+b")
+        size = max(os.fstat(self._file.fileno()).st_size, self._INITIAL_SIZE)
+        self._file.truncate(size)
+        self._capacity = size
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+        self._used = _HEADER.unpack_from(self._mmap, 0)[0] or _HEADER.size
+        for key, _, pos in _read_entries(self._mmap, self._used):
+            self._positions[key] = pos
+        _HEADER.pack_into(self._mmap, 0, self._used)
+
+    def _grow(self, needed: int) -> None:
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        self._mmap.close()
+        self._file.truncate(capacity)
+        self._capacity = capacity
+        self._mmap = mmap.mmap(self._file.fileno(), capacity)
+
+    def _add_entry(self, key: str) -> int:
+        encoded = key.encode("utf-8")
+        padded = len(encoded) + (-(_LENGTH.size + len(encoded)) % 8)
+        entry_size = _LENGTH.size + padded + _VALUE.size
+        if self._used + entry_size > self._capacity:
+            self._grow(self._used + entry_size)
+        _LENGTH.pack_into(self._mmap, self._used, len(encoded))
+        start = self._used + _LENGTH.size
+        end = start + len(encoded)
+        self._mmap[start:end] = encoded
+        pos = start + padded
+        _VALUE.pack_into(self._mmap, pos, 0.0)
+        self._used += entry_size
+        _HEADER.pack_into(self._mmap, 0, self._used)
+        self._positions[key] = pos
+        return pos
+
+    def inc(self, key: str, amount: float = 1.0) -> None:
+        with self._lock:
+            pos = self._positions.get(key)
+            if pos is None:
+                pos = self._add_entry(key)
+            value = _VALUE.unpack_from(self._mmap, pos)[0]
+            _VALUE.pack_into(self._mmap, pos, value + amount)
+
+    def items(self) -> Iterable[Tuple[str, float]]:
+        with self._lock:
+            return [
+                (key, _VALUE.unpack_from(self._mmap, pos)[0])
+                for key, pos in self._positions.items()
+            ]
+
+    def collect(self) -> Dict[str, float]:
+        """Sum the values written by every process sharing ``directory``."""
+        totals: Dict[str, float] = {}
+        for path in glob.glob(os.path.join(self.directory, "metrics_*.db")):
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) < _HEADER.size:
+                continue
+            used = min(_HEADER.unpack_from(data, 0)[0], len(data))
+            for key, value, _ in _read_entries(data, used):
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+
+def _read_entries(buf, used: int) -> List[Tuple[str, float, int]]:
+    entries = []
+    offset = _HEADER.size
+    while offset + _LENGTH.size <= used:
+        length = _LENGTH.unpack_from(buf, offset)[0]
+        start = offset + _LENGTH.size
+        padded = length + (-(_LENGTH.size + length) % 8)
+        pos = start + padded
+        if pos + _VALUE.size > used:
+            break
+        end = start + length
+        key = bytes(buf[start:end]).decode("utf-8")
+        entries.append((key, _VALUE.unpack_from(buf, pos)[0], pos))
+        offset = pos + _VALUE.size
+    return entries
+
+
+class _FunctionKeys:
+    """Pre-built store keys for one (function, class) pair."""
+
+    __slots__ = ("calls", "errors", "slow", "duration_sum", "buckets")
+
+    def __init__(self, function_name: str, class_name: Optional[str]) -> None:
+        labels = f"{function_name}{_SEP}{class_name or ''}"
+        self.calls = f"calls{_SEP}{labels}{_SEP}"
+        self.errors = f"errors{_SEP}{labels}{_SEP}"
+        self.slow = f"slow{_SEP}{labels}{_SEP}"
+        self.duration_sum = f"duration_sum{_SEP}{labels}{_SEP}"
+        self.buckets = [
+            f"duration_bucket{_SEP}{labels}{_SEP}{_format_value(le)}"
+            for le in DURATION_BUCKETS
+        ]
+
+
+class MetricsRegistry:
+    """
+    Per-function call, error and latency metrics updated at record time.
+
+    Each tracked call increments a handful of counters, so rendering the
+    exposition is proportional to the number of tracked functions and never
+    touches the database.
+
+    Args:
+        directory (Optional[str]): Directory for a multi-process
+            :class:`MmapStore`. Defaults to ``Config.metrics_dir`` or the
+            ``PYQUERYTRACKER_METRICS_DIR`` environment variable; when neither is
+            set, values are kept in memory for this process only.
+    """
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        self._directory = directory
+        self._store = None
+        self._keys: Dict[Tuple[str, Optional[str]], _FunctionKeys] = {}
+        self._lock = Lock()
+        # A forked child must not keep writing through the parent's store
+        # (same mmap file, separate lock), so drop it after every fork.
+        os.register_at_fork(
+            after_in_child=partial(
+                _reset_after_fork, weakref.WeakMethod(self._after_fork)
+            )
+        )
+
+    def _after_fork(self) -> None:
+        self._lock = Lock()
+        self._store = None
+
+    @property
+    def store(self):
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    directory = (
+                        self._directory
+                        or get_config().metrics_dir
+                        or os.environ.get("PYQUERYTRACKER_METRICS_DIR")
+                    )
+                    self._store = MmapStore(directory) if directory else InMemoryStore()
+        return self._store
+
+    def observe(self, log_data: dict) -> None:
+        """Record one tracked call."""
+        function_name = log_data.get("function_name")
+        class_name = log_data.get("class_name")
+        keys = self._keys.get((function_name, class_name))
+        if keys is None:
+            keys = self._keys.setdefault(
+                (function_name, class_name), _FunctionKeys(function_name, class_name)
+            )
+
+        store = self.store
+        seconds = (log_data.get("duration_ms") or 0.0) / 1000
+        store.inc(keys.calls)
+        store.inc(keys.duration_sum, seconds)
+        for le, key in zip(DURATION_BUCKETS, keys.buckets):
+            if seconds <= le:
+                store.inc(key)
+                break
+        event = log_data.get("event")
+        if event == "error":
+            store.inc(keys.errors)
+        elif event == "slow_execution":
+            store.inc(keys.slow)
+
+    def collect(self) -> Dict[str, float]:
+        store = self.store
+        if isinstance(store, MmapStore):
+            return store.collect()
+        return dict(store.items())
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        counters: Dict[str, Dict[Tuple[str, str], float]] = {
+            "calls": {},
+            "errors": {},
+            "slow": {},
+            "duration_sum": {},
+        }
+        buckets: Dict[Tuple[str, str], Dict[str, float]] = {}
+        for key, value in self.collect().items():
+            name, function_name, class_name, le = key.split(_SEP)
+            labels = (function_name, class_name)
+            if name == "duration_bucket":
+                buckets.setdefault(labels, {})[le] = value
+            else:
+                counters[name][labels] = value
+
+        lines: List[str] = []
+        for name, help_text, values in (
+            ("pyquerytracker_calls_total", "Tracked calls.", counters["calls"]),
+            (
+                "pyquerytracker_errors_total",
+                "Tracked calls that raised.",
+                counters["errors"],
+            ),
+            (
+                "pyquerytracker_slow_calls_total",
+                "Tracked calls flagged as slow.",
+                counters["slow"],
+            ),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in sorted(values.items()):
+                lines.append(f"{name}{{{_labels(*labels)}}} {_format_value(value)}")
+
+        name = "pyquerytracker_call_duration_seconds"
+        lines.append(f"# HELP {name} Duration of tracked calls.")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, per_bucket in sorted(buckets.items()):
+            cumulative = 0.0
+            label_text = _labels(*labels)
+            for le in DURATION_BUCKETS:
+                le_text = _format_value(le)
+                cumulative += per_bucket.get(le_text, 0.0)
+                lines.append(
+                    f'{name}_bucket{{{label_text},le="{le_text}"}} '
+                    f"{_format_value(cumulative)}"
+                )
+            lines.append(f"{name}_count{{{label_text}}} {_format_value(cumulative)}")
+            lines.append(
+                f"{name}_sum{{{label_text}}} "
+                f"{_format_value(counters['duration_sum'].get(labels, 0.0))}"
+            )
+        return "\n".join(lines) + "\n"
+
+
+def _reset_after_fork(after_fork: weakref.WeakMethod) -> None:
+    method = after_fork()
+    if method is not None:
+        method()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _labels(function_name: str, class_name: str) -> str:
+    return f'function="{_escape(function_name)}",class="{_escape(class_name)}"'
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+registry = MetricsRegistry()
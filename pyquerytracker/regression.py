@@ -0,0 +1,247 @@
+import math
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from threading import Lock
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from pyquerytracker.db.models import TrackedQuery
+from pyquerytracker.db.session import SessionLocal, ensure_schema
+from pyquerytracker.utils.logger import QueryLogger
+
+logger = QueryLogger.get_logger()
+
+FunctionKey = Tuple[str, Optional[str]]
+
+
+@dataclass
+class Regression:  # pylint: disable=too-many-instance-attributes
+    """
+    A detected upward shift in a function's latency distribution.
+
+    Attributes:
+        function_name (str): Name of the tracked function.
+        class_name (Optional[str]): Owning class, if any.
+        detected_at (datetime): Timestamp of the record that raised the alarm.
+        changed_at (datetime): Estimated start of the shift.
+        baseline_ms (float): Typical latency before the shift (geometric mean).
+        current_ms (float): Typical latency since the shift (geometric mean).
+        ratio (float): ``current_ms / baseline_ms``.
+        samples (int): Records observed since the estimated change point.
+    """
+
+    function_name: str
+    class_name: Optional[str]
+    detected_at: datetime
+    changed_at: datetime
+    baseline_ms: float
+    current_ms: float
+    ratio: float
+    samples: int
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["detected_at"] = self.detected_at.isoformat()
+        data["changed_at"] = self.changed_at.isoformat()
+        return data
+
+
+class _FunctionState:
+    """
+    One-sided CUSUM over log-durations of a single function.
+
+    The in-control mean and variance are exponentially weighted with a small
+    smoothing factor, so a sustained shift is detected long before it is
+    absorbed into the baseline.
+    """
+
+    __slots__ = (
+        "count",
+        "mean",
+        "var",
+        "cusum",
+        "shift_sum",
+        "shift_count",
+        "shift_start",
+    )
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.cusum = 0.0
+        self.shift_sum = 0.0
+        self.shift_count = 0
+        self.shift_start: Optional[datetime] = None
+
+    def learn(self, x: float, alpha: float) -> None:
+        self.count += 1
+        if self.count == 1:
+            self.mean = x
+            return
+        # Welford while warming up, EWMA afterwards.
+        weight = max(1.0 / self.count, alpha)
+        delta = x - self.mean
+        self.mean += weight * delta
+        self.var = (1 - weight) * (self.var + weight * delta * delta)
+
+
+class RegressionDetector:
+    """
+    Incrementally scans ``tracked_queries`` and flags latency regressions.
+
+    Rows are consumed in primary-key order starting after the last row seen, so
+    every call to :meth:`update` only reads records written since the previous
+    one. Detection is a one-sided CUSUM on standardized log-durations per
+    function; an alarm re-baselines the function at its new level so each shift
+    is reported once.
+
+    Args:
+        threshold (float): CUSUM decision interval, in standard deviations.
+        drift (float): Allowed slack per sample, in standard deviations.
+        min_samples (int): Records needed to learn a baseline before alarms.
+        alpha (float): Smoothing factor of the in-control mean and variance.
+        min_ratio (float): Ignore shifts smaller than this latency ratio.
+        batch_size (int): Rows fetched per database round trip.
+        history (int): Number of detected regressions kept in memory.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(
+        self,
+        *,
+        threshold: float = 8.0,
+        drift: float = 0.5,
+        min_samples: int = 30,
+        alpha: float = 0.01,
+        min_ratio: float = 1.2,
+        batch_size: int = 5000,
+        history: int = 100,
+    ) -> None:
+        self.threshold = threshold
+        self.drift = drift
+        self.min_samples = min_samples
+        self.alpha = alpha
+        self.min_ratio = min_ratio
+        self.batch_size = batch_size
+        self.last_id = 0
+        self.regressions: Deque[Regression] = deque(maxlen=history)
+        self._states: Dict[FunctionKey, _FunctionState] = {}
+        self._lock = Lock()
+
+    def observe(
+        self,
+        function_name: str,
+        class_name: Optional[str],
+        duration_ms: float,
+        timestamp: datetime,
+    ) -> Optional[Regression]:
+        """Feed a single record; return a :class:`Regression` if one is detected."""
+        key = (function_name, class_name)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _FunctionState()
+
+        x = math.log(max(duration_ms, 1e-6))
+        if state.count < self.min_samples:
+            state.learn(x, self.alpha)
+            return None
+
+        std = max(math.sqrt(state.var), 0.05)
+        state.cusum = max(0.0, state.cusum + (x - state.mean) / std - self.drift)
+        state.learn(x, self.alpha)
+        if state.cusum == 0.0:
+            state.shift_sum = 0.0
+            state.shift_count = 0
+            state.shift_start = None
+            return None
+
+        if state.shift_start is None:
+            state.shift_start = timestamp
+        state.shift_sum += x
+        state.shift_count += 1
+        if state.cusum < self.threshold:
+            return None
+
+        shifted_mean = state.shift_sum / state.shift_count
+        baseline_ms = math.exp(state.mean)
+        current_ms = math.exp(shifted_mean)
+        regression = None
+        if current_ms / baseline_ms >= self.min_ratio:
+            regression = Regression(
+                function_name=function_name,
+                class_name=class_name,
+                detected_at=timestamp,
+                changed_at=state.shift_start,
+                baseline_ms=baseline_ms,
+                current_ms=current_ms,
+                ratio=current_ms / baseline_ms,
+                samples=state.shift_count,
+            )
+            self.regressions.append(regression)
+
+        # Re-baseline at the new level.
+        state.mean = shifted_mean
+        state.cusum = 0.0
+        state.shift_sum = 0.0
+        state.shift_count = 0
+        state.shift_start = None
+        return regression
+
+    def feed(self, rows: Iterable[tuple]) -> List[Regression]:
+        """
+        Feed ``(id, function_name, class_name, duration_ms, timestamp)`` rows.
+
+        Rows must be in ascending id order; rows at or below the watermark are
+        skipped.
+        """
+        found = []
+        with self._lock:
+            for row_id, function_name, class_name, duration_ms, timestamp in rows:
+                if row_id <= self.last_id:
+                    continue
+                self.last_id = row_id
+                if duration_ms is None:
+                    continue
+                regression = self.observe(
+                    function_name, class_name, duration_ms, timestamp
+                )
+                if regression is not None:
+                    found.append(regression)
+        return found
+
+    def update(self) -> List[Regression]:
+        """Process rows written since the last call and return new regressions."""
+        found: List[Regression] = []
+        session = SessionLocal()
+        try:
+            ensure_schema()
+            while True:
+                stmt = (
+                    select(
+                        TrackedQuery.id,
+                        TrackedQuery.function_name,
+                        TrackedQuery.class_name,
+                        TrackedQuery.duration_ms,
+                        TrackedQuery.timestamp,
+                    )
+                    .where(TrackedQuery.id > self.last_id)
+                    .where(TrackedQuery.event != "error")
+                    .order_by(TrackedQuery.id)
+                    .limit(self.batch_size)
+                )
+                rows = session.execute(stmt).all()
+                found.extend(self.feed(rows))
+                if len(rows) < self.batch_size:
+                    break
+        except SQLAlchemyError as e:
+            logger.error("Regression scan failed: %s", e)
+        finally:
+            session.close()
+        return found
+
+
+detector = RegressionDetector()
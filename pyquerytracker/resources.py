@@ -0,0 +1,120 @@
+import time
+import tracemalloc
+from typing import Any, Coroutine, Dict, Generator, Optional
+
+# Keys of the resource measurements. Every record carries them (as None when
+# not measured) so all records share one schema.
+RESOURCE_FIELDS = (
+    "cpu_time_ms",
+    "running_ms",
+    "suspended_ms",
+    "alloc_bytes",
+    "alloc_peak_bytes",
+)
+
+
+class ResourceUsage:
+    """
+    CPU time and allocations of one call, measured around it.
+
+    CPU time is the calling thread's (:func:`time.thread_time`), so time
+    spent by other threads is not counted; compared with the wall-clock
+    duration it tells a CPU-bound call from one waiting on I/O or locks.
+
+    Allocations are measured with :mod:`tracemalloc`, which is started on
+    first use and then slows down every allocation in the process; sample a
+    small fraction of calls. ``alloc_bytes`` is the growth of traced memory
+    over the call and ``alloc_peak_bytes`` the highest it got above the
+    starting point. Both are process-wide, so concurrent calls on other
+    threads (or other tasks, for coroutines) are included.
+
+    Args:
+        cpu (bool): Measure CPU time.
+        allocations (bool): Measure allocations.
+    """
+
+    __slots__ = ("cpu", "allocations", "cpu_start", "alloc_start")
+
+    def __init__(self, cpu: bool, allocations: bool) -> None:
+        self.cpu = cpu
+        self.allocations = allocations
+        self.alloc_start = 0
+        if allocations:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self.alloc_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self.cpu_start = time.thread_time() if cpu else 0.0
+
+    def finish(self) -> Dict[str, Any]:
+        """The measurements as record fields."""
+        extra: Dict[str, Any] = {}
+        if self.cpu:
+            extra["cpu_time_ms"] = (time.thread_time() - self.cpu_start) * 1000
+        self._add_allocations(extra)
+        return extra
+
+    def _add_allocations(self, extra: Dict[str, Any]) -> None:
+        if self.allocations and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            extra["alloc_bytes"] = current - self.alloc_start
+            extra["alloc_peak_bytes"] = max(peak - self.alloc_start, 0)
+
+    def run(self, coro: Coroutine) -> "TimedCoroutine":
+        """Wrap ``coro`` to also measure its running and suspended time."""
+        return TimedCoroutine(coro, self)
+
+
+class TimedCoroutine:
+    """
+    Awaitable that drives a coroutine step by step and times each step.
+
+    Between two suspensions the coroutine is running; the rest of its
+    wall-clock time it is suspended, waiting for I/O, a lock or its turn on
+    the event loop. CPU time is summed over the steps only, since other
+    tasks run on the same thread while this one is suspended.
+    """
+
+    __slots__ = ("coro", "usage", "running", "cpu")
+
+    def __init__(self, coro: Coroutine, usage: ResourceUsage) -> None:
+        self.coro = coro
+        self.usage = usage
+        self.running = 0.0
+        self.cpu = 0.0
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        coro = self.coro
+        value: Any = None
+        error: Optional[BaseException] = None
+        while True:
+            step = time.perf_counter()
+            cpu = time.thread_time()
+            try:
+                if error is None:
+                    future = coro.send(value)
+                else:
+                    future = coro.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.running += time.perf_counter() - step
+                self.cpu += time.thread_time() - cpu
+            try:
+                value, error = (yield future), None
+            except GeneratorExit:
+                coro.close()
+                raise
+            except BaseException as exc:  # pylint: disable=broad-exception-caught
+                value, error = None, exc
+
+    def finish(self, duration_ms: float) -> Dict[str, Any]:
+        running_ms = self.running * 1000
+        extra: Dict[str, Any] = {
+            "running_ms": running_ms,
+            "suspended_ms": max(duration_ms - running_ms, 0.0),
+        }
+        if self.usage.cpu:
+            extra["cpu_time_ms"] = self.cpu * 1000
+        self.usage._add_allocations(extra)  # pylint: disable=protected-access
+        return extra
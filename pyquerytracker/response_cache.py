@@ -0,0 +1,129 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional
+
+from pyquerytracker.config import get_config
+from pyquerytracker.db.reader import run_read
+from pyquerytracker.encoding import Representation, encode
+from pyquerytracker.selfmetrics import self_metrics
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    created: float
+    media_type: str
+    #: Content coding of ``body``, if compressed.
+    encoding: Optional[str]
+
+
+def _encode(
+    func: Callable[..., Any], args: tuple, representation: Representation
+) -> CachedResponse:
+    encoded = encode(func(*args), representation)
+    digest = hashlib.sha1(encoded.body, usedforsecurity=False).hexdigest()
+    return CachedResponse(
+        encoded.body,
+        f'"{digest[:20]}"',
+        time.monotonic(),
+        encoded.media_type,
+        encoded.encoding,
+    )
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header value matches ``etag``."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """
+    Short-lived cache of JSON-encoded API responses.
+
+    Responses are keyed by endpoint and parameters and reused for
+    ``api_cache_ttl_s`` seconds. Identical requests that arrive while a
+    response is being computed wait for that computation instead of
+    starting their own, so a burst of dashboards asking for the same window
+    costs one database read. Each representation (layout, media type and
+    compression) is cached separately, so compression also happens once per
+    window rather than once per request. Entries are evicted least recently
+    used first once their bodies exceed ``api_cache_max_bytes``.
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(self) -> None:
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._pending: Dict[Hashable, asyncio.Task] = {}
+        self._size = 0
+
+    async def get(
+        self,
+        key: Hashable,
+        func: Callable[..., Any],
+        *args: Any,
+        representation: Representation = Representation(),
+    ) -> CachedResponse:
+        """The response for ``key``, computing ``func(*args)`` on the read pool."""
+        config = get_config()
+        key = (key, representation)
+        entry = self._entries.get(key)
+        if (
+            entry is not None
+            and time.monotonic() - entry.created < config.api_cache_ttl_s
+        ):
+            self._entries.move_to_end(key)
+            self_metrics.add("api_cache_hits")
+            return entry
+
+        task = self._pending.get(key)
+        if task is None:
+            self_metrics.add("api_cache_misses")
+            task = asyncio.ensure_future(self._fill(key, func, args, representation))
+            self._pending[key] = task
+        else:
+            self_metrics.add("api_cache_joined")
+        # Shielded so a disconnecting client does not cancel the others' read.
+        return await asyncio.shield(task)
+
+    async def _fill(
+        self,
+        key: Hashable,
+        func: Callable[..., Any],
+        args: tuple,
+        representation: Representation,
+    ) -> CachedResponse:
+        try:
+            entry = await run_read(_encode, func, args, representation)
+        finally:
+            del self._pending[key]
+        self._store(key, entry)
+        return entry
+
+    def _store(self, key: Hashable, entry: CachedResponse) -> None:
+        max_bytes = get_config().api_cache_max_bytes
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old.body)
+        if len(entry.body) > max_bytes:
+            return
+        self._entries[key] = entry
+        self._size += len(entry.body)
+        while self._size > max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted.body)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,101 @@
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class _Timer:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class SelfMetrics:
+    """
+    Measurements of pyquerytracker's own work.
+
+    Timers accumulate how often and how long each internal stage ran (building
+    a record, logging it, handing it to the export pipeline, sink writes,
+    flushes, database saves); counters hold totals such as bytes written per
+    exporter. Together with the live queue state of the export pipeline they
+    show what tracking costs and whether a sink is falling behind.
+    """
+
+    def __init__(self) -> None:
+        self._timers: Dict[str, _Timer] = {}
+        self._counters: Dict[str, float] = {}
+        self._sink_source: Optional[Callable[[], List[dict]]] = None
+        self._lock = Lock()
+
+    def register_sinks(self, source: Callable[[], List[dict]]) -> None:
+        """Set the callback returning the export sinks' current queue stats."""
+        self._sink_source = source
+
+    def observe(self, name: str, seconds: float) -> None:
+        self.observe_many(((name, seconds),))
+
+    def observe_many(self, timings: Iterable[Tuple[str, float]]) -> None:
+        """Record several ``(stage, seconds)`` timings under one lock."""
+        with self._lock:
+            for name, seconds in timings:
+                timer = self._timers.get(name)
+                if timer is None:
+                    timer = self._timers[name] = _Timer()
+                timer.count += 1
+                timer.total += seconds
+                timer.max = max(timer.max, seconds)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def add(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def reset(self) -> None:
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> dict:
+        """
+        Current values as a JSON-friendly dict.
+
+        ``timers`` maps each stage to its call count, total and maximum time
+        and mean time per call; ``counters`` holds running totals; ``sinks``
+        describes every exporter of the active export pipeline (queue depth
+        and capacity, dropped, exported and failed records).
+        """
+        with self._lock:
+            timers = {
+                name: {
+                    "count": t.count,
+                    "total_ms": t.total * 1000,
+                    "mean_us": t.total / t.count * 1e6 if t.count else 0.0,
+                    "max_ms": t.max * 1000,
+                }
+                for name, t in sorted(self._timers.items())
+            }
+            counters = dict(sorted(self._counters.items()))
+        return {
+            "timers": timers,
+            "counters": counters,
+            "sinks": self._sink_source() if self._sink_source else [],
+        }
+
+
+#: Process-wide instance updated by the tracker, exporters and DB writer.
+self_metrics = SelfMetrics()
+
+
+def get_self_metrics() -> dict:
+    """Snapshot of the tracker's own overhead, queues and throughput."""
+    return self_metrics.snapshot()
@@ -0,0 +1,197 @@
+import atexit
+import threading
+import time
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from pyquerytracker.config import get_config
+from pyquerytracker.utils.logger import QueryLogger
+from pyquerytracker.utils.quantile import LogHistogram
+
+logger = QueryLogger.get_logger()
+
+
+class _SlowCalls:
+    """Token bucket and pending summary of one function's slow calls."""
+
+    __slots__ = (
+        "tokens",
+        "updated",
+        "since",
+        "count",
+        "max_ms",
+        "histogram",
+        "example",
+    )
+
+    def __init__(self, tokens: float, now: float) -> None:
+        self.tokens = tokens
+        self.updated = now
+        self.since = now
+        self.count = 0
+        self.max_ms = 0.0
+        self.histogram = LogHistogram()
+        self.example: Tuple[str, str] = ("", "")
+
+    def refill(self, now: float, burst: int, interval: float) -> None:
+        if interval > 0:
+            self.tokens = min(burst, self.tokens + (now - self.updated) / interval)
+        else:
+            self.tokens = burst
+        self.updated = now
+
+    def add(self, duration: float, example: Tuple[str, str], now: float) -> None:
+        if self.count == 0:
+            self.since = now
+            self.example = example
+            self.histogram = LogHistogram()
+            self.max_ms = 0.0
+        self.count += 1
+        self.histogram.add(duration)
+        if duration > self.max_ms:
+            self.max_ms = duration
+            self.example = example
+
+    def take(self, label: str, now: float) -> dict:
+        summary = {
+            "function": label,
+            "count": self.count,
+            "period_s": now - self.since,
+            "max_ms": self.max_ms,
+            "p99_ms": self.histogram.quantile(0.99),
+            "func_args": self.example[0],
+            "func_kwargs": self.example[1],
+        }
+        self.count = 0
+        return summary
+
+
+class SlowLog:
+    """
+    Rate limiter for slow-call log lines.
+
+    Each function has a token bucket of ``slow_log_burst`` tokens, refilled
+    at one token per ``slow_log_interval_s``. A slow call that gets a token is
+    logged on its own as before. Once the bucket is empty, further slow calls
+    of that function are only summarized: at most one line per interval with
+    their count, maximum and p99 duration and the arguments of the slowest.
+    When a database degrades and every call turns slow, the log therefore
+    grows by a few lines per function per interval instead of one per call.
+
+    Only logging is limited; every slow call is still recorded and exported.
+    Pending summaries are written by a background thread once their interval
+    has passed, or by :meth:`flush`.
+
+    Args:
+        background (bool): Start the thread that writes pending summaries.
+    """
+
+    def __init__(self, background: bool = True) -> None:
+        self._functions: Dict[str, _SlowCalls] = {}
+        self._lock = Lock()
+        self._background = background
+        self._thread: Optional[threading.Thread] = None
+
+    def allow(
+        self,
+        label: str,
+        duration: float,
+        example: Tuple[str, str],
+        now: Optional[float] = None,
+    ) -> bool:
+        """
+        Whether a slow call of ``label`` may be logged on its own.
+
+        When it may not, the call is added to the function's pending summary.
+        ``example`` is the call's ``(func_args, func_kwargs)``.
+        """
+        config = get_config()
+        burst, interval = config.slow_log_burst, config.slow_log_interval_s
+        now = time.monotonic() if now is None else now
+        summary = None
+        with self._lock:
+            calls = self._functions.get(label)
+            if calls is None:
+                calls = self._functions[label] = _SlowCalls(burst, now)
+            else:
+                calls.refill(now, burst, interval)
+            if calls.count and now - calls.since >= interval:
+                summary = calls.take(label, now)
+            if calls.count == 0 and calls.tokens >= 1:
+                calls.tokens -= 1
+                allowed = True
+            else:
+                calls.add(duration, example, now)
+                allowed = False
+                self._ensure_flusher()
+        if summary is not None:
+            _log_summary(summary)
+        return allowed
+
+    def flush(self, force: bool = False, now: Optional[float] = None) -> int:
+        """
+        Write the pending summaries whose interval has passed, or all of them
+        if ``force``; returns how many were written.
+        """
+        interval = get_config().slow_log_interval_s
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            summaries = [
+                calls.take(label, now)
+                for label, calls in self._functions.items()
+                if calls.count and (force or now - calls.since >= interval)
+            ]
+        for summary in summaries:
+            _log_summary(summary)
+        return len(summaries)
+
+    def pending(self) -> List[str]:
+        """Functions with slow calls not yet summarized."""
+        with self._lock:
+            return [label for label, calls in self._functions.items() if calls.count]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._functions.clear()
+
+    def _ensure_flusher(self) -> None:
+        # Called with the lock held.
+        if not self._background:
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="pyquerytracker-slowlog", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(min(1.0, max(get_config().slow_log_interval_s, 0.05)))
+            self.flush()
+            with self._lock:
+                # Ends once nothing is pending; the next suppressed call
+                # starts a new thread.
+                if not any(calls.count for calls in self._functions.values()):
+                    self._thread = None
+                    return
+
+
+def _log_summary(summary: dict) -> None:
+    logger.log(
+        get_config().slow_log_level,
+        "%s -> %d slow executions in %.1fs (max %.2fms, p99 %.2fms); "
+        "slowest args=%s kwargs=%s",
+        summary["function"],
+        summary["count"],
+        summary["period_s"],
+        summary["max_ms"],
+        summary["p99_ms"],
+        summary["func_args"],
+        summary["func_kwargs"],
+        extra={"event": "slow_execution_summary", **summary},
+    )
+
+
+#: Process-wide limiter used by every tracked function.
+slow_log = SlowLog()
+atexit.register(slow_log.flush, True)
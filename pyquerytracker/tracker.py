@@ -1,6 +1,8 @@
 from datetime import datetime, timedelta
 from typing import Any, Dict, List
 
+from pyquerytracker.window import sliding_window
+
 # In-memory store to collect tracked query data
 query_data_store: List[Dict[str, Any]] = []
 
@@ -9,6 +11,7 @@ def store_tracked_query(log: Dict[str, Any]):
     """Store a single tracked query log entry."""
     log["timestamp"] = datetime.utcnow()
     query_data_store.append(log)
+    sliding_window.add(log)
 
 
 def get_tracked_queries(minutes: int) -> List[Dict[str, Any]]:
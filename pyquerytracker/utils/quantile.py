@@ -0,0 +1,176 @@
+import math
+from bisect import bisect_right, insort
+from threading import Lock
+from typing import Dict, List, Optional
+
+
+class P2Quantile:
+    """
+    Streaming quantile estimate using the P² algorithm (Jain & Chlamtac).
+
+    Keeps five markers regardless of how many observations are added, so the
+    memory and per-update cost are constant.
+
+    Args:
+        q (float): Quantile to estimate, between 0 and 1 (e.g. 0.99 for p99).
+    """
+
+    __slots__ = ("q", "count", "_heights", "_pos", "_desired", "_incr")
+
+    def __init__(self, q: float) -> None:
+        if not 0 < q < 1:
+            raise ValueError(f"Quantile must be between 0 and 1, got {q}")
+        self.q = q
+        self.count = 0
+        self._heights: List[float] = []
+        self._pos = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self._desired = [1.0, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5.0]
+        self._incr = [0.0, q / 2, q, (1 + q) / 2, 1.0]
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        h = self._heights
+        if len(h) < 5:
+            insort(h, x)
+            return
+
+        if x < h[0]:
+            h[0] = x
+            k = 0
+        elif x >= h[4]:
+            h[4] = x
+            k = 3
+        else:
+            k = bisect_right(h, x) - 1
+
+        pos = self._pos
+        for i in range(k + 1, 5):
+            pos[i] += 1
+        for i in range(5):
+            self._desired[i] += self._incr[i]
+
+        for i in (1, 2, 3):
+            d = self._desired[i] - pos[i]
+            if (d >= 1 and pos[i + 1] - pos[i] > 1) or (
+                d <= -1 and pos[i - 1] - pos[i] < -1
+            ):
+                step = 1 if d > 0 else -1
+                height = self._parabolic(i, step)
+                if not h[i - 1] < height < h[i + 1]:
+                    height = self._linear(i, step)
+                h[i] = height
+                pos[i] += step
+
+    def _parabolic(self, i: int, d: int) -> float:
+        h, n = self._heights, self._pos
+        return h[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (h[i + 1] - h[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def _linear(self, i: int, d: int) -> float:
+        h, n = self._heights, self._pos
+        return h[i] + d * (h[i + d] - h[i]) / (n[i + d] - n[i])
+
+    @property
+    def value(self) -> Optional[float]:
+        """Current estimate, or ``None`` before any observation."""
+        h = self._heights
+        if not h:
+            return None
+        if self.count < 5:
+            return h[min(int(self.q * len(h)), len(h) - 1)]
+        return h[2]
+
+
+class RollingQuantile:
+    """
+    Quantile of a function's recent history in constant memory.
+
+    Observations go into a :class:`P2Quantile` that is rotated out every
+    ``window`` samples; the estimate is taken from the last complete window, so
+    old history stops influencing the baseline after at most two windows.
+
+    Args:
+        q (float): Quantile to estimate, between 0 and 1.
+        window (int): Number of observations per window.
+        min_samples (int): Observations required before the first estimate is
+            reported from the (still filling) initial window.
+    """
+
+    def __init__(self, q: float, window: int = 1000, min_samples: int = 100) -> None:
+        self.q = q
+        self.window = window
+        self.min_samples = min_samples
+        self._current = P2Quantile(q)
+        self._previous: Optional[P2Quantile] = None
+        self._lock = Lock()
+
+    def add(self, x: float) -> None:
+        with self._lock:
+            self._current.add(x)
+            if self._current.count >= self.window:
+                self._previous = self._current
+                self._current = P2Quantile(self.q)
+
+    @property
+    def value(self) -> Optional[float]:
+        previous = self._previous
+        if previous is not None:
+            return previous.value
+        current = self._current
+        if current.count >= self.min_samples:
+            return current.value
+        return None
+
+
+class LogHistogram:
+    """
+    Mergeable quantile sketch with bounded relative error.
+
+    Values are counted in logarithmic buckets of ratio ``gamma``, so any
+    quantile is reported within ``relative_accuracy`` of the true value and
+    memory grows only with the log of the value range. Histograms built on
+    separate chunks of data can be combined exactly with :meth:`merge`.
+
+    Args:
+        relative_accuracy (float): Maximum relative error of estimates.
+    """
+
+    __slots__ = ("relative_accuracy", "_log_gamma", "buckets", "zeros", "count")
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        self.relative_accuracy = relative_accuracy
+        gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        if x <= 0:
+            self.zeros += 1
+            return
+        key = math.ceil(math.log(x) / self._log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    def merge(self, other: "LogHistogram") -> None:
+        self.count += other.count
+        self.zeros += other.zeros
+        for key, n in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + n
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        gamma = math.exp(self._log_gamma)
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                return 2 * gamma**key / (gamma + 1)
+        return 2 * gamma ** max(self.buckets) / (gamma + 1)
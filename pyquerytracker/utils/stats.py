@@ -0,0 +1,89 @@
+from collections import Counter
+from typing import Dict, List, Optional
+
+from pyquerytracker.resources import RESOURCE_FIELDS
+from pyquerytracker.utils.quantile import LogHistogram
+
+# Distinct error messages kept per function; the rest count as "(other)".
+MAX_ERROR_MESSAGES = 100
+
+
+class FunctionStats:  # pylint: disable=too-many-instance-attributes
+    """Mergeable per-function aggregate of durations, events and errors."""
+
+    __slots__ = (
+        "count",
+        "errors",
+        "slow",
+        "total_ms",
+        "max_ms",
+        "histogram",
+        "messages",
+        "resources",
+    )
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.slow = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.histogram = LogHistogram()
+        self.messages: Counter = Counter()
+        # resource field -> [total, calls it was measured for]
+        self.resources: Dict[str, List[float]] = {}
+
+    def add(self, duration: Optional[float], event: Optional[str], error) -> None:
+        self.count += 1
+        if duration is not None:
+            self.total_ms += duration
+            self.max_ms = max(self.max_ms, duration)
+            self.histogram.add(duration)
+        if event == "slow_execution":
+            self.slow += 1
+        elif event == "error":
+            self.errors += 1
+            self._message(error or "(no message)", 1)
+
+    def add_resources(self, record: dict) -> None:
+        """Add the resource measurements (``cpu_time_ms``, ...) of a record."""
+        for name in RESOURCE_FIELDS:
+            value = record.get(name)
+            if value is not None:
+                total = self.resources.get(name)
+                if total is None:
+                    self.resources[name] = [value, 1]
+                else:
+                    total[0] += value
+                    total[1] += 1
+
+    def _message(self, message: str, n: int) -> None:
+        if message not in self.messages and len(self.messages) >= MAX_ERROR_MESSAGES:
+            message = "(other)"
+        self.messages[message] += n
+
+    def merge(self, other: "FunctionStats") -> None:
+        self.count += other.count
+        self.errors += other.errors
+        self.slow += other.slow
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+        self.histogram.merge(other.histogram)
+        for message, n in other.messages.items():
+            self._message(message, n)
+        for name, (value, n) in other.resources.items():
+            total = self.resources.setdefault(name, [0, 0])
+            total[0] += value
+            total[1] += n
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.histogram.count if self.histogram.count else 0.0
+
+    def percentile(self, p: float) -> Optional[float]:
+        return self.histogram.quantile(p / 100)
+
+    def resource_mean(self, name: str) -> Optional[float]:
+        """Mean of a resource field over the calls it was measured for."""
+        total = self.resources.get(name)
+        return total[0] / total[1] if total else None
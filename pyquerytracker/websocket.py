@@ -1,25 +1,60 @@
 import asyncio
-from typing import List
+import json
+from typing import List, Optional
 
 from fastapi import WebSocket, WebSocketDisconnect
 
+from pyquerytracker.db.reader import run_read
 from pyquerytracker.db.writer import DBWriter
+from pyquerytracker.encoding import JSON, MSGPACK, Representation
+from pyquerytracker.regression import detector
+from pyquerytracker.response_cache import response_cache
 
 connected_clients: List[WebSocket] = []
 
+REGRESSION_SCAN_INTERVAL_S = 2.0
+_regression_task: Optional[asyncio.Task] = None  # pylint: disable=invalid-name
+
+
+def _representation(websocket: WebSocket) -> Representation:
+    """
+    Layout and codec asked for in the connection URL.
+
+    ``?format=columnar`` sends :func:`~pyquerytracker.encoding.columnar`
+    records and ``?codec=msgpack`` binary MessagePack frames. Compression is
+    left to the websocket's own permessage-deflate extension.
+    """
+    params = websocket.query_params
+    return Representation(
+        columnar=params.get("format") == "columnar",
+        media_type=MSGPACK if params.get("codec") == "msgpack" else JSON,
+    )
+
 
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     connected_clients.append(websocket)
+    ensure_regression_watcher()
     try:
+        representation = _representation(websocket)
         while True:
             await asyncio.sleep(2)  # every 2 seconds
-            recent_logs = DBWriter.fetch_all(minutes=5)  # or a custom method
-            await websocket.send_json(recent_logs)
+            # Clients polling at the same time share one read.
+            entry = await response_cache.get(
+                ("ws-recent", 5),
+                DBWriter.fetch_all,
+                5,
+                representation=representation,
+            )
+            if entry.media_type == MSGPACK:
+                await websocket.send_bytes(entry.body)
+            else:
+                await websocket.send_text(entry.body.decode("utf-8"))
     except WebSocketDisconnect:
         pass
     finally:
-        connected_clients.remove(websocket)
+        if websocket in connected_clients:
+            connected_clients.remove(websocket)
 
 
 async def broadcast(message: str):
@@ -31,3 +66,30 @@ async def broadcast(message: str):
             disconnected.append(client)
     for client in disconnected:
         connected_clients.remove(client)
+
+
+async def broadcast_regressions():
+    """Scan new records and push any detected regressions to all clients."""
+    for regression in await run_read(detector.update):
+        await broadcast(
+            json.dumps({"event": "latency_regression", **regression.to_dict()})
+        )
+
+
+async def _watch_regressions():
+    while connected_clients:
+        await asyncio.sleep(REGRESSION_SCAN_INTERVAL_S)
+        await broadcast_regressions()
+
+
+def ensure_regression_watcher():
+    """
+    Start the shared regression scan unless it is already running.
+
+    A single task serves every connected client; the database scan runs on
+    the read pool so it never blocks the event loop. The task ends once the
+    last client disconnects.
+    """
+    global _regression_task  # pylint: disable=global-statement
+    if _regression_task is None or _regression_task.done():
+        _regression_task = asyncio.get_running_loop().create_task(_watch_regressions())
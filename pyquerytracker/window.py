@@ -0,0 +1,185 @@
+import time
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pyquerytracker.config import get_config
+from pyquerytracker.resources import RESOURCE_FIELDS
+from pyquerytracker.utils.stats import FunctionStats
+
+DEFAULT_PERCENTILES = (50.0, 95.0, 99.0)
+
+# function label -> aggregate of that function's calls in one bucket
+Bucket = Dict[str, FunctionStats]
+
+
+def _label(record: dict) -> str:
+    class_name = record.get("class_name")
+    function_name = record.get("function_name")
+    return f"{class_name}.{function_name}" if class_name else str(function_name)
+
+
+def _merge_into(total: Bucket, bucket: Bucket) -> None:
+    for label, stats in bucket.items():
+        merged = total.get(label)
+        if merged is None:
+            merged = total[label] = FunctionStats()
+        merged.merge(stats)
+
+
+class SlidingWindow:
+    """
+    Per-second, per-function aggregates of recent calls.
+
+    Each call is added to the bucket of the second it finished in, and
+    buckets older than ``window_retention_s`` are dropped as time moves on.
+    A minute whose seconds are all in the past is also rolled up once into
+    a per-minute bucket. A "last N minutes" query therefore merges about N
+    minute buckets plus the seconds at both edges, without looking at a
+    single record. Windows of any length that overlap share the same
+    buckets.
+
+    Buckets of past seconds never change: a call reported with a clock that
+    went backwards is counted in the newest second instead.
+    """
+
+    def __init__(self) -> None:
+        self._seconds: Dict[int, Bucket] = {}
+        self._minutes: Dict[int, Bucket] = {}
+        self._newest = 0
+        self._lock = Lock()
+
+    def add(self, record: dict, now: Optional[float] = None) -> None:
+        second = int(time.time() if now is None else now)
+        label = _label(record)
+        with self._lock:
+            if second > self._newest:
+                self._newest = second
+                self._evict(second - get_config().window_retention_s)
+            else:
+                second = self._newest
+            bucket = self._seconds.get(second)
+            if bucket is None:
+                bucket = self._seconds[second] = {}
+            stats = bucket.get(label)
+            if stats is None:
+                stats = bucket[label] = FunctionStats()
+            stats.add(
+                record.get("duration_ms"), record.get("event"), record.get("error")
+            )
+            stats.add_resources(record)
+
+    def _evict(self, oldest: int) -> None:
+        # Minute roll-ups are built on first use, in any order, so every key
+        # is compared with the cutoff.
+        for buckets, width in ((self._seconds, 1), (self._minutes, 60)):
+            expired = [key for key in buckets if (key + 1) * width <= oldest]
+            for key in expired:
+                del buckets[key]
+
+    def _minute(self, minute: int) -> Bucket:
+        """The roll-up of a minute that is over; built on first use."""
+        bucket = self._minutes.get(minute)
+        if bucket is None:
+            bucket = {}
+            for second in range(minute * 60, minute * 60 + 60):
+                _merge_into(bucket, self._seconds.get(second, {}))
+            self._minutes[minute] = bucket
+        return bucket
+
+    def _buckets(self, start: int, end: int) -> List[Bucket]:
+        """Buckets covering the seconds ``start`` to ``end`` inclusive."""
+        # Nothing older than the retention is kept, so don't roll it up.
+        start = max(start, self._newest - get_config().window_retention_s + 1)
+        # Whole minutes that are over, i.e. end before the newest second.
+        first_minute = -(-start // 60)
+        last_minute = min(end + 1, self._newest) // 60 - 1
+        if first_minute > last_minute:
+            edges = [(start, end)]
+        else:
+            edges = [(start, first_minute * 60 - 1), ((last_minute + 1) * 60, end)]
+        buckets = [self._minute(m) for m in range(first_minute, last_minute + 1)]
+        for low, high in edges:
+            buckets.extend(
+                self._seconds[s] for s in range(low, high + 1) if s in self._seconds
+            )
+        return buckets
+
+    def stats(self, seconds: int, now: Optional[float] = None) -> Bucket:
+        """Per-function aggregates of the last ``seconds`` seconds."""
+        end = int(time.time() if now is None else now)
+        total: Bucket = {}
+        with self._lock:
+            buckets = self._buckets(end - seconds + 1, end)
+            # Only the newest second still changes; the rest are merged
+            # without holding up tracked calls.
+            current = self._seconds.get(self._newest)
+            if any(bucket is current for bucket in buckets):
+                _merge_into(total, current)
+        for bucket in buckets:
+            if bucket is not current:
+                _merge_into(total, bucket)
+        return total
+
+    def summary(
+        self,
+        seconds: int,
+        percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+        now: Optional[float] = None,
+    ) -> List[dict]:
+        """
+        Per-function statistics of the last ``seconds``, busiest first.
+
+        Rows have the keys of :meth:`RecordFrame.summary
+        <pyquerytracker.analytics.RecordFrame.summary>` plus ``max_ms`` and
+        the mean of each resource measurement (``mean_cpu_time_ms``, ...)
+        over the calls it was taken for, or None if it never was.
+        Percentiles are estimates within 1%.
+        """
+        rows = []
+        for label, stats in self.stats(seconds, now).items():
+            row = {
+                "function": label,
+                "count": stats.count,
+                "calls_per_s": stats.count / seconds,
+                "error_ratio": stats.errors / stats.count,
+                "slow_count": stats.slow,
+                "mean_ms": stats.mean_ms,
+                "max_ms": stats.max_ms,
+            }
+            for p in percentiles:
+                row[f"p{p:g}_ms"] = stats.percentile(p)
+            for name in RESOURCE_FIELDS:
+                row[f"mean_{name}"] = stats.resource_mean(name)
+            rows.append(row)
+        rows.sort(key=lambda row: (-row["count"], row["function"]))
+        return rows
+
+    def series(self, seconds: int, now: Optional[float] = None) -> Dict[str, list]:
+        """Calls and errors per second over the last ``seconds``."""
+        end = int(time.time() if now is None else now)
+        starts = list(range(end - seconds + 1, end + 1))
+        counts: List[Tuple[int, int]] = []
+        with self._lock:
+            for second in starts:
+                bucket = self._seconds.get(second, {})
+                counts.append(
+                    (
+                        sum(stats.count for stats in bucket.values()),
+                        sum(stats.errors for stats in bucket.values()),
+                    )
+                )
+        return {
+            "buckets": starts,
+            "count": [count for count, _ in counts],
+            "errors": [errors for _, errors in counts],
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._seconds.clear()
+            self._minutes.clear()
+            self._newest = 0
+
+
+#: Process-wide window fed by every tracked call.
+sliding_window = SlidingWindow()
@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import pytest
+
+from pyquerytracker.config import Config, ExportType
+from pyquerytracker.exporter.arrow_exporter import ArrowExporter
+from pyquerytracker.exporter.manager import ExporterManager
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def _record(i, name="get_user"):
+    return {
+        "timestamp": datetime(2025, 1, 1, 12, 0, i % 60),
+        "event": "error" if i % 10 == 0 else "normal_execution",
+        "function_name": name,
+        "class_name": None,
+        "duration_ms": float(i),
+        "func_args": f"({i},)",
+        "func_kwargs": "{}",
+        "error": "boom" if i % 10 == 0 else None,
+        "item_count": None,
+    }
+
+
+def _exporter(path, export_type=ExportType.PARQUET, **kwargs):
+    config = Config(export_type=export_type, export_path=str(path), **kwargs)
+    return ExporterManager.create_exporter(config)
+
+
+def test_parquet_row_groups_and_dictionary_encoding(tmp_path):
+    path = tmp_path / "out" / "q.parquet"
+    exporter = _exporter(path, export_row_group_size=100)
+    assert isinstance(exporter, ArrowExporter)
+    exporter.extend([_record(i) for i in range(250)])
+    exporter.close()
+
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_rows == 250
+    assert [
+        parquet.metadata.row_group(i).num_rows
+        for i in range(parquet.metadata.num_row_groups)
+    ] == [100, 100, 50]
+    assert parquet.metadata.row_group(0).column(0).compression == "ZSTD"
+
+    table = parquet.read()
+    assert pa.types.is_dictionary(table.schema.field("function_name").type)
+    assert table.column("duration_ms").to_pylist() == [float(i) for i in range(250)]
+    assert table.column("error").null_count == 225
+
+
+def test_existing_file_is_not_overwritten(tmp_path):
+    path = tmp_path / "q.parquet"
+    for n in range(2):
+        exporter = _exporter(path)
+        exporter.append(_record(n))
+        exporter.close()
+    assert exporter.path == str(tmp_path / "q.1.parquet")
+    assert pq.read_table(path).column("duration_ms").to_pylist() == [0.0]
+
+
+def test_arrow_ipc_stream(tmp_path):
+    path = tmp_path / "q.arrow"
+    exporter = _exporter(path, ExportType.ARROW, export_compression="lz4")
+    exporter.extend([_record(i, name=f"f{i % 3}") for i in range(30)])
+    exporter.close()
+
+    with pa.ipc.open_stream(path) as reader:
+        table = reader.read_all()
+    assert table.num_rows == 30
+    assert set(table.column("function_name").to_pylist()) == {"f0", "f1", "f2"}
@@ -0,0 +1,80 @@
+from datetime import datetime
+
+import pytest
+
+from pyquerytracker.config import Config, ExportType
+from pyquerytracker.exporter.binary_exporter import (
+    EVENT_CODES,
+    RECORD,
+    BinaryLogExporter,
+    read_binary_log,
+)
+from pyquerytracker.exporter.manager import ExporterManager
+
+np = pytest.importorskip("numpy")
+
+
+def _record(i, name="get_user", class_name=None, event="normal_execution"):
+    return {
+        "timestamp": datetime(2025, 1, 1, 0, 0, i % 60),
+        "function_name": name,
+        "class_name": class_name,
+        "duration_ms": float(i),
+        "event": event,
+    }
+
+
+def _exporter(path):
+    config = Config(export_type=ExportType.BINARY, export_path=str(path))
+    return ExporterManager.create_exporter(config)
+
+
+def test_round_trip_through_memory_map(tmp_path):
+    path = tmp_path / "logs" / "q.bin"
+    exporter = _exporter(path)
+    assert isinstance(exporter, BinaryLogExporter)
+    exporter.extend(
+        [_record(i, name=f"f{i % 3}", class_name="Repo") for i in range(99)]
+        + [_record(99, event="error")]
+    )
+    exporter.close()
+
+    log = read_binary_log(str(path))
+    assert isinstance(log.records, np.memmap)
+    assert len(log.records) == 100
+    assert log.records["duration_ms"].sum() == sum(range(100))
+    assert list(log.function_names()[:4]) == ["f0", "f1", "f2", "f0"]
+    assert log.strings[log.records["class_id"][0]] == "Repo"
+    assert log.records["class_id"][-1] == -1
+    assert log.records["event"][-1] == EVENT_CODES["error"]
+    assert log.records["timestamp_us"][1] - log.records["timestamp_us"][0] == 10**6
+
+
+def test_reopen_keeps_string_ids_and_appends(tmp_path):
+    path = tmp_path / "q.bin"
+    for name in ("a", "b", "a"):
+        exporter = _exporter(path)
+        exporter.append(_record(1, name=name))
+        exporter.close()
+
+    log = read_binary_log(str(path))
+    assert log.strings == ["a", "b"]
+    assert list(log.function_names()) == ["a", "b", "a"]
+
+
+def test_torn_trailing_record_is_ignored(tmp_path):
+    path = tmp_path / "q.bin"
+    exporter = _exporter(path)
+    exporter.extend([_record(i) for i in range(3)])
+    exporter.close()
+    with open(path, "ab") as f:
+        f.write(b"\0" * (RECORD.size // 2))
+
+    assert len(read_binary_log(str(path)).records) == 3
+
+
+def test_rejects_foreign_file(tmp_path):
+    path = tmp_path / "q.bin"
+    path.write_bytes(b"not a log")
+    with pytest.raises(ValueError):
+        read_binary_log(str(path))
@@ -0,0 +1,40 @@
+import csv
+
+from pyquerytracker.config import Config, ExportType
+from pyquerytracker.exporter.csv_exporter import RECORD_FIELDS, CsvExporter
+
+
+def _exporter(path):
+    return CsvExporter(Config(export_type=ExportType.CSV, export_path=str(path)))
+
+
+def test_header_stays_stable_across_flushes(tmp_path):
+    path = tmp_path / "logs" / "q.csv"
+    exporter = _exporter(path)
+    exporter.append({"function_name": "a", "duration_ms": 1.0, "tag": "x"})
+    exporter.flush()
+    exporter.append({"function_name": "b", "item_count": 3, "cpu_time_ms": 0.5})
+    exporter.flush()
+
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    # Record fields first set by a later batch still have their column.
+    assert list(rows[0]) == list(RECORD_FIELDS) + ["tag"]
+    assert rows[0]["tag"] == "x"
+    assert (rows[1]["item_count"], rows[1]["cpu_time_ms"]) == ("3", "0.5")
+
+
+def test_appending_to_existing_file_reuses_its_header(tmp_path):
+    path = tmp_path / "logs" / "q.csv"
+    first = _exporter(path)
+    first.append({"function_name": "a", "event": "normal_execution"})
+    first.flush()
+
+    second = _exporter(path)
+    second.append({"event": "error", "function_name": "b"})
+    second.flush()
+
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["function_name"] for row in rows] == ["a", "b"]
+    assert rows[1]["event"] == "error"
@@ -0,0 +1,144 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from pyquerytracker.config import Config, ExportType
+from pyquerytracker.exporter.manager import ExporterManager
+from pyquerytracker.exporter.otlp_exporter import OtlpExporter
+from pyquerytracker.exporter.pipeline import ExportPipeline
+
+
+class _Collector:
+    """Minimal in-process OTLP/HTTP collector recording received payloads."""
+
+    def __init__(self, delay=0.0):
+        self.requests = []
+        collector = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):  # noqa: N802
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                time.sleep(delay)
+                collector.requests.append(json.loads(body))
+                self.send_response(200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1/traces"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def spans(self):
+        return [
+            span
+            for payload in self.requests
+            for resource in payload["resourceSpans"]
+            for scope in resource["scopeSpans"]
+            for span in scope["spans"]
+        ]
+
+    def close(self):
+        self.server.shutdown()
+
+
+@pytest.fixture
+def collector():
+    c = _Collector()
+    yield c
+    c.close()
+
+
+def _config(url, **kwargs):
+    return Config(export_type=ExportType.OTLP, export_path=url, **kwargs)
+
+
+def _record(i, event="normal_execution"):
+    data = {
+        "event": event,
+        "function_name": f"query_{i}",
+        "class_name": "Repo",
+        "duration_ms": 12.5,
+        "func_args": "()",
+        "func_kwargs": "{}",
+    }
+    if event == "error":
+        data["error"] = "boom"
+    return data
+
+
+def test_batches_and_converts_spans(collector):
+    exporter = OtlpExporter(_config(collector.url, export_batch_size=4))
+    for i in range(9):
+        exporter.append(_record(i))
+    exporter.append(_record(9, event="error"))
+    exporter.flush()
+
+    spans = sorted(collector.spans(), key=lambda s: int(s["name"].rsplit("_", 1)[1]))
+    assert len(spans) == 10
+    # The worker may pick up a full batch before flush() drains the rest.
+    batch_sizes = [
+        len(p["resourceSpans"][0]["scopeSpans"][0]["spans"]) for p in collector.requests
+    ]
+    assert len(batch_sizes) >= 3
+    assert max(batch_sizes) <= 4
+    span = spans[0]
+    assert span["name"] == "Repo.query_0"
+    assert len(span["traceId"]) == 32 and len(span["spanId"]) == 16
+    duration = int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])
+    assert duration == 12_500_000
+    assert spans[-1]["status"] == {"code": 2, "message": "boom"}
+
+
+def test_background_worker_exports_without_flush(collector):
+    exporter = OtlpExporter(_config(collector.url, export_interval_s=0.05))
+    exporter.append(_record(0))
+    deadline = time.monotonic() + 2
+    while not collector.requests and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(collector.spans()) == 1
+
+
+def test_full_queue_drops_records():
+    exporter = OtlpExporter(
+        _config("http://unused", export_queue_size=2, export_interval_s=60),
+        transport=lambda payload, timeout: None,
+    )
+    # The worker may already hold one record, so overfill generously.
+    for i in range(10):
+        exporter.append(_record(i))
+    assert exporter.dropped >= 7
+    exporter.flush()
+
+
+def test_export_timeout_is_enforced():
+    slow = _Collector(delay=1.0)
+    try:
+        exporter = OtlpExporter(_config(slow.url, export_timeout_s=0.1))
+        exporter.append(_record(0))
+        start = time.monotonic()
+        exporter.flush()
+        assert time.monotonic() - start < 0.9
+        assert exporter.failed == 1
+    finally:
+        slow.close()
+
+
+def test_registered_in_manager():
+    assert ExporterManager.exporter_class(ExportType.OTLP) is OtlpExporter
+
+
+def test_pipeline_calls_otlp_directly(collector):
+    pipeline = ExportPipeline()
+    exporter = OtlpExporter(_config(collector.url))
+    assert pipeline.add(exporter) is None
+    assert pipeline.sinks == []
+    pipeline.append(_record(0))
+    pipeline.close()
+    assert len(collector.spans()) == 1
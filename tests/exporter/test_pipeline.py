@@ -0,0 +1,132 @@
+import gc
+import json
+import threading
+import time
+import weakref
+
+from pyquerytracker import TrackQuery, configure
+from pyquerytracker.config import Config, ExportType
+from pyquerytracker.exporter.base import Exporter
+from pyquerytracker.exporter.manager import ExporterManager
+from pyquerytracker.exporter.pipeline import ExportPipeline
+
+
+class ListExporter(Exporter):
+    def __init__(self, gate=None):
+        super().__init__(Config())
+        self.records = []
+        self.flushed = 0
+        self.gate = gate
+
+    def append(self, data):
+        if self.gate is not None:
+            self.gate.wait()
+        self.records.append(data)
+
+    def flush(self):
+        self.flushed += 1
+
+
+def test_fan_out_to_every_sink():
+    pipeline = ExportPipeline()
+    first, second = ListExporter(), ListExporter()
+    pipeline.add(first)
+    pipeline.add(second)
+    for i in range(100):
+        pipeline.append({"i": i})
+    pipeline.flush()
+
+    assert [r["i"] for r in first.records] == list(range(100))
+    assert [r["i"] for r in second.records] == list(range(100))
+    assert first.flushed == second.flushed == 1
+    pipeline.close()
+
+
+def test_slow_sink_does_not_stall_others(caplog):
+    gate = threading.Event()
+    pipeline = ExportPipeline(queue_size=1000, timeout_s=1.0)
+    stuck = pipeline.add(ListExporter(gate=gate))
+    fast = pipeline.add(ListExporter())
+    try:
+        start = time.perf_counter()
+        for i in range(2000):
+            pipeline.append({"i": i})
+        assert time.perf_counter() - start < 0.5
+
+        fast.flush()
+        assert len(fast.exporter.records) + fast.dropped == 2000
+        # The gated sink fills its own queue and drops the rest.
+        assert stuck.dropped > 0
+        assert "falling behind" in caplog.text
+    finally:
+        gate.set()
+        pipeline.close()
+    assert len(stuck.exporter.records) == 2000 - stuck.dropped
+
+
+def test_close_does_not_hang_on_stuck_sink():
+    gate = threading.Event()
+    pipeline = ExportPipeline(queue_size=5, timeout_s=0.2)
+    pipeline.add(ListExporter(gate=gate))
+    healthy = pipeline.add(ListExporter())
+    try:
+        for i in range(20):
+            pipeline.append({"i": i})
+        start = time.perf_counter()
+        pipeline.close()
+        assert time.perf_counter() - start < 1.0
+        assert healthy.exporter.flushed == 1
+    finally:
+        gate.set()
+
+
+def test_pipeline_shared_and_rebuilt_on_configure(tmp_path):
+    csv_path = str(tmp_path / "out" / "q.csv")
+    json_path = str(tmp_path / "out" / "q.json")
+    configure(exporters=[(ExportType.CSV, csv_path), (ExportType.JSON, json_path)])
+    try:
+
+        @TrackQuery()
+        def first():
+            return 1
+
+        @TrackQuery()
+        def second():
+            return 2
+
+        pipeline = ExporterManager.pipeline()
+        first()
+        second()
+        assert ExporterManager.pipeline() is pipeline
+        file_sinks = [
+            type(e).__name__
+            for e in pipeline.exporters
+            if type(e).__name__ != "DBExporter"
+        ]
+        assert file_sinks == ["CsvExporter", "JsonExporter"]
+
+        ExporterManager.get().flush()
+        with open(json_path, encoding="utf-8") as f:
+            names = {log["function_name"] for log in json.load(f)}
+        assert {"first", "second"} <= names
+        with open(csv_path, encoding="utf-8") as f:
+            assert len(f.read().splitlines()) == 3
+    finally:
+        configure(exporters=[])
+
+    assert ExporterManager.pipeline() is not pipeline
+
+
+def test_rebuilt_pipeline_exporters_are_released(tmp_path):
+    csv_path = str(tmp_path / "q.csv")
+    json_path = str(tmp_path / "q.json")
+    try:
+        configure(exporters=[(ExportType.CSV, csv_path), (ExportType.JSON, json_path)])
+        released = [weakref.ref(e) for e in ExporterManager.pipeline().exporters]
+        configure(exporters=[(ExportType.CSV, csv_path)])
+        ExporterManager.pipeline()
+        gc.collect()
+        # Nothing, such as an exit handler, keeps the old sinks alive.
+        assert [ref() for ref in released] == [None] * len(released)
+    finally:
+        configure(exporters=[])
@@ -0,0 +1,167 @@
+import csv
+import os
+from dataclasses import fields
+from datetime import datetime
+
+import pytest
+
+from pyquerytracker import TrackQuery, configure
+from pyquerytracker.config import Config, ExportType, get_config, update_config
+from pyquerytracker.exporter import pipeline as pipeline_module
+from pyquerytracker.exporter.base import Exporter
+from pyquerytracker.exporter.manager import ExporterManager
+from pyquerytracker.exporter.pipeline import ExportPipeline
+from pyquerytracker.exporter.spool import Spool
+
+
+class FlakyExporter(Exporter):
+    """Fails its first ``failures`` batches, like a database that is down."""
+
+    durable = True
+
+    def __init__(self, failures=0):
+        super().__init__(Config())
+        self.failures = failures
+        self.records = []
+        self.batches = 0
+
+    def append(self, data):
+        self.extend([data])
+
+    def extend(self, records):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("sink down")
+        self.batches += 1
+        self.records.extend(records)
+
+    def flush(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(pipeline_module, "SPOOL_RETRY_MIN_S", 0.01)
+    monkeypatch.setattr(pipeline_module, "SPOOL_RETRY_MAX_S", 0.02)
+
+
+def test_records_round_trip_and_resume_from_checkpoint(tmp_path):
+    spool = Spool(str(tmp_path), fsync_interval_s=0)
+    when = datetime(2025, 1, 1, 12, 30)
+    for i in range(10):
+        spool.append({"i": i, "timestamp": when, "error": None})
+    reader = spool.reader("sink")
+    first = reader.read(4)
+    assert [r["i"] for r in first] == [0, 1, 2, 3]
+    assert first[0]["timestamp"] == when
+    reader.commit()
+    assert [r["i"] for r in reader.read(3)] == [4, 5, 6]  # read, not committed
+    spool.close()
+
+    # After a restart the uncommitted records are delivered again.
+    restarted = Spool(str(tmp_path), fsync_interval_s=0)
+    reader = restarted.reader("sink")
+    assert [r["i"] for r in reader.read(100)] == list(range(4, 10))
+    restarted.close()
+
+
+def test_torn_tail_of_a_crashed_run_is_skipped(tmp_path):
+    spool = Spool(str(tmp_path), fsync_interval_s=0)
+    spool.append({"i": 0})
+    spool.close()
+    (segment,) = spool.segments()
+    with open(spool.path(segment), "ab") as f:
+        f.write(b"\x40\x00\x00\x00garbage")  # half-written frame
+
+    restarted = Spool(str(tmp_path), fsync_interval_s=0)
+    restarted.append({"i": 1})
+    reader = restarted.reader("sink")
+    assert [r["i"] for r in reader.read(100)] == [0, 1]
+    restarted.close()
+
+
+def test_segments_are_released_and_capped(tmp_path):
+    spool = Spool(str(tmp_path), segment_bytes=200, max_bytes=1000, fsync_interval_s=0)
+    reader = spool.reader("sink")
+    for i in range(12):
+        spool.append({"i": i, "payload": "x" * 40})
+    assert len(spool.segments()) > 3
+    assert [r["i"] for r in reader.read(100)] == list(range(12))
+    reader.commit()
+    assert spool.segments() == [spool.end().segment]
+    assert reader.backlog() == 0
+
+    for i in range(100):
+        spool.append({"i": i, "payload": "x" * 40})
+    sizes = [os.path.getsize(spool.path(s)) for s in spool.segments()]
+    assert sum(sizes) <= 1000 + 200
+    assert spool.dropped_segments > 0
+    remaining = reader.read(1000)
+    assert remaining and remaining[-1]["i"] == 99
+    spool.close()
+
+
+def test_sink_outage_is_retried_without_losing_records(tmp_path):
+    exporter = FlakyExporter(failures=3)
+    pipeline = ExportPipeline(
+        batch_size=50, timeout_s=5.0, spool=Spool(str(tmp_path), fsync_interval_s=0)
+    )
+    sink = pipeline.add(exporter)
+    for i in range(200):
+        pipeline.append({"i": i})
+    pipeline.flush()
+
+    assert [r["i"] for r in exporter.records] == list(range(200))
+    assert sink.failed == 3
+    assert sink.stats()["spool_backlog_bytes"] == 0
+    pipeline.close()
+
+
+def test_records_spooled_during_outage_survive_a_restart(tmp_path):
+    down = FlakyExporter(failures=10**9)
+    pipeline = ExportPipeline(spool=Spool(str(tmp_path), fsync_interval_s=0))
+    sink = pipeline.add(down)
+    for i in range(300):
+        pipeline.append({"i": i})
+    # The process dies with the sink still down.
+    sink.stop()
+    sink.join(1.0)
+    pipeline.spool.close()
+
+    recovered = FlakyExporter()
+    pipeline = ExportPipeline(
+        batch_size=1000, spool=Spool(str(tmp_path), fsync_interval_s=0)
+    )
+    pipeline.add(recovered)
+    pipeline.flush()
+    # Replayed in bulk once the sink is back.
+    assert [r["i"] for r in recovered.records] == list(range(300))
+    assert recovered.batches == 1
+    pipeline.close()
+
+
+def test_configured_spool_feeds_the_sinks(tmp_path):
+    saved = get_config()
+    csv_path = str(tmp_path / "out" / "q.csv")
+    spool_dir = str(tmp_path / "spool")
+    configure(
+        exporters=[(ExportType.CSV, csv_path)],
+        spool_dir=spool_dir,
+        persist_to_db=False,
+    )
+    try:
+
+        @TrackQuery()
+        def spooled():
+            return 1
+
+        spooled()
+        pipeline = ExporterManager.pipeline()
+        assert pipeline.spool is not None
+        pipeline.flush()
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        assert [row["function_name"] for row in rows] == ["spooled"]
+        assert any(name.endswith(".checkpoint") for name in os.listdir(spool_dir))
+    finally:
+        update_config(**{f.name: getattr(saved, f.name) for f in fields(saved)})
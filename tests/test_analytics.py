@@ -0,0 +1,91 @@
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from pyquerytracker.analytics import RecordFrame, grouped_percentiles
+from pyquerytracker.api import app
+from pyquerytracker.config import Config, ExportType
+from pyquerytracker.exporter.manager import ExporterManager
+
+BASE = datetime(2025, 1, 1)
+
+
+def _records():
+    records = []
+    for i in range(300):
+        name = ("get_user", "list_orders", "ping")[i % 3]
+        records.append(
+            {
+                "timestamp": BASE + timedelta(seconds=i),
+                "function_name": name,
+                "class_name": "Repo" if name == "list_orders" else None,
+                "duration_ms": float(i % 100),
+                "event": "error" if name == "ping" and i % 2 else "normal_execution",
+            }
+        )
+    return records
+
+
+def test_grouped_percentiles_match_numpy():
+    rng = np.random.default_rng(3)
+    groups = rng.integers(0, 5, 2000)
+    values = rng.lognormal(size=2000)
+    result = grouped_percentiles(groups, values, 6, [50, 90, 99])
+    for g in range(5):
+        expected = np.percentile(values[groups == g], [50, 90, 99])
+        assert np.allclose(result[g], expected)
+    assert np.isnan(result[5]).all()
+
+
+def test_summary_and_rates():
+    frame = RecordFrame.from_records(_records(), span_s=300)
+    assert set(frame.functions) == {"get_user", "Repo.list_orders", "ping"}
+    rows = {row["function"]: row for row in frame.summary()}
+    assert rows["ping"]["count"] == 100
+    assert rows["ping"]["calls_per_s"] == pytest.approx(100 / 300)
+    assert rows["ping"]["error_ratio"] == pytest.approx(0.5)
+    assert rows["get_user"]["error_ratio"] == 0.0
+    durations = [r["duration_ms"] for r in _records() if r["function_name"] == "ping"]
+    assert rows["ping"]["p95_ms"] == pytest.approx(np.percentile(durations, 95))
+
+
+def test_time_series_buckets():
+    series = RecordFrame.from_records(_records()).time_series(bucket_s=60)
+    assert series["count"] == [60] * 5
+    assert sum(series["errors"]) == 50
+    assert series["buckets"][0].startswith("2025-01-01T00:00:00")
+    assert len(series["p95_ms"]) == 5
+
+
+@pytest.mark.parametrize(
+    "export_type, filename",
+    [
+        (ExportType.CSV, "q.csv"),
+        (ExportType.JSON, "q.json"),
+        (ExportType.BINARY, "q.bin"),
+        (ExportType.PARQUET, "q.parquet"),
+    ],
+)
+def test_same_stats_from_every_format(tmp_path, export_type, filename):
+    if export_type == ExportType.PARQUET:
+        pytest.importorskip("pyarrow")
+    path = str(tmp_path / filename)
+    exporter = ExporterManager.create_exporter(
+        Config(export_type=export_type, export_path=path)
+    )
+    exporter.extend(_records())
+    exporter.close()
+
+    expected = RecordFrame.from_records(_records()).summary()
+    assert RecordFrame.from_file(path).summary() == expected
+
+
+def test_function_stats_endpoint():
+    response = TestClient(app).get("/api/function-stats?minutes=5")
+    assert response.status_code == 200
+    body = response.json()
+    assert isinstance(body["functions"], list)
+    json.dumps(body["series"])
@@ -0,0 +1,117 @@
+import io
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from pyquerytracker import logfiles
+from pyquerytracker.cli import main
+from pyquerytracker.config import Config, ExportType
+from pyquerytracker.exporter.manager import ExporterManager
+from pyquerytracker.logfiles import Task, plan, summarize
+from pyquerytracker.utils.quantile import LogHistogram
+
+BASE = datetime(2025, 1, 1)
+
+
+def _records(n=2000):
+    records = []
+    for i in range(n):
+        name = "slow_report" if i % 10 == 0 else "get_user"
+        failed = i % 100 == 1
+        records.append(
+            {
+                "timestamp": BASE + timedelta(seconds=i),
+                "event": "error" if failed else "normal_execution",
+                "function_name": name,
+                "class_name": None,
+                "duration_ms": 500.0 + i % 7 if name == "slow_report" else 1.0 + i % 3,
+                "func_args": f"({i},)",
+                "func_kwargs": "{}",
+                "error": "deadlock detected" if failed else None,
+            }
+        )
+    return records
+
+
+def _export(path, export_type, records):
+    exporter = ExporterManager.create_exporter(
+        Config(export_type=export_type, export_path=str(path))
+    )
+    exporter.extend(records)
+    exporter.close()
+    return str(path)
+
+
+def test_log_histogram_accuracy_and_merge():
+    rng = random.Random(5)
+    values = [rng.lognormvariate(2, 1) for _ in range(20000)]
+    left, right = LogHistogram(), LogHistogram()
+    for i, v in enumerate(values):
+        (left if i % 2 else right).add(v)
+    left.merge(right)
+    exact = sorted(values)[int(0.99 * (len(values) - 1))]
+    assert left.count == len(values)
+    assert left.quantile(0.99) == pytest.approx(exact, rel=0.02)
+
+
+@pytest.mark.parametrize(
+    "export_type, name",
+    [
+        (ExportType.CSV, "q.csv"),
+        (ExportType.JSON, "q.json"),
+        (ExportType.BINARY, "q.bin"),
+    ],
+)
+def test_chunked_parallel_summary_matches_single_pass(tmp_path, export_type, name):
+    path = _export(tmp_path / name, export_type, _records())
+    whole = summarize([path], workers=1, chunk_bytes=1 << 30)
+    split = summarize([path], workers=2, chunk_bytes=4096)
+
+    assert whole.rows == split.rows == 2000
+    if export_type != ExportType.JSON:
+        assert len(plan([path], chunk_bytes=4096)) > 1
+    for label, stats in whole.functions.items():
+        other = split.functions[label]
+        assert (stats.count, stats.errors) == (other.count, other.errors)
+        assert stats.total_ms == pytest.approx(other.total_ms)
+        assert stats.percentile(99) == other.percentile(99)
+    assert whole.buckets == split.buckets
+
+
+def test_json_is_streamed_in_small_reads(tmp_path, monkeypatch):
+    path = _export(tmp_path / "q.json", ExportType.JSON, _records(300))
+    monkeypatch.setattr(logfiles, "_READ_SIZE", 64)
+    rows = list(logfiles.iter_rows(Task(path)))
+    assert len(rows) == 300
+    assert rows[1][4] == "deadlock detected"
+
+
+def test_analyze_report(tmp_path):
+    _export(tmp_path / "logs" / "a.csv", ExportType.CSV, _records()[:1000])
+    _export(tmp_path / "logs" / "b.csv", ExportType.CSV, _records()[1000:])
+    out = io.StringIO()
+    assert main(["analyze", str(tmp_path / "logs"), "--workers", "2"], out=out) == 0
+
+    report = out.getvalue()
+    assert report.startswith("2000 records, 2 functions, 2 files")
+    slowest = report.split("Top 2 slowest functions (by p99)")[1]
+    assert slowest.index("slow_report") < slowest.index("get_user")
+    assert "Errors (20 total)" in report
+    assert "deadlock detected" in report
+    assert "2025-01-01 00:00:00" in report
+
+
+def test_csv_chunks_split_only_between_records(tmp_path):
+    records = _records()
+    for i, record in enumerate(records):
+        record["event"] = "error"
+        record["error"] = f'Traceback:\nline "{i}"\n  get_user\n'
+    path = _export(tmp_path / "q.csv", ExportType.CSV, records)
+    whole = summarize([path], workers=1, chunk_bytes=1 << 30)
+    split = summarize([path], workers=2, chunk_bytes=1000)
+
+    assert len(plan([path], chunk_bytes=1000)) > 1
+    assert whole.rows == split.rows == 2000
+    assert set(split.functions) == {"slow_report", "get_user"}
+    assert split.functions["get_user"].errors == whole.functions["get_user"].errors
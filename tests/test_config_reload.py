@@ -0,0 +1,194 @@
+import logging
+import os
+import subprocess
+import sys
+from dataclasses import fields
+
+import pytest
+from fastapi.testclient import TestClient
+
+from pyquerytracker import TrackQuery, configure
+from pyquerytracker.api import app
+from pyquerytracker.config import (
+    Config,
+    ConfigWatcher,
+    ExportType,
+    config_from_env,
+    get_config,
+    load_config_file,
+    update_config,
+)
+from pyquerytracker.metrics import registry
+from pyquerytracker.tracker import query_data_store
+from pyquerytracker.window import sliding_window
+
+
+@pytest.fixture(autouse=True)
+def restore_config():
+    saved = get_config()
+    yield
+    update_config(**{f.name: getattr(saved, f.name) for f in fields(saved)})
+
+
+def test_configure_swaps_in_a_new_config():
+    before = get_config()
+    tracker = TrackQuery()
+    configure(slow_log_threshold_ms=5, export_type="json", slow_log_level="INFO")
+
+    after = get_config()
+    assert after is not before
+    assert before.slow_log_threshold_ms == 100.0
+    assert after.export_type is ExportType.JSON
+    assert after.slow_log_level == logging.INFO
+    assert tracker.config.slow_log_threshold_ms == 5
+
+
+def test_configure_rejects_invalid_values():
+    with pytest.raises(ValueError, match="sample_rate"):
+        configure(sample_rate=2)
+    assert get_config().sample_rate == 1.0
+
+
+def test_every_setting_has_an_environment_variable():
+    environ = {"PYQUERYTRACKER_" + f.name.upper(): "1" for f in fields(Config)}
+    environ["PYQUERYTRACKER_EXPORT_TYPE"] = "csv"
+    environ["PYQUERYTRACKER_EXPORTERS"] = "csv:a.csv,json:b.json"
+
+    settings = config_from_env(environ)
+    assert set(settings) == {f.name for f in fields(Config)}
+    assert settings["exporters"] == [
+        (ExportType.CSV, "a.csv"),
+        (ExportType.JSON, "b.json"),
+    ]
+
+
+def test_unknown_file_setting(tmp_path):
+    path = tmp_path / "tracker.toml"
+    path.write_text("nonsense = 1\n")
+    with pytest.raises(ValueError, match="unknown setting 'nonsense'"):
+        load_config_file(str(path))
+
+
+def test_file_values_and_env_precedence(tmp_path, monkeypatch):
+    path = tmp_path / "pyproject.toml"
+    path.write_text(
+        "[project]\nname = 'app'\n\n"
+        "[tool.pyquerytracker]\n"
+        "slow_log_threshold_ms = 250\n"
+        "sample_rate = 0.5\n"
+        'exporters = [["csv", "logs/q.csv"]]\n'
+    )
+    assert load_config_file(str(path)) == {
+        "slow_log_threshold_ms": 250.0,
+        "sample_rate": 0.5,
+        "exporters": [(ExportType.CSV, "logs/q.csv")],
+    }
+
+    monkeypatch.setenv("PYQUERYTRACKER_SAMPLE_RATE", "0.25")
+    watcher = ConfigWatcher(str(path))
+    assert watcher.check()
+    assert get_config().slow_log_threshold_ms == 250.0
+    assert get_config().sample_rate == 0.25
+
+
+def test_watcher_reloads_changed_file(tmp_path):
+    path = tmp_path / "tracker.toml"
+    path.write_text("slow_log_threshold_ms = 300\n")
+    watcher = ConfigWatcher(str(path), interval_s=60).start()
+    try:
+        assert get_config().slow_log_threshold_ms == 300.0
+        assert not watcher.check()
+
+        path.write_text("slow_log_threshold_ms = 40\nsample_rate = 1.0\n")
+        assert watcher.check()
+        assert get_config().slow_log_threshold_ms == 40.0
+
+        path.write_text("slow_log_threshold_ms = 'fast'\n")
+        assert not watcher.check()
+        assert get_config().slow_log_threshold_ms == 40.0
+    finally:
+        watcher.stop()
+
+
+def test_setting_removed_from_file_reverts_to_default(tmp_path):
+    path = tmp_path / "tracker.toml"
+    path.write_text("slow_log_threshold_ms = 300\nsample_rate = 0.5\n")
+    watcher = ConfigWatcher(str(path))
+    assert watcher.check()
+    assert get_config().sample_rate == 0.5
+
+    path.write_text("slow_log_threshold_ms = 300\n")
+    assert watcher.check()
+    assert get_config().sample_rate == Config().sample_rate
+    assert get_config().slow_log_threshold_ms == 300.0
+
+
+def test_malformed_environment_variable_falls_back_to_default():
+    env = {
+        **os.environ,
+        "PYQUERYTRACKER_SAMPLE_RATE": "2",
+        "PYQUERYTRACKER_SLOW_LOG_THRESHOLD_MS": "250",
+        "PYTHONPATH": os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    }
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from pyquerytracker.config import get_config\n"
+            "print(get_config().sample_rate, get_config().slow_log_threshold_ms)",
+        ],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=False,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["1.0", "250.0"]
+    assert "Ignoring PYQUERYTRACKER_SAMPLE_RATE" in result.stderr
+
+
+def test_sampling_keeps_slow_and_failed_calls():
+    @TrackQuery()
+    def fast():
+        return 1
+
+    @TrackQuery(slow_log_threshold_ms=-1)
+    def slow():
+        return 1
+
+    @TrackQuery()
+    def failing():
+        raise ValueError("boom")
+
+    query_data_store.clear()
+    configure(sample_rate=0.0)
+    for _ in range(5):
+        fast()
+    slow()
+    failing()
+    assert [r["function_name"] for r in query_data_store] == ["slow", "failing"]
+
+
+def test_sampling_leaves_metrics_and_window_complete():
+    @TrackQuery()
+    def sampled_fast():
+        return 1
+
+    configure(persist_to_db=False, sample_rate=0.1)
+    for _ in range(1000):
+        sampled_fast()
+
+    labels = 'function="sampled_fast",class=""'
+    assert f"pyquerytracker_calls_total{{{labels}}} 1000" in registry.render()
+    (row,) = [
+        row for row in sliding_window.summary(60) if row["function"] == "sampled_fast"
+    ]
+    assert row["count"] == 1000
+    recorded = [r for r in query_data_store if r["function_name"] == "sampled_fast"]
+    assert len(recorded) < 300
+
+
+def test_dashboard_can_be_disabled_at_runtime():
+    client = TestClient(app)
+    configure(dashboard_enabled=False)
+    assert client.get("/dashboard").status_code == 404
@@ -1,7 +1,11 @@
+import asyncio
 import logging
+import os
+import subprocess
+import sys
 import time
 
-from pyquerytracker import TrackQuery
+from pyquerytracker import TrackQuery, core
 
 
 def test_tracking_output():
@@ -70,3 +74,50 @@ def test_tracking_with_class(caplog):
     assert "MyClass" in record.message
     assert "do_work" in record.message
     assert "ms" in record.message
+
+
+def test_tracker_failure_never_reaches_the_caller(monkeypatch, caplog):
+    def broken_store(_log):
+        raise RuntimeError("store is broken")
+
+    monkeypatch.setattr(core, "store_tracked_query", broken_store)
+    monkeypatch.setattr(core, "_report_warned_at", None)
+
+    @TrackQuery()
+    def answer():
+        return 42
+
+    @TrackQuery()
+    async def async_answer():
+        return 43
+
+    assert answer() == 42
+    assert asyncio.run(async_answer()) == 43
+    assert "Failed to record a call of" in caplog.text
+    # Not mistaken for a failure of the function itself.
+    assert "failed after" not in caplog.text
+
+
+def test_default_database_outside_the_repo_does_not_break_calls(tmp_path):
+    env = {k: v for k, v in os.environ.items() if k != "PYQUERYTRACKER_DB_URL"}
+    env["PYTHONPATH"] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from pyquerytracker import TrackQuery\n"
+            "from pyquerytracker.exporter.manager import ExporterManager\n"
+            "f = TrackQuery()(lambda: 1)\n"
+            "print(f())\n"
+            "ExporterManager.pipeline().flush()\n",
+        ],
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "1"
+    assert "Cannot open the tracker database" in result.stderr
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from pyquerytracker import api
+from pyquerytracker.downsample import downsample_series, lttb, minmax
+from pyquerytracker.response_cache import response_cache
+
+
+def noisy(n=10_000, spike=1234):
+    rng = np.random.default_rng(0)
+    y = rng.random(n)
+    y[spike] = 50.0
+    return np.arange(n, dtype=float), y
+
+
+def test_lttb_keeps_ends_and_spikes():
+    x, y = noisy()
+    indices = lttb(x, y, 200)
+
+    assert len(indices) == 200
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+    assert np.all(np.diff(indices) > 0)
+    assert 1234 in indices
+    assert np.array_equal(lttb(x[:50], y[:50], 200), np.arange(50))
+
+
+def test_minmax_keeps_extremes_of_every_bucket():
+    _, y = noisy()
+    y[10] = np.nan
+    indices = minmax(y, 200)
+
+    assert len(indices) <= 200
+    assert 1234 in indices
+    assert int(np.nanargmin(y)) in indices
+    assert 10 not in indices
+
+
+def test_downsample_series_keeps_columns_aligned():
+    start = datetime(2025, 1, 1)
+    n = 1000
+    series = {
+        "labels": [start + timedelta(seconds=i) for i in range(n)],
+        "durations": [float(i % 100) for i in range(n)],
+        "events": ["error" if i % 10 == 0 else "normal_execution" for i in range(n)],
+        "function_names": [f"f{i}" for i in range(n)],
+    }
+
+    reduced = downsample_series(series, 50, "minmax")
+    assert len(reduced["labels"]) == len(reduced["function_names"]) <= 50
+    for label, name in zip(reduced["labels"], reduced["function_names"]):
+        assert name == f"f{(label - start).seconds}"
+    assert reduced["summary"] == {"count": 1000, "mean_ms": 49.5, "errors": 100}
+    with pytest.raises(ValueError):
+        downsample_series(series, 50, "average")
+
+
+def test_query_stats_points(monkeypatch):
+    start = datetime(2025, 1, 1)
+    series = {
+        "labels": [start + timedelta(seconds=i) for i in range(500)],
+        "durations": [1.0] * 499 + [900.0],
+        "events": ["normal_execution"] * 500,
+        "function_names": ["load"] * 500,
+    }
+    monkeypatch.setattr(api, "query_stats", lambda minutes: series)
+    response_cache.clear()
+    client = TestClient(api.app)
+
+    body = client.get(
+        "/api/query-stats", params={"points": 20, "format": "columnar"}
+    ).json()
+    assert body["count"] == 20
+    assert body["summary"]["count"] == 500
+    assert 900.0 in body["columns"]["durations"]
+    assert len(client.get("/api/query-stats").json()["labels"]) == 500
+    response_cache.clear()
@@ -0,0 +1,96 @@
+import asyncio
+
+from pyquerytracker import TrackQuery, configure
+from pyquerytracker.tracker import query_data_store
+
+
+def _tracked_names():
+    return [record["function_name"] for record in query_data_store]
+
+
+def test_global_switch_toggles_at_runtime():
+    @TrackQuery()
+    def find(x):
+        return x * 2
+
+    query_data_store.clear()
+    configure(enabled=False)
+    try:
+        assert find(2) == 4
+        assert _tracked_names() == []
+    finally:
+        configure(enabled=True)
+    assert find(3) == 6
+    assert _tracked_names() == ["find"]
+
+
+def test_disabled_functions_by_name():
+    class Repo:
+        @TrackQuery()
+        def find(self):
+            return "row"
+
+        @TrackQuery()
+        def save(self):
+            return "ok"
+
+    query_data_store.clear()
+    configure(disabled_functions=["Repo.find"])
+    try:
+        assert Repo().find() == "row"
+        assert Repo().save() == "ok"
+        assert _tracked_names() == ["save"]
+    finally:
+        configure(disabled_functions=[])
+    Repo().find()
+    assert _tracked_names() == ["save", "find"]
+
+
+def test_disabled_async_and_generators_still_work():
+    @TrackQuery()
+    async def fetch():
+        return 1
+
+    @TrackQuery()
+    def numbers():
+        received = yield 1
+        yield received
+
+    @TrackQuery()
+    async def stream():
+        yield 1
+        yield 2
+
+    async def consume():
+        return [item async for item in stream()]
+
+    query_data_store.clear()
+    configure(enabled=False)
+    try:
+        assert asyncio.run(fetch()) == 1
+        gen = numbers()
+        assert next(gen) == 1
+        assert gen.send("sent") == "sent"
+        assert asyncio.run(consume()) == [1, 2]
+        assert _tracked_names() == []
+    finally:
+        configure(enabled=True)
+
+
+def test_decorator_can_return_the_bare_function():
+    def bare():
+        return 1
+
+    assert TrackQuery(enabled=False)(bare) is bare
+
+
+def test_environment_variables():
+    from pyquerytracker.config import config_from_env
+
+    settings = config_from_env(
+        {
+            "PYQUERYTRACKER_ENABLED": "off",
+            "PYQUERYTRACKER_DISABLED_FUNCTIONS": "a, Repo.b",
+        }
+    )
+    assert settings == {"enabled": False, "disabled_functions": ["a", "Repo.b"]}
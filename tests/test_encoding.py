@@ -0,0 +1,126 @@
+import gzip
+import json
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from pyquerytracker import encoding
+from pyquerytracker.api import app
+from pyquerytracker.encoding import (
+    JSON,
+    MSGPACK,
+    Representation,
+    columnar,
+    dumps_json,
+    encode,
+    negotiate,
+)
+from pyquerytracker.response_cache import response_cache
+from pyquerytracker.websocket import _representation
+
+msgpack = pytest.importorskip("msgpack")
+
+RECORDS = [
+    {
+        "timestamp": datetime(2024, 1, 1, 0, 0, 0),
+        "function_name": "load",
+        "event": "normal_execution",
+        "duration_ms": 1.5,
+    },
+    {
+        "timestamp": datetime(2024, 1, 1, 0, 0, 1),
+        "function_name": "save",
+        "event": "error",
+        "duration_ms": None,
+    },
+    {
+        "timestamp": None,
+        "function_name": "load",
+        "event": "normal_execution",
+        "duration_ms": 3.0,
+    },
+]
+
+
+def test_columnar_records():
+    payload = columnar(RECORDS)
+    columns = payload["columns"]
+
+    assert payload["count"] == 3
+    assert columns["timestamp"] == {"epoch_ms": [1704067200000, 1704067201000, None]}
+    assert columns["function_name"] == {
+        "dictionary": ["load", "save"],
+        "codes": [0, 1, 0],
+    }
+    assert columns["duration_ms"] == [1.5, None, 3.0]
+
+
+def test_columnar_accepts_columns():
+    payload = columnar({"labels": [], "events": []})
+    assert payload == {"count": 0, "columns": {"labels": [], "events": []}}
+
+
+def test_stdlib_json_matches_orjson(monkeypatch):
+    fast = dumps_json(RECORDS)
+    monkeypatch.setattr(encoding, "_optional", lambda name: None)
+    assert dumps_json(RECORDS) == fast
+    assert json.loads(fast)[0]["timestamp"] == "2024-01-01T00:00:00"
+
+
+def test_negotiate():
+    assert negotiate() == Representation()
+    assert negotiate("application/msgpack", "gzip, deflate") == Representation(
+        False, MSGPACK, "gzip"
+    )
+    assert negotiate("application/json", "gzip;q=0", True) == Representation(
+        True, JSON, None
+    )
+    # brotli is not installed here, so gzip is used even when br is preferred.
+    assert negotiate(None, "br, gzip;q=0.5").encoding == "gzip"
+
+
+def test_encode_compresses_large_bodies_only():
+    small = encode({"a": 1}, Representation(encoding="gzip"))
+    assert small.encoding is None
+
+    large = encode(RECORDS * 100, Representation(True, encoding="gzip"))
+    assert large.encoding == "gzip"
+    assert json.loads(gzip.decompress(large.body))["count"] == 300
+
+    packed = encode(RECORDS, Representation(True, MSGPACK))
+    assert msgpack.unpackb(packed.body)["columns"]["event"]["codes"] == [0, 1, 0]
+
+
+def test_api_negotiates_msgpack_and_gzip(monkeypatch):
+    monkeypatch.setattr(encoding, "COMPRESS_MIN_BYTES", 0)
+    response_cache.clear()
+    client = TestClient(app)
+
+    response = client.get(
+        "/api/query-stats",
+        params={"minutes": 5, "format": "columnar"},
+        headers={"Accept": "application/msgpack", "Accept-Encoding": "gzip"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept, Accept-Encoding"
+    assert set(msgpack.unpackb(response.content)["columns"]) == {
+        "labels",
+        "durations",
+        "events",
+        "function_names",
+    }
+
+    plain = client.get("/api/query-stats", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["etag"] != response.headers["etag"]
+    response_cache.clear()
+
+
+def test_websocket_representation_from_url():
+    class DummyWebSocket:
+        query_params = {"format": "columnar", "codec": "msgpack"}
+
+    assert _representation(DummyWebSocket()) == Representation(True, MSGPACK)
@@ -0,0 +1,78 @@
+from dataclasses import fields
+
+import pytest
+from fastapi.testclient import TestClient
+
+from pyquerytracker import TrackQuery, configure, get_error_groups
+from pyquerytracker.api import app
+from pyquerytracker.config import get_config, update_config
+from pyquerytracker.errors import ErrorAggregator, error_groups, fingerprint
+
+
+@pytest.fixture(autouse=True)
+def restore_config():
+    saved = get_config()
+    error_groups.clear()
+    yield
+    update_config(**{f.name: getattr(saved, f.name) for f in fields(saved)})
+    error_groups.clear()
+
+
+def fail(message):
+    raise ValueError(message)
+
+
+def caught(func, *args):
+    try:
+        func(*args)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        return e
+    raise AssertionError("did not raise")
+
+
+def test_fingerprint_ignores_the_message():
+    first = fingerprint("load", caught(fail, "id 1"))
+    assert first == fingerprint("load", caught(fail, "id 2"))
+    assert first[1] == "ValueError"
+    assert first[2].endswith(f"test_errors.py:{fail.__code__.co_firstlineno + 1}")
+    assert first != fingerprint("load", caught(lambda: 1 / 0))
+    assert first != fingerprint("save", caught(fail, "id 1"))
+
+
+def test_tracebacks_are_rate_limited_per_fingerprint():
+    configure(error_traceback_interval_s=60)
+    aggregator = ErrorAggregator()
+    error = caught(fail, "boom")
+
+    reports = [aggregator.record("load", error) for _ in range(5)]
+    assert [r.log_traceback for r in reports] == [True, False, False, False, False]
+    assert aggregator.record("save", error).log_traceback
+
+    configure(error_traceback_interval_s=0)
+    report = aggregator.record("load", error)
+    assert report.log_traceback and report.suppressed == 4
+    assert aggregator.snapshot()[0]["count"] == 6
+
+
+def test_error_burst_logs_one_traceback(caplog):
+    caplog.set_level("ERROR", logger="pyquerytracker")
+    configure(error_traceback_interval_s=60)
+
+    @TrackQuery()
+    def flaky(attempt):
+        raise ConnectionError(f"connection {attempt} reset")
+
+    for i in range(100):
+        flaky(attempt=i)
+
+    failures = [r for r in caplog.records if r.levelname == "ERROR"]
+    assert len(failures) == 1
+    assert failures[0].exc_info[0] is ConnectionError
+    (group,) = get_error_groups()
+    assert group["function"] == "flaky"
+    assert group["error_type"] == "ConnectionError"
+    assert group["count"] == 100
+    assert group["last_message"] == "connection 99 reset"
+
+    body = TestClient(app).get("/api/errors").json()
+    assert body["errors"][0]["count"] == 100
@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+import pytest
+
+from pyquerytracker import TrackQuery
+from pyquerytracker.tracker import query_data_store
+
+
+def _last_record(name):
+    return next(
+        log for log in reversed(query_data_store) if log["function_name"] == name
+    )
+
+
+def test_generator_tracks_full_iteration():
+    @TrackQuery()
+    def stream_rows(n):
+        for i in range(n):
+            time.sleep(0.01)
+            yield i
+
+    rows = []
+    for row in stream_rows(3):
+        time.sleep(0.02)  # consumer work
+        rows.append(row)
+
+    assert rows == [0, 1, 2]
+    record = _last_record("stream_rows")
+    assert record["item_count"] == 3
+    assert record["event"] == "normal_execution"
+    assert record["duration_ms"] >= 30
+    assert record["time_to_first_item_ms"] >= 10
+    assert record["consumer_time_ms"] >= 40
+    assert record["iteration_time_ms"] >= record["duration_ms"]
+
+
+def test_generator_returns_value_and_supports_send():
+    @TrackQuery()
+    def accumulator():
+        total = 0
+        while True:
+            value = yield total
+            if value is None:
+                return total
+            total += value
+
+    gen = accumulator()
+    next(gen)
+    gen.send(2)
+    gen.send(3)
+    with pytest.raises(StopIteration) as stop:
+        gen.send(None)
+    assert stop.value.value == 5
+    assert _last_record("accumulator")["item_count"] == 3
+
+
+def test_generator_closed_early_is_recorded():
+    @TrackQuery()
+    def endless():
+        i = 0
+        while True:
+            yield i
+            i += 1
+
+    gen = endless()
+    assert [next(gen) for _ in range(4)] == [0, 1, 2, 3]
+    gen.close()
+    assert _last_record("endless")["item_count"] == 4
+
+
+def test_generator_error(caplog):
+    caplog.set_level("ERROR")
+
+    @TrackQuery()
+    def broken_stream():
+        yield 1
+        raise ValueError("cursor lost")
+
+    rows = []
+    with pytest.raises(ValueError, match="cursor lost"):
+        for row in broken_stream():
+            rows.append(row)
+    assert rows == [1]
+    record = _last_record("broken_stream")
+    assert record["event"] == "error"
+    assert record["item_count"] == 1
+    assert "Function broken_stream failed" in caplog.records[-1].message
+
+
+def test_async_generator_tracks_full_iteration():
+    @TrackQuery()
+    async def stream_rows(n):
+        for i in range(n):
+            await asyncio.sleep(0.01)
+            yield i
+
+    async def consume():
+        rows = []
+        async for row in stream_rows(3):
+            await asyncio.sleep(0.01)
+            rows.append(row)
+        return rows
+
+    assert asyncio.run(consume()) == [0, 1, 2]
+    record = _last_record("stream_rows")
+    assert record["item_count"] == 3
+    assert record["duration_ms"] >= 30
+    assert record["consumer_time_ms"] >= 20
+
+
+def test_async_generator_error_is_reraised():
+    @TrackQuery()
+    async def broken_stream():
+        yield 1
+        raise ValueError("cursor lost")
+
+    async def consume():
+        return [row async for row in broken_stream()]
+
+    with pytest.raises(ValueError, match="cursor lost"):
+        asyncio.run(consume())
+    record = _last_record("broken_stream")
+    assert record["event"] == "error"
+    assert record["item_count"] == 1
+
+
+def test_records_share_one_schema():
+    @TrackQuery()
+    def plain():
+        return 1
+
+    @TrackQuery()
+    def stream():
+        yield 1
+
+    plain()
+    list(stream())
+    plain_record = _last_record("plain")
+    assert set(plain_record) == set(_last_record("stream"))
+    assert plain_record["item_count"] is None
+    assert plain_record["error"] is None
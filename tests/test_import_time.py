@@ -0,0 +1,49 @@
+import subprocess
+import sys
+
+# Cumulative import time allowed for ``import pyquerytracker``. It is a few
+# tens of milliseconds without the database and exporter layers, compared
+# with several hundred when SQLAlchemy was imported eagerly.
+IMPORT_BUDGET_US = 150_000
+
+HEAVY_MODULES = ("sqlalchemy", "fastapi", "asyncio", "pyquerytracker.db.session")
+
+
+def _import_times(code):
+    """Run ``code`` with ``-X importtime``; returns cumulative microseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.partition(":")[2].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_skips_db_exporter_and_api_layers():
+    times = _import_times("import pyquerytracker")
+
+    for module in HEAVY_MODULES + (
+        "pyquerytracker.exporter.manager",
+        "pyquerytracker.logfiles",
+    ):
+        assert module not in times
+    assert times["pyquerytracker"] < IMPORT_BUDGET_US
+
+
+def test_tracking_without_persistence_never_loads_the_database():
+    times = _import_times(
+        "from pyquerytracker import TrackQuery, configure\n"
+        "configure(persist_to_db=False)\n"
+        "TrackQuery()(len)([1])\n"
+    )
+
+    assert "pyquerytracker.exporter.manager" in times
+    assert "sqlalchemy" not in times
+    assert "pyquerytracker.exporter.csv_exporter" not in times
@@ -0,0 +1,117 @@
+import multiprocessing
+import os
+
+from fastapi.testclient import TestClient
+
+from pyquerytracker import TrackQuery
+from pyquerytracker.api import app
+from pyquerytracker.metrics import MetricsRegistry, MmapStore
+
+
+def _record(name, duration_ms, event="normal_execution", class_name=None):
+    return {
+        "function_name": name,
+        "class_name": class_name,
+        "duration_ms": duration_ms,
+        "event": event,
+    }
+
+
+def test_render_counters_and_histogram():
+    registry = MetricsRegistry()
+    registry.observe(_record("get_user", 3.0))
+    registry.observe(_record("get_user", 40.0, event="slow_execution"))
+    registry.observe(_record("get_user", 1.0, event="error"))
+
+    text = registry.render()
+    labels = 'function="get_user",class=""'
+    assert f"pyquerytracker_calls_total{{{labels}}} 3" in text
+    assert f"pyquerytracker_errors_total{{{labels}}} 1" in text
+    assert f"pyquerytracker_slow_calls_total{{{labels}}} 1" in text
+    assert (
+        f'pyquerytracker_call_duration_seconds_bucket{{{labels},le="0.001"}} 1' in text
+    )
+    assert (
+        f'pyquerytracker_call_duration_seconds_bucket{{{labels},le="0.005"}} 2' in text
+    )
+    assert (
+        f'pyquerytracker_call_duration_seconds_bucket{{{labels},le="+Inf"}} 3' in text
+    )
+    assert f"pyquerytracker_call_duration_seconds_count{{{labels}}} 3" in text
+
+
+def test_label_escaping():
+    registry = MetricsRegistry()
+    registry.observe(_record('we"ird', 1.0, class_name="A\\B"))
+    assert 'function="we\\"ird",class="A\\\\B"' in registry.render()
+
+
+def _worker(directory, calls):
+    registry = MetricsRegistry(directory)
+    for _ in range(calls):
+        registry.observe(_record("shared", 2.0))
+
+
+def test_mmap_store_sums_processes(tmp_path):
+    directory = str(tmp_path)
+    processes = [
+        multiprocessing.Process(target=_worker, args=(directory, 50 * (i + 1)))
+        for i in range(3)
+    ]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+
+    registry = MetricsRegistry(directory)
+    text = registry.render()
+    assert 'pyquerytracker_calls_total{function="shared",class=""} 300' in text
+    # One file per worker, plus the scraping process.
+    assert len(os.listdir(directory)) == 4
+
+
+def _forked_worker(registry, calls):
+    for _ in range(calls):
+        registry.observe(_record("forked", 2.0))
+
+
+def test_forked_children_get_their_own_store(tmp_path):
+    registry = MetricsRegistry(str(tmp_path))
+    # The parent opens its store before forking, as with gunicorn --preload.
+    registry.observe(_record("forked", 2.0))
+    ctx = multiprocessing.get_context("fork")
+    processes = [
+        ctx.Process(target=_forked_worker, args=(registry, 5000)) for _ in range(4)
+    ]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+
+    assert 'pyquerytracker_calls_total{function="forked",class=""} 20001' in (
+        registry.render()
+    )
+    assert len(os.listdir(tmp_path)) == 5
+
+
+def test_mmap_store_grows_and_reopens(tmp_path):
+    store = MmapStore(str(tmp_path))
+    for i in range(5000):
+        store.inc(f"key-{i}", i)
+    store.inc("key-10", 1)
+    reopened = MmapStore(str(tmp_path))
+    values = dict(reopened.items())
+    assert values["key-10"] == 11
+    assert values["key-4999"] == 4999
+
+
+def test_metrics_endpoint():
+    @TrackQuery()
+    def metered_query():
+        return "ok"
+
+    metered_query()
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'function="metered_query"' in response.text
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from pyquerytracker.api import app
+from pyquerytracker.config import configure
+from pyquerytracker.db.reader import run_read, shutdown_read_pool
+from pyquerytracker.selfmetrics import get_self_metrics
+
+
+def test_reads_do_not_block_the_event_loop():
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await run_read(time.sleep, 0.2)
+        task.cancel()
+        return ticks
+
+    assert asyncio.run(scenario()) >= 5
+
+
+def test_read_concurrency_is_capped():
+    configure(db_read_workers=2)
+    shutdown_read_pool()
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def slow_read():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+
+    async def scenario():
+        await asyncio.gather(*(run_read(slow_read) for _ in range(8)))
+
+    try:
+        asyncio.run(scenario())
+        assert peak == 2
+    finally:
+        configure(db_read_workers=4)
+        shutdown_read_pool()
+
+    timers = get_self_metrics()["timers"]
+    assert timers["db_read"]["count"] >= 8
+    assert timers["db_read_wait"]["max_ms"] > 0
+
+
+def test_read_endpoints():
+    client = TestClient(app)
+    response = client.get("/debug/queries")
+    assert response.status_code == 200
+    assert isinstance(response.json(), list)
+    assert client.get("/api/regressions").status_code == 200
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+
+from pyquerytracker.api import app
+from pyquerytracker.db import reader
+from pyquerytracker.db.models import TrackedQuery
+from pyquerytracker.db.reader import Cursor, RecordQuery, browse_records
+from pyquerytracker.db.session import upgrade_schema
+from pyquerytracker.response_cache import response_cache
+
+START = datetime(2025, 1, 1)
+
+
+@pytest.fixture(name="database")
+def fixture_database(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'records.db'}")
+    upgrade_schema(engine)
+    session_factory = sessionmaker(bind=engine)
+    session = session_factory()
+    session.add_all(
+        TrackedQuery(
+            function_name="load" if i % 3 else "save",
+            duration_ms=float(i % 10),
+            # Pairs of records share a timestamp to exercise the id tiebreak.
+            timestamp=START + timedelta(seconds=i // 2),
+            event="error" if i % 7 == 0 else "normal_execution",
+        )
+        for i in range(50)
+    )
+    session.commit()
+    session.close()
+    monkeypatch.setattr(reader, "SessionLocal", session_factory)
+    yield engine
+    response_cache.clear()
+
+
+def page_through(query):
+    ids, cursor = [], None
+    while True:
+        page = browse_records(query, cursor)
+        ids.extend(record["id"] for record in page["records"])
+        if page["next_cursor"] is None:
+            return ids
+        cursor = Cursor.decode(page["next_cursor"])
+
+
+def test_pages_cover_every_record_once_in_order(database):
+    newest_first = page_through(RecordQuery(limit=7))
+    assert newest_first == list(range(50, 0, -1))
+
+    by_duration = page_through(RecordQuery(sort="duration_ms", descending=False))
+    assert len(by_duration) == len(set(by_duration)) == 50
+    assert page_through(RecordQuery(sort="duration_ms", limit=3)) == list(
+        reversed(by_duration)
+    )
+    assert "ix_tracked_queries_timestamp_id" in {
+        index["name"] for index in inspect(database).get_indexes("tracked_queries")
+    }
+
+
+def test_filters(database):  # pylint: disable=unused-argument
+    query = RecordQuery(
+        function_name="load",
+        event="normal_execution",
+        min_duration_ms=2,
+        max_duration_ms=5,
+        since=START + timedelta(seconds=5),
+        until=START + timedelta(seconds=20),
+    )
+    records = browse_records(query)["records"]
+    assert records
+    for record in records:
+        assert record["function_name"] == "load"
+        assert record["event"] == "normal_execution"
+        assert 2 <= record["duration_ms"] <= 5
+        assert START + timedelta(seconds=5) <= record["timestamp"]
+        assert record["timestamp"] < START + timedelta(seconds=20)
+
+
+def test_cursor_round_trip_and_validation():
+    cursor = Cursor("timestamp", True, START, 12)
+    assert Cursor.decode(cursor.encode()) == cursor
+    for token in ("not-a-cursor", Cursor("id", True, 1, 1).encode()):
+        with pytest.raises(ValueError):
+            Cursor.decode(token)
+
+
+def test_records_endpoint(database):  # pylint: disable=unused-argument
+    client = TestClient(app)
+
+    first = client.get("/api/records", params={"limit": 20, "event": "error"}).json()
+    assert [r["event"] for r in first["records"]] == ["error"] * 8
+    assert first["next_cursor"] is None
+
+    page = client.get("/api/records", params={"limit": 20}).json()
+    following = client.get(
+        "/api/records", params={"limit": 20, "cursor": page["next_cursor"]}
+    ).json()
+    assert following["records"][0]["id"] == page["records"][-1]["id"] - 1
+
+    mismatched = client.get(
+        "/api/records", params={"order": "asc", "cursor": page["next_cursor"]}
+    )
+    assert mismatched.status_code == 400
+    assert client.get("/api/records", params={"cursor": "x"}).status_code == 400
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from pyquerytracker import websocket
+from pyquerytracker.api import app
+from pyquerytracker.regression import RegressionDetector
+
+
+def _rows(start_id, durations, name="get_user"):
+    base = datetime(2025, 1, 1)
+    return [
+        (start_id + i, name, None, d, base + timedelta(seconds=start_id + i))
+        for i, d in enumerate(durations)
+    ]
+
+
+def test_detects_latency_shift_once():
+    rng = random.Random(1)
+    detector = RegressionDetector()
+    stable = [rng.lognormvariate(1.0, 0.2) for _ in range(500)]
+    assert detector.feed(_rows(1, stable)) == []
+
+    shifted = [rng.lognormvariate(1.0, 0.2) * 3 for _ in range(200)]
+    found = detector.feed(_rows(501, shifted))
+    assert len(found) == 1
+    regression = found[0]
+    assert regression.function_name == "get_user"
+    assert 2.0 < regression.ratio < 4.5
+    assert regression.changed_at >= datetime(2025, 1, 1) + timedelta(seconds=501)
+
+
+def test_feed_is_incremental():
+    detector = RegressionDetector(min_samples=5)
+    rows = _rows(1, [1.0] * 10)
+    detector.feed(rows)
+    assert detector.last_id == 10
+    # Already-seen rows are ignored.
+    detector.feed(rows)
+    assert detector._states[("get_user", None)].count == 10
+
+
+def test_no_alarm_on_noise():
+    rng = random.Random(2)
+    detector = RegressionDetector()
+    noisy = [rng.lognormvariate(0.5, 0.5) for _ in range(5000)]
+    assert detector.feed(_rows(1, noisy)) == []
+
+
+def test_regressions_endpoint():
+    response = TestClient(app).get("/api/regressions")
+    assert response.status_code == 200
+    assert isinstance(response.json()["regressions"], list)
+
+
+def test_regressions_broadcast(monkeypatch):
+    detector = RegressionDetector(min_samples=5)
+    detector.feed(_rows(1, [1.0] * 20))
+    found = detector.feed(_rows(21, [50.0] * 20))
+    monkeypatch.setattr(websocket.detector, "update", lambda: found)
+
+    class FakeWebSocket:
+        def __init__(self):
+            self.sent = []
+
+        async def send_text(self, msg):
+            self.sent.append(msg)
+
+    fake_ws = FakeWebSocket()
+    websocket.connected_clients.append(fake_ws)
+    try:
+        asyncio.run(websocket.broadcast_regressions())
+    finally:
+        websocket.connected_clients.remove(fake_ws)
+
+    assert len(fake_ws.sent) == 1
+    message = json.loads(fake_ws.sent[0])
+    assert message["event"] == "latency_regression"
+    assert message["function_name"] == "get_user"
+
+
+def test_single_watcher_for_all_clients(monkeypatch):
+    calls = []
+
+    def fake_update():
+        calls.append(1)
+        return []
+
+    monkeypatch.setattr(websocket.detector, "update", fake_update)
+    monkeypatch.setattr(websocket, "REGRESSION_SCAN_INTERVAL_S", 0.01)
+
+    async def run():
+        websocket.connected_clients.extend([object(), object(), object()])
+        websocket.ensure_regression_watcher()
+        first = websocket._regression_task
+        websocket.ensure_regression_watcher()
+        assert websocket._regression_task is first
+        await asyncio.sleep(0.1)
+        websocket.connected_clients.clear()
+        await asyncio.wait_for(first, 1)
+
+    asyncio.run(run())
+    # One scan per interval, not one per client.
+    assert 0 < len(calls) <= 11
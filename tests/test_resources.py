@@ -0,0 +1,139 @@
+import asyncio
+import time
+from dataclasses import fields
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from pyquerytracker import TrackQuery, configure
+from pyquerytracker.config import get_config, update_config
+from pyquerytracker.db.session import upgrade_schema
+from pyquerytracker.resources import RESOURCE_FIELDS
+from pyquerytracker.tracker import query_data_store
+from pyquerytracker.window import SlidingWindow
+
+
+@pytest.fixture(autouse=True)
+def restore_config():
+    saved = get_config()
+    yield
+    update_config(**{f.name: getattr(saved, f.name) for f in fields(saved)})
+
+
+def _last_record(name):
+    return next(
+        log for log in reversed(query_data_store) if log["function_name"] == name
+    )
+
+
+def _spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_not_measured_by_default():
+    @TrackQuery()
+    def plain():
+        return 1
+
+    plain()
+    record = _last_record("plain")
+    assert all(record[name] is None for name in RESOURCE_FIELDS)
+
+
+def test_cpu_time_tells_busy_from_waiting():
+    configure(track_cpu_time=True)
+
+    @TrackQuery()
+    def busy():
+        _spin(0.05)
+
+    @TrackQuery()
+    def waiting():
+        time.sleep(0.05)
+
+    busy()
+    waiting()
+    busy_record, waiting_record = _last_record("busy"), _last_record("waiting")
+    assert busy_record["cpu_time_ms"] > 0.5 * busy_record["duration_ms"]
+    assert waiting_record["cpu_time_ms"] < 0.2 * waiting_record["duration_ms"]
+    assert busy_record["alloc_bytes"] is None
+
+
+def test_coroutine_running_versus_suspended():
+    @TrackQuery(cpu_time=True)
+    async def fetch():
+        await asyncio.sleep(0.05)
+        _spin(0.02)
+        return "done"
+
+    @TrackQuery(cpu_time=True)
+    async def fails():
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+    assert asyncio.run(fetch()) == "done"
+    asyncio.run(fails())
+    record = _last_record("fetch")
+    assert record["suspended_ms"] >= 40
+    assert 15 <= record["running_ms"] < 40
+    assert record["cpu_time_ms"] <= record["running_ms"] + 1
+    assert record["running_ms"] + record["suspended_ms"] == pytest.approx(
+        record["duration_ms"]
+    )
+    assert _last_record("fails")["event"] == "error"
+    assert _last_record("fails")["running_ms"] is not None
+
+
+def test_sampled_allocations():
+    @TrackQuery(allocation_sample_rate=1.0)
+    def build():
+        data = [str(i) for i in range(20000)]
+        return len(data)
+
+    assert build() == 20000
+    record = _last_record("build")
+    # The list is freed on return, so the peak shows it but the delta doesn't.
+    assert record["alloc_peak_bytes"] > 20000 * 40
+    assert record["alloc_bytes"] < record["alloc_peak_bytes"]
+    assert record["cpu_time_ms"] is None
+
+
+def test_window_aggregates_resources():
+    window = SlidingWindow()
+    for cpu in (2.0, 4.0, None):
+        window.add(
+            {"function_name": "load", "duration_ms": 5.0, "cpu_time_ms": cpu},
+            now=100.0,
+        )
+    rows = window.summary(60, now=100.0)
+    assert len(rows) == 1
+    row = rows[0]
+    assert row["count"] == 3
+    assert row["mean_cpu_time_ms"] == pytest.approx(3.0)
+    assert row["mean_alloc_bytes"] is None
+
+
+def test_upgrade_schema_adds_new_columns(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE tracked_queries (id INTEGER PRIMARY KEY, "
+                "function_name VARCHAR, class_name VARCHAR, duration_ms FLOAT, "
+                "timestamp DATETIME, event VARCHAR, func_args VARCHAR, "
+                "func_kwargs VARCHAR, error VARCHAR)"
+            )
+        )
+        connection.execute(
+            text("INSERT INTO tracked_queries (function_name) VALUES ('old')")
+        )
+    upgrade_schema(engine)
+    columns = {c["name"] for c in inspect(engine).get_columns("tracked_queries")}
+    assert set(RESOURCE_FIELDS) <= columns
+    with engine.connect() as connection:
+        row = connection.execute(
+            text("SELECT function_name, cpu_time_ms FROM tracked_queries")
+        ).one()
+    assert tuple(row) == ("old", None)
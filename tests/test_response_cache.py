@@ -0,0 +1,103 @@
+import asyncio
+import time
+from dataclasses import fields
+
+import pytest
+from fastapi.testclient import TestClient
+
+from pyquerytracker.api import app
+from pyquerytracker.config import configure, get_config, update_config
+from pyquerytracker.response_cache import ResponseCache, etag_matches, response_cache
+
+
+@pytest.fixture(autouse=True)
+def restore_config():
+    saved = get_config()
+    yield
+    update_config(**{f.name: getattr(saved, f.name) for f in fields(saved)})
+    response_cache.clear()
+
+
+def counting(delay=0.0):
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        time.sleep(delay)
+        return {"value": value}
+
+    return compute, calls
+
+
+def test_reuses_response_within_ttl():
+    cache = ResponseCache()
+    compute, calls = counting()
+
+    async def scenario():
+        first = await cache.get("k", compute, 1)
+        second = await cache.get("k", compute, 1)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first is second
+    assert first.body == b'{"value":1}'
+    assert calls == [1]
+
+    configure(api_cache_ttl_s=0)
+    asyncio.run(scenario())
+    assert calls == [1, 1, 1]
+
+
+def test_concurrent_requests_share_one_read():
+    cache = ResponseCache()
+    compute, calls = counting(delay=0.05)
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get("k", compute, 7) for _ in range(10)))
+
+    entries = asyncio.run(scenario())
+    assert calls == [7]
+    assert len({entry.etag for entry in entries}) == 1
+
+
+def test_evicts_least_recently_used_beyond_max_bytes():
+    cache = ResponseCache()
+    compute, calls = counting()
+    configure(api_cache_max_bytes=25)
+
+    async def scenario():
+        await cache.get("a", compute, 1)
+        await cache.get("b", compute, 2)
+        await cache.get("a", compute, 1)
+        await cache.get("c", compute, 3)  # evicts "b"
+        await cache.get("a", compute, 1)
+        await cache.get("b", compute, 2)
+
+    asyncio.run(scenario())
+    assert calls == [1, 2, 3, 2]
+
+
+def test_etag_matching():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+def test_unchanged_response_returns_304():
+    client = TestClient(app)
+    first = client.get("/api/query-stats?minutes=5")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    again = client.get("/api/query-stats?minutes=5", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+    assert again.content == b""
+
+    stale = client.get(
+        "/api/query-stats?minutes=5", headers={"If-None-Match": '"stale"'}
+    )
+    assert stale.status_code == 200
+    assert stale.json() == first.json()
@@ -0,0 +1,57 @@
+from fastapi.testclient import TestClient
+
+from pyquerytracker import TrackQuery, configure, get_self_metrics
+from pyquerytracker.api import app
+from pyquerytracker.config import ExportType
+from pyquerytracker.exporter.manager import ExporterManager
+from pyquerytracker.selfmetrics import SelfMetrics
+
+
+def test_timers_and_counters():
+    metrics = SelfMetrics()
+    metrics.observe("stage", 0.002)
+    metrics.observe_many([("stage", 0.004), ("other", 0.001)])
+    with metrics.timer("block"):
+        pass
+    metrics.add("bytes", 10)
+    metrics.add("bytes", 5)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["timers"]["stage"]["count"] == 2
+    assert snapshot["timers"]["stage"]["max_ms"] == 4.0
+    assert snapshot["timers"]["stage"]["mean_us"] == 3000.0
+    assert snapshot["timers"]["block"]["count"] == 1
+    assert snapshot["counters"] == {"bytes": 15}
+    assert snapshot["sinks"] == []
+
+
+def test_tracker_reports_its_own_work(tmp_path):
+    configure(exporters=[(ExportType.CSV, str(tmp_path / "q.csv"))])
+    try:
+
+        @TrackQuery()
+        def lookup():
+            return 1
+
+        for _ in range(5):
+            lookup()
+        ExporterManager.get().flush()
+
+        snapshot = get_self_metrics()
+        for stage in ("build_record", "log", "store", "export_append", "report"):
+            assert snapshot["timers"][stage]["count"] >= 5
+        assert snapshot["timers"]["flush.CsvExporter"]["count"] >= 1
+        assert snapshot["counters"]["bytes_written.CsvExporter"] > 0
+        sinks = {sink["name"]: sink for sink in snapshot["sinks"]}
+        assert sinks["CsvExporter"]["exported"] == 5
+        assert sinks["CsvExporter"]["queue_depth"] == 0
+        assert sinks["CsvExporter"]["queue_capacity"] == 2048
+        assert sinks["CsvExporter"]["dropped"] == 0
+    finally:
+        configure(exporters=[])
+
+
+def test_self_metrics_endpoint():
+    response = TestClient(app).get("/api/self-metrics")
+    assert response.status_code == 200
+    assert set(response.json()) == {"timers", "counters", "sinks"}
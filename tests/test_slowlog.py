@@ -0,0 +1,80 @@
+import logging
+from dataclasses import fields
+
+import pytest
+
+from pyquerytracker import TrackQuery, configure
+from pyquerytracker.config import get_config, update_config
+from pyquerytracker.slowlog import SlowLog, slow_log
+from pyquerytracker.tracker import query_data_store
+
+
+@pytest.fixture(autouse=True)
+def restore_config():
+    saved = get_config()
+    slow_log.clear()
+    yield
+    update_config(**{f.name: getattr(saved, f.name) for f in fields(saved)})
+    slow_log.clear()
+
+
+def summaries(caplog):
+    return [
+        r
+        for r in caplog.records
+        if getattr(r, "event", None) == "slow_execution_summary"
+    ]
+
+
+def test_burst_then_one_summary_per_interval(caplog):
+    caplog.set_level(logging.WARNING, logger="pyquerytracker")
+    configure(slow_log_burst=3, slow_log_interval_s=10)
+    limiter = SlowLog(background=False)
+
+    allowed = [
+        limiter.allow("load", float(i), (f"({i},)", "{}"), now=100.0 + i * 0.01)
+        for i in range(1, 101)
+    ]
+    assert allowed[:3] == [True] * 3
+    assert not any(allowed[3:])
+    assert limiter.pending() == ["load"]
+
+    assert limiter.flush(now=105.0) == 0
+    assert limiter.flush(now=111.0) == 1
+    (summary,) = summaries(caplog)
+    assert summary.count == 97
+    assert summary.max_ms == 100.0
+    assert summary.p99_ms == pytest.approx(99.0, rel=0.02)
+    assert summary.func_args == "(100,)"
+    assert not limiter.pending()
+
+
+def test_tokens_refill_over_time():
+    configure(slow_log_burst=1, slow_log_interval_s=10)
+    limiter = SlowLog(background=False)
+
+    assert limiter.allow("load", 1.0, ("()", "{}"), now=0.0)
+    assert not limiter.allow("load", 1.0, ("()", "{}"), now=1.0)
+    # The pending summary is written first, then a token is available again.
+    assert limiter.allow("load", 1.0, ("()", "{}"), now=12.0)
+
+
+def test_every_slow_call_is_still_recorded(caplog):
+    caplog.set_level(logging.WARNING, logger="pyquerytracker")
+    configure(slow_log_threshold_ms=0, slow_log_burst=2, persist_to_db=False)
+
+    @TrackQuery()
+    def crawl():
+        return 1
+
+    before = len(query_data_store)
+    for _ in range(50):
+        crawl()
+    assert len(query_data_store) - before == 50
+    singles = [r for r in caplog.records if "Slow execution" in r.getMessage()]
+    assert len(singles) == 2
+
+    slow_log.flush(force=True)
+    (summary,) = summaries(caplog)
+    assert summary.count == 48
+    assert summary.function == "crawl"
@@ -0,0 +1,78 @@
+import random
+import time
+
+from pyquerytracker import TrackQuery
+from pyquerytracker.tracker import query_data_store
+from pyquerytracker.utils.quantile import P2Quantile, RollingQuantile
+
+
+def test_p2_quantile_estimate():
+    rng = random.Random(7)
+    values = [rng.uniform(0, 100) for _ in range(20000)]
+    estimator = P2Quantile(0.99)
+    for v in values:
+        estimator.add(v)
+    exact = sorted(values)[int(0.99 * len(values))]
+    assert abs(estimator.value - exact) < 1.0
+
+
+def test_rolling_quantile_forgets_old_windows():
+    rolling = RollingQuantile(0.5, window=100, min_samples=10)
+    assert rolling.value is None
+    for _ in range(200):
+        rolling.add(1000.0)
+    for _ in range(200):
+        rolling.add(1.0)
+    assert rolling.value == 1.0
+
+
+def test_per_decorator_threshold():
+    @TrackQuery(slow_log_threshold_ms=0.0)
+    def always_slow():
+        return 1
+
+    @TrackQuery(slow_log_threshold_ms=10_000)
+    def never_slow():
+        return 1
+
+    always_slow()
+    never_slow()
+    events = {
+        log["function_name"]: log["event"]
+        for log in query_data_store
+        if log["function_name"] in ("always_slow", "never_slow")
+    }
+    assert events == {"always_slow": "slow_execution", "never_slow": "normal_execution"}
+
+
+def test_adaptive_threshold_flags_regression():
+    tracker = TrackQuery(adaptive=True, window=50, min_samples=20, factor=2.0)
+
+    def lookup():
+        return 1
+
+    for _ in range(60):
+        assert not tracker._is_slow(lookup, 2.0)
+    # Below the global 100ms threshold, but far above this function's baseline.
+    assert tracker._is_slow(lookup, 10.0)
+    # Each wrapped function keeps its own baseline.
+    assert not tracker._is_slow(lambda: None, 10.0)
+
+
+def test_adaptive_decorator_records_slow_event():
+    @TrackQuery(adaptive=True, window=50, min_samples=20, factor=2.0)
+    def lookup(delay=0.0):
+        if delay:
+            time.sleep(delay)
+        return 1
+
+    for _ in range(60):
+        lookup()
+    # Well under the global 100ms threshold, but far above the warmed-up baseline.
+    lookup(delay=0.03)
+
+    events = [
+        log["event"] for log in query_data_store if log["function_name"] == "lookup"
+    ]
+    assert events[-1] == "slow_execution"
+    assert "slow_execution" not in events[:20]
@@ -0,0 +1,114 @@
+from dataclasses import fields
+
+import pytest
+from fastapi.testclient import TestClient
+
+from pyquerytracker.api import app
+from pyquerytracker.config import configure, get_config, update_config
+from pyquerytracker.response_cache import response_cache
+from pyquerytracker.window import SlidingWindow, sliding_window
+
+T0 = 1_700_000_000  # a minute boundary
+
+
+@pytest.fixture(autouse=True)
+def restore_config():
+    saved = get_config()
+    yield
+    update_config(**{f.name: getattr(saved, f.name) for f in fields(saved)})
+    response_cache.clear()
+    sliding_window.clear()
+
+
+def record(name="load", duration=10.0, event="normal_execution", error=None):
+    return {
+        "function_name": name,
+        "duration_ms": duration,
+        "event": event,
+        "error": error,
+    }
+
+
+def test_stats_cover_only_the_requested_window():
+    window = SlidingWindow()
+    window.add(record(duration=5.0), now=T0)
+    window.add(record(duration=15.0), now=T0 + 30)
+    window.add(record("save", event="error", error="boom"), now=T0 + 90)
+
+    stats = window.stats(61, now=T0 + 90)
+    assert set(stats) == {"load", "save"}
+    assert stats["load"].count == 1
+    assert stats["load"].max_ms == 15.0
+    assert stats["save"].errors == 1
+    assert window.stats(200, now=T0 + 90)["load"].count == 2
+
+
+def test_minute_rollups_match_second_totals():
+    window = SlidingWindow()
+    for i in range(300):
+        window.add(record(duration=float(i % 50)), now=T0 + i)
+
+    # Whole minutes come from roll-ups, the edges from single seconds.
+    stats = window.stats(250, now=T0 + 299)["load"]
+    assert stats.count == 250
+    assert stats.max_ms == 49.0
+    assert window._minutes  # pylint: disable=protected-access
+    assert window.stats(250, now=T0 + 299)["load"].count == 250
+
+
+def test_expired_buckets_are_evicted():
+    configure(window_retention_s=120)
+    window = SlidingWindow()
+    window.add(record(), now=T0)
+    window.stats(60, now=T0 + 61)  # builds the first minute's roll-up
+    window.add(record(), now=T0 + 500)
+
+    assert window.stats(600, now=T0 + 500)["load"].count == 1
+    assert T0 // 60 not in window._minutes  # pylint: disable=protected-access
+
+
+def test_rollups_built_out_of_order_are_evicted():
+    configure(window_retention_s=600)
+    window = SlidingWindow()
+    window.add(record(), now=T0)
+    window.add(record(), now=T0 + 400)
+    window.stats(120, now=T0 + 400)  # rolls up minute 5 first
+    window.stats(400, now=T0 + 400)  # then minutes 1 to 4
+    window.add(record(), now=T0 + 760)
+
+    minutes = window._minutes  # pylint: disable=protected-access
+    assert T0 // 60 + 1 not in minutes
+    assert T0 // 60 + 5 in minutes
+
+
+def test_late_calls_count_in_the_newest_second():
+    window = SlidingWindow()
+    window.add(record(), now=T0 + 10)
+    window.add(record(), now=T0 + 5)
+
+    assert window.series(3, now=T0 + 10)["count"] == [0, 0, 2]
+
+
+def test_summary_rows():
+    window = SlidingWindow()
+    for _ in range(3):
+        window.add(record("busy"), now=T0)
+    window.add(record("quiet", duration=100.0, event="slow_execution"), now=T0)
+
+    rows = window.summary(10, now=T0)
+    assert [row["function"] for row in rows] == ["busy", "quiet"]
+    assert rows[0]["calls_per_s"] == pytest.approx(0.3)
+    assert rows[1]["slow_count"] == 1
+    assert rows[1]["p50_ms"] == pytest.approx(100.0, rel=0.01)
+
+
+def test_window_stats_endpoint():
+    sliding_window.add(record())
+    client = TestClient(app)
+
+    response = client.get("/api/window-stats", params={"minutes": 1})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["functions"][0]["function"] == "load"
+    assert sum(body["series"]["count"]) == 1
+    assert len(body["series"]["buckets"]) == 60